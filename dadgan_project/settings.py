@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,6 +46,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'lawfirm.middleware.QueryCountMiddleware',
+    'lawfirm.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,6 +68,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'lawfirm.context_processors.cache_versions',
+                'lawfirm.context_processors.site_settings',
             ],
         },
     },
@@ -78,10 +84,23 @@ WSGI_APPLICATION = 'dadgan_project.wsgi.application'
 # Use MySQL in production (when DB_ENGINE is set), SQLite in development
 DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
 
+# Connection management (lawfirm/db)
+# Each worker thread keeps its connection for DB_CONN_MAX_AGE seconds
+# ('0' closes it after every request, 'None' never) and checks it is still
+# alive before reusing it when DB_CONN_HEALTH_CHECKS is on.
+# DB_POOL_SIZE > 0 switches MySQL to the pooled backend, which shares up to
+# DB_POOL_SIZE idle connections between all threads of a process (threaded
+# or async workers); connections go back to the pool after every request
+# and are replaced after DB_POOL_RECYCLE seconds.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '60')
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '0'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '3600'))
+
 if DB_ENGINE == 'mysql':
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.mysql',
+            'ENGINE': 'lawfirm.db.backends.mysql' if DB_POOL_SIZE else 'django.db.backends.mysql',
             'NAME': os.environ.get('DB_NAME', 'dadgan_django'),
             'USER': os.environ.get('DB_USER', 'root'),
             'PASSWORD': os.environ.get('DB_PASSWORD', 'my-secret-pw'),
@@ -90,7 +109,11 @@ if DB_ENGINE == 'mysql':
             'OPTIONS': {
                 'charset': 'utf8mb4',
                 'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-            }
+            },
+            'POOL': {
+                'SIZE': DB_POOL_SIZE,
+                'RECYCLE': DB_POOL_RECYCLE,
+            },
         }
     }
 else:
@@ -101,6 +124,97 @@ else:
         }
     }
 
+# Read replicas (lawfirm/db/router.py)
+# DB_REPLICAS lists replica servers as host[:port] for MySQL, or database
+# files for SQLite, comma separated; they become aliases replica1, replica2...
+# with the primary's credentials.  Public content reads are spread over them,
+# a request that writes is pinned to the primary (and so is the next
+# DB_REPLICA_PIN_SECONDS of that browser's requests), and a replica more than
+# DB_REPLICA_MAX_LAG seconds behind is skipped.  Replica health is checked at
+# most every DB_REPLICA_CHECK_INTERVAL seconds.
+DB_REPLICAS = [replica.strip() for replica in os.environ.get('DB_REPLICAS', '').split(',') if replica.strip()]
+DB_REPLICA_MAX_LAG = int(os.environ.get('DB_REPLICA_MAX_LAG', '10'))
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '5'))
+DB_REPLICA_CHECK_INTERVAL = int(os.environ.get('DB_REPLICA_CHECK_INTERVAL', '5'))
+
+DATABASE_REPLICAS = []
+for _number, _replica in enumerate(DB_REPLICAS, 1):
+    if DB_ENGINE == 'mysql':
+        _host, _, _port = _replica.partition(':')
+        _location = {'HOST': _host, 'PORT': _port or DATABASES['default']['PORT']}
+    else:
+        _location = {'NAME': _replica}
+    # Tests use the primary's test database for the replicas too
+    DATABASES[f'replica{_number}'] = {**DATABASES['default'], **_location, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{_number}')
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['lawfirm.db.router.ReplicaRouter']
+
+for _database in DATABASES.values():
+    if DB_POOL_SIZE and _database['ENGINE'] == 'lawfirm.db.backends.mysql':
+        # Hand the connection back to the pool at the end of each request
+        _database['CONN_MAX_AGE'] = 0
+    else:
+        _database['CONN_MAX_AGE'] = None if DB_CONN_MAX_AGE == 'None' else int(DB_CONN_MAX_AGE)
+    _database['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+
+# Log connection reuse counters (lawfirm/db/metrics.py) every N requests; 0 = never
+DB_METRICS_LOG_EVERY = int(os.environ.get('DB_METRICS_LOG_EVERY', '0'))
+
+
+# Cache
+# CACHE_BACKEND selects 'locmem' (per process, the default), 'file' (shared by
+# the workers of one host, under CACHE_LOCATION) or 'redis' (any server
+# speaking the Redis protocol at CACHE_URL; needs the redis package).
+# Anonymous content pages are cached for CACHE_PAGE_TIMEOUT seconds or until
+# their content changes (lawfirm/caching.py).
+# The invalidations of the page cache, site settings, replica pinning,
+# unread counts and sitemap are only seen by processes sharing the cache, so
+# locmem is refused when gunicorn runs more than one worker (WEB_CONCURRENCY,
+# which gunicorn reads as its default --workers).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+if CACHE_BACKEND == 'locmem' and WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        f'CACHE_BACKEND=locmem is private to each process; set CACHE_BACKEND to file or redis '
+        f'to run {WEB_CONCURRENCY} workers'
+    )
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'dadgan',
+            'TIMEOUT': 300,
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'TIMEOUT': 300,
+            # Culling past MAX_ENTRIES could drop the cache generations
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '20000'))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dadgan',
+            'TIMEOUT': 300,
+        }
+    }
+
+CACHE_PAGE_TIMEOUT = int(os.environ.get('CACHE_PAGE_TIMEOUT', '600'))
+# Each process keeps its copy of the SiteSettings row for at most this many
+# seconds, even when it missed the cache bump of a save
+SITE_SETTINGS_TTL = int(os.environ.get('SITE_SETTINGS_TTL', '60'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,6 +266,70 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Buffered view counters (lawfirm/counters.py)
+# Page views are kept in the cache and written back in batches once
+# VIEW_COUNTER_FLUSH_THRESHOLD hits are pending or every
+# VIEW_COUNTER_FLUSH_INTERVAL seconds, after the response that made the
+# flush due or from an idle run_worker.
+# Buffering needs atomic add/incr (redis or locmem, not the file cache);
+# on other backends every view is written straight to the database.
+VIEW_COUNTER_CACHE = os.environ.get('VIEW_COUNTER_CACHE', 'default')
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', '30'))
+VIEW_COUNTER_FLUSH_THRESHOLD = int(os.environ.get('VIEW_COUNTER_FLUSH_THRESHOLD', '100'))
+
+# Query instrumentation (lawfirm/middleware.py)
+# Adds X-DB-Queries / X-DB-Time response headers and logs requests above
+# QUERY_COUNT_WARN_QUERIES queries or QUERY_COUNT_WARN_MS of database time.
+QUERY_COUNT_HEADERS = os.environ.get('QUERY_COUNT_HEADERS', str(DEBUG)) == 'True'
+QUERY_COUNT_WARN_QUERIES = int(os.environ.get('QUERY_COUNT_WARN_QUERIES', '50'))
+QUERY_COUNT_WARN_MS = int(os.environ.get('QUERY_COUNT_WARN_MS', '500'))
+
+# Search engine (lawfirm/fulltext)
+# 'database' uses MySQL FULLTEXT / SQLite FTS5; 'inverted' answers queries from
+# a self-contained Persian inverted index file at SEARCH_INDEX_PATH, for
+# databases without a Persian-capable FULLTEXT parser.
+SEARCH_ENGINE = os.environ.get('SEARCH_ENGINE', 'database')
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', str(BASE_DIR / 'search_index' / 'lawfirm.idx'))
+
+# Background jobs (lawfirm/jobs.py)
+# Notifications and other side effects run in the web process right after the
+# request's transaction commits, and only jobs that fail there are queued in
+# the database for `manage.py run_worker`.  Set JOBS_RUN_INLINE=False where a
+# worker is running to queue every job for it instead.  Failed jobs are
+# retried after JOBS_RETRY_DELAY seconds, doubling each time, up to
+# JOBS_MAX_ATTEMPTS times.  Jobs still pending JOBS_BACKLOG_AGE seconds after
+# they were due are logged as an error (is a worker running?).
+JOBS_RUN_INLINE = os.environ.get('JOBS_RUN_INLINE', 'True') == 'True'
+JOBS_BATCH_SIZE = int(os.environ.get('JOBS_BATCH_SIZE', '100'))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', '2'))
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', '5'))
+JOBS_RETRY_DELAY = int(os.environ.get('JOBS_RETRY_DELAY', '30'))
+JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', '300'))
+JOBS_BACKLOG_AGE = int(os.environ.get('JOBS_BACKLOG_AGE', '600'))
+
+# Unread notification badge (lawfirm/notifications.py)
+# Per-user unread counts are cached for at most NOTIFICATION_COUNT_TIMEOUT
+# seconds; they are recounted whenever the user gets a notification, the
+# timeout only bounds a missed reset after notifications were read.
+NOTIFICATION_COUNT_TIMEOUT = int(os.environ.get('NOTIFICATION_COUNT_TIMEOUT', '300'))
+# `manage.py compact_notifications` deletes read notifications, and withdrawn
+# broadcasts, older than this many days
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Live notification stream (lawfirm/notifications.py, needs the ASGI server)
+# Each open stream is woken at once by changes made in its own process and
+# checks the database every NOTIFICATION_STREAM_POLL seconds for changes made
+# elsewhere; it is closed, and the browser reconnects, after
+# NOTIFICATION_STREAM_LIFETIME seconds.
+NOTIFICATION_STREAM_POLL = int(os.environ.get('NOTIFICATION_STREAM_POLL', '15'))
+NOTIFICATION_STREAM_LIFETIME = int(os.environ.get('NOTIFICATION_STREAM_LIFETIME', '300'))
+
+# sitemap.xml (lawfirm/sitemaps.py): one document per SITEMAP_SHARD_SIZE
+# primary keys of each section (at most 50000), each cached until a row in it
+# changes or SITEMAP_CACHE_TIMEOUT seconds pass
+SITEMAP_SHARD_SIZE = int(os.environ.get('SITEMAP_SHARD_SIZE', '5000'))
+SITEMAP_CACHE_TIMEOUT = int(os.environ.get('SITEMAP_CACHE_TIMEOUT', '86400'))
+
 # Auth redirects
 LOGIN_URL = 'lawfirm:login'
 LOGIN_REDIRECT_URL = 'lawfirm:profile'
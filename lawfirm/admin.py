@@ -1,11 +1,23 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count
 from django.utils.html import format_html
 from django.utils import timezone
 from .models import (
     Category, BlogPost, QACategory, Question, Answer,
     ConsultationType, ConsultationRequest, ContactMessage,
-    Testimonial, SiteSettings, Notification
+    Testimonial, SiteSettings, Notification, Vote, Job, Broadcast
 )
+from . import answers, caching, consultations, fulltext, notifications, sitemaps
+from .fulltext import autocomplete
+
+
+def _posts_updated(pks):
+    """update() skips post_save: refresh what its signals would have, once committed"""
+    sitemaps.invalidate(BlogPost, pks)
+    transaction.on_commit(lambda: fulltext.reindex(BlogPost, pks))
+    transaction.on_commit(lambda: caching.invalidate_model(BlogPost))
+    transaction.on_commit(autocomplete.invalidate)
 
 
 @admin.register(Category)
@@ -60,17 +72,23 @@ class BlogPostAdmin(admin.ModelAdmin):
     published_badge.short_description = 'وضعیت انتشار'
 
     def publish_posts(self, request, queryset):
-        updated = queryset.update(published=True)
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(published=True, updated_at=timezone.now())
+        _posts_updated(pks)
         self.message_user(request, f'{updated} مقاله منتشر شد.')
     publish_posts.short_description = 'انتشار مقالات انتخاب شده'
 
     def unpublish_posts(self, request, queryset):
-        updated = queryset.update(published=False)
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(published=False, updated_at=timezone.now())
+        _posts_updated(pks)
         self.message_user(request, f'{updated} مقاله به پیش‌نویس تبدیل شد.')
     unpublish_posts.short_description = 'تبدیل به پیش‌نویس'
 
     def mark_as_featured(self, request, queryset):
         updated = queryset.update(featured=True)
+        # Featured posts are listed on the cached home page
+        transaction.on_commit(lambda: caching.invalidate_model(BlogPost))
         self.message_user(request, f'{updated} مقاله به عنوان ویژه علامت‌گذاری شد.')
     mark_as_featured.short_description = 'علامت‌گذاری به عنوان ویژه'
 
@@ -84,12 +102,12 @@ class QACategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ['title', 'asker_name', 'category', 'votes', 'views', 'is_answered', 'is_published', 'created_at']
+    list_display = ['title', 'asker_name', 'category', 'votes', 'views', 'published_answer_count', 'is_answered', 'is_published', 'created_at']
     list_filter = ['is_answered', 'is_published', 'category', 'created_at']
     search_fields = ['title', 'content', 'asker_name']
     prepopulated_fields = {'slug': ('title',)}
     list_editable = ['is_published']
-    readonly_fields = ['votes', 'views', 'is_answered', 'created_at', 'updated_at']
+    readonly_fields = ['votes', 'views', 'is_answered', 'answer_count', 'published_answer_count', 'created_at', 'updated_at']
     inlines = [AnswerInline]
     
     fieldsets = (
@@ -103,7 +121,7 @@ class QuestionAdmin(admin.ModelAdmin):
             'fields': ('is_published',)
         }),
         ('آمار', {
-            'fields': ('votes', 'views', 'is_answered', 'created_at', 'updated_at'),
+            'fields': ('votes', 'views', 'is_answered', 'answer_count', 'published_answer_count', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         })
     )
@@ -117,13 +135,26 @@ class AnswerAdmin(admin.ModelAdmin):
     list_display = ['question_title', 'answerer_name', 'answerer_title', 'votes', 'is_best_answer', 'is_published', 'created_at']
     list_filter = ['is_best_answer', 'is_published', 'created_at']
     search_fields = ['content', 'answerer_name', 'question__title']
-    list_editable = ['is_best_answer', 'is_published']
+    # Best answers are chosen with the actions, which lock the question
+    list_editable = ['is_published']
+    list_select_related = ['question']
     readonly_fields = ['votes', 'created_at', 'updated_at']
+    actions = ['mark_best_answer', 'unmark_best_answer']
 
     def question_title(self, obj):
         return obj.question.title[:50] + '...' if len(obj.question.title) > 50 else obj.question.title
     question_title.short_description = 'سوال'
 
+    def mark_best_answer(self, request, queryset):
+        updated = answers.mark_best_answers(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'بهترین پاسخ {updated} سوال تعیین شد.')
+    mark_best_answer.short_description = 'انتخاب به عنوان بهترین پاسخ'
+
+    def unmark_best_answer(self, request, queryset):
+        updated = answers.unmark_best_answers(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'{updated} پاسخ از بهترین پاسخ خارج شد.')
+    unmark_best_answer.short_description = 'حذف از بهترین پاسخ'
+
 
 @admin.register(ConsultationType)
 class ConsultationTypeAdmin(admin.ModelAdmin):
@@ -176,17 +207,17 @@ class ConsultationRequestAdmin(admin.ModelAdmin):
     status_badge.short_description = 'وضعیت'
 
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.update(status='confirmed')
+        updated = consultations.set_status(queryset, 'confirmed')
         self.message_user(request, f'{updated} درخواست به عنوان تأیید شده علامت‌گذاری شد.')
     mark_as_confirmed.short_description = 'تأیید درخواست‌های انتخاب شده'
 
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = consultations.set_status(queryset, 'completed')
         self.message_user(request, f'{updated} درخواست به عنوان انجام شده علامت‌گذاری شد.')
     mark_as_completed.short_description = 'علامت‌گذاری به عنوان انجام شده'
 
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = consultations.set_status(queryset, 'cancelled')
         self.message_user(request, f'{updated} درخواست لغو شد.')
     mark_as_cancelled.short_description = 'لغو درخواست‌های انتخاب شده'
 
@@ -266,7 +297,7 @@ class SiteSettingsAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         # Only allow one instance
-        return not SiteSettings.objects.exists()
+        return SiteSettings.load() is None
 
 
     def has_delete_permission(self, request, obj=None):
@@ -306,15 +337,65 @@ class NotificationAdmin(admin.ModelAdmin):
     is_read_badge.short_description = 'وضعیت خواندن'
 
     def mark_as_read(self, request, queryset):
-        updated = queryset.update(is_read=True)
+        updated = self._set_read(queryset, True)
         self.message_user(request, f'{updated} اطلاع به عنوان خوانده شده علامت‌گذاری شد.')
     mark_as_read.short_description = 'علامت‌گذاری به عنوان خوانده شده'
 
     def mark_as_unread(self, request, queryset):
-        updated = queryset.update(is_read=False)
+        updated = self._set_read(queryset, False)
         self.message_user(request, f'{updated} اطلاع به عنوان خوانده نشده علامت‌گذاری شد.')
     mark_as_unread.short_description = 'علامت‌گذاری به عنوان خوانده نشده'
 
+    def _set_read(self, queryset, is_read):
+        # update() skips post_save, so reset the cached unread counts here
+        changed = queryset.exclude(is_read=is_read)
+        user_ids = set(changed.values_list('user', flat=True))
+        updated = changed.update(is_read=is_read)
+        for user_id in user_ids:
+            notifications.reset_unread(user_id)
+        return updated
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ['title', 'is_active', 'read_count', 'created_at']
+    list_editable = ['is_active']
+    list_filter = ['is_active', 'created_at']
+    search_fields = ['title', 'message']
+    readonly_fields = ['created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(read_count=Count('receipts'))
+
+    def read_count(self, obj):
+        return obj.read_count
+    read_count.short_description = 'تعداد خوانندگان'
+    read_count.admin_order_field = 'read_count'
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_display = ['voter', 'question', 'answer', 'value', 'created_at']
+    list_filter = ['value', 'created_at']
+    search_fields = ['voter', 'user__username']
+    raw_id_fields = ['user', 'question', 'answer']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'locked_by', 'created_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['name', 'payload', 'attempts', 'locked_at', 'locked_by', 'last_error', 'created_at']
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status=Job.FAILED).update(
+            status=Job.PENDING, attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} کار دوباره در صف قرار گرفت.')
+    retry_jobs.short_description = 'اجرای دوباره کارهای ناموفق'
+
 
 # Admin site customization
 admin.site.site_header = "مدیریت مؤسسه حقوقی دادگان"
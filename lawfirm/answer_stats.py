@@ -0,0 +1,65 @@
+"""
+Denormalized answer statistics of questions.
+
+``Question.answer_count``, ``published_answer_count`` and ``best_answer``
+(the published answer marked best) are copies of what the ``answers``
+relation says, so listings and the Q&A schema never have to query it.
+``refresh`` recomputes them for some questions in a single UPDATE; it runs in
+the same transaction as every ``Answer`` save and delete (see
+lawfirm/signals.py).  Bulk writes that bypass the signals are repaired with
+``manage.py repair_answer_stats``.
+"""
+
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Answer, Question
+
+FIELDS = ['answer_count', 'published_answer_count', 'best_answer']
+
+
+def _count(answers):
+    return Coalesce(Subquery(answers.values('question').annotate(count=Count('pk')).values('count')), 0)
+
+
+def refresh(*question_ids):
+    """Recompute the answer statistics of the given questions from their answers."""
+    answers = Answer.objects.filter(question=OuterRef('pk')).order_by()
+    published = answers.filter(is_published=True)
+    Question.objects.filter(pk__in=question_ids).update(
+        answer_count=_count(answers),
+        published_answer_count=_count(published),
+        best_answer=Subquery(published.filter(is_best_answer=True).order_by('pk').values('pk')[:1]),
+    )
+
+
+def reconcile(dry_run=False, batch_size=500):
+    """
+    Recompute the answer statistics of every question.
+
+    Returns the number of questions whose statistics were out of date.
+    """
+    counts = {
+        row['question']: (row['total'], row['published'])
+        for row in Answer.objects.order_by().values('question').annotate(
+            total=Count('pk'), published=Count('pk', filter=Q(is_published=True)),
+        )
+    }
+    best_answers = {}
+    for question_id, answer_id in (
+        Answer.objects.filter(is_published=True, is_best_answer=True)
+        .order_by('-pk').values_list('question', 'pk')
+    ):
+        # Descending, so the lowest pk wins as in refresh()
+        best_answers[question_id] = answer_id
+
+    stale = []
+    for question in Question.objects.only('pk', *FIELDS).iterator(chunk_size=2000):
+        expected = (*counts.get(question.pk, (0, 0)), best_answers.get(question.pk))
+        if (question.answer_count, question.published_answer_count, question.best_answer_id) != expected:
+            question.answer_count, question.published_answer_count, question.best_answer_id = expected
+            stale.append(question)
+
+    if stale and not dry_run:
+        Question.objects.bulk_update(stale, FIELDS, batch_size=batch_size)
+    return len(stale)
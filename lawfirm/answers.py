@@ -0,0 +1,90 @@
+"""
+Best-answer selection.
+
+A question has at most one answer with ``is_best_answer`` set, and marking
+one answers the question (``Question.is_answered``).  ``mark_best_answers``
+does the unmark / mark / question flag for any number of questions in one
+transaction: the questions are locked with ``SELECT ... FOR UPDATE`` (in pk
+order, so concurrent calls cannot deadlock), and questions whose best
+answer is already the requested one are not written at all.
+
+Rows are changed with ``UPDATE`` statements, so the page cache and the
+question answer statistics are refreshed here rather than by model signals.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import answer_stats, caching
+from .db import router as db_router
+from .models import Answer, Question
+
+
+def _changed(question_ids):
+    answer_stats.refresh(*question_ids)
+    caching.invalidate_model(Answer)
+    transaction.on_commit(db_router.content_changed)
+
+
+def mark_best_answers(answer_ids):
+    """
+    Make each of ``answer_ids`` the best answer of its question.  When several
+    belong to the same question, the most recent one wins.
+
+    Returns the number of questions whose best answer changed.
+    """
+    with transaction.atomic():
+        chosen = dict(
+            Answer.objects.filter(pk__in=answer_ids).order_by('created_at', 'pk').values_list('question', 'pk')
+        )
+        if not chosen:
+            return 0
+        unanswered = [
+            pk for pk, is_answered in Question.objects.select_for_update()
+            .filter(pk__in=chosen).order_by('pk').values_list('pk', 'is_answered')
+            if not is_answered
+        ]
+
+        current = defaultdict(set)
+        for question_id, answer_id in Answer.objects.filter(
+            question__in=chosen, is_best_answer=True,
+        ).values_list('question', 'pk'):
+            current[question_id].add(answer_id)
+
+        changed = [question_id for question_id, answer_id in chosen.items() if current[question_id] != {answer_id}]
+        unmark = [
+            answer_id for question_id in changed
+            for answer_id in current[question_id] if answer_id != chosen[question_id]
+        ]
+        mark = [chosen[question_id] for question_id in changed if chosen[question_id] not in current[question_id]]
+
+        if unmark:
+            Answer.objects.filter(pk__in=unmark).update(is_best_answer=False)
+        if mark:
+            Answer.objects.filter(pk__in=mark).update(is_best_answer=True)
+        if unanswered:
+            Question.objects.filter(pk__in=unanswered).update(is_answered=True)
+        if changed or unanswered:
+            _changed({*changed, *unanswered})
+    return len(changed)
+
+
+def mark_best_answer(answer):
+    """Make ``answer`` its question's only best answer; ``False`` if it already was."""
+    return mark_best_answers([answer.pk]) > 0
+
+
+def unmark_best_answers(answer_ids):
+    """Clear the best-answer mark of ``answer_ids``; returns how many had it."""
+    with transaction.atomic():
+        question_ids = list(
+            Answer.objects.filter(pk__in=answer_ids, is_best_answer=True)
+            .order_by().values_list('question', flat=True).distinct()
+        )
+        if not question_ids:
+            return 0
+        list(Question.objects.select_for_update().filter(pk__in=question_ids).order_by('pk').values_list('pk'))
+        unmarked = Answer.objects.filter(pk__in=answer_ids, is_best_answer=True).update(is_best_answer=False)
+        _changed(question_ids)
+    return unmarked
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the public pages (``manage.py bench``).
+
+A run creates a throwaway test database, seeds it with thousands of posts,
+questions and answers (``dataset``), then requests every page of
+``runner.PAGES`` through the Django test client and through a threaded
+WSGI server on a local port, recording throughput and p50/p95/p99
+latency.  Results are written as JSON so runs from different commits can
+be compared with ``manage.py bench --compare <earlier.json>``.
+"""
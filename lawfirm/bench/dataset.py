@@ -0,0 +1,110 @@
+"""Synthetic content for benchmark runs."""
+
+import random
+
+from django.contrib.auth.models import User
+
+from .. import answer_stats, fulltext
+from ..fulltext import autocomplete
+from ..models import (
+    Answer, BlogPost, Category, ConsultationType, QACategory, Question, SiteSettings, Testimonial
+)
+
+BATCH_SIZE = 1000
+
+WORDS = [
+    'قرارداد', 'طلاق', 'مهریه', 'ارث', 'چک', 'سفته', 'اجاره', 'ملک', 'دیه', 'شکایت',
+    'دادگاه', 'وکیل', 'حضانت', 'نفقه', 'کلاهبرداری', 'تصرف', 'سند', 'وصیت', 'شرکت', 'بیمه',
+]
+
+# Terms used for the search pages; all of them occur in the generated titles
+SEARCH_TERMS = WORDS[:10]
+
+ANSWERS_PER_QUESTION = 3
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(thousands=1, random_seed=0):
+    """
+    Create ``thousands`` x 1000 published blog posts and questions, with
+    ``ANSWERS_PER_QUESTION`` answers each.  Returns the slugs of the posts
+    and questions so detail pages can be cycled through.
+    """
+    rng = random.Random(random_seed)
+    count = int(thousands * 1000)
+
+    author = User.objects.create_user('bench-author', 'bench@dadgan.com', 'bench-author', first_name='وکیل')
+    SiteSettings.invalidate()
+    SiteSettings.objects.create(
+        site_description='مؤسسه حقوقی', phone='02100000000', email='info@dadgan.com', address='تهران'
+    )
+    ConsultationType.objects.create(name='مشاوره حضوری', price=500000, duration=60, description='مشاوره')
+    Testimonial.objects.bulk_create(Testimonial(name=f'موکل {i}', content=_sentence(rng, 20)) for i in range(3))
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'حقوق {word}', slug=f'category-{i}') for i, word in enumerate(WORDS[:8])
+    )
+    BlogPost.objects.bulk_create(
+        (
+            BlogPost(
+                title=f'{_sentence(rng, 5)} {i}',
+                slug=f'bench-post-{i}',
+                author=author,
+                category=rng.choice(categories),
+                excerpt=_sentence(rng, 30),
+                content='\n\n'.join(_sentence(rng, 80) for _ in range(8)),
+                published=True,
+            )
+            for i in range(count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    qa_categories = QACategory.objects.bulk_create(
+        QACategory(name=f'پرسش {word}', slug=f'topic-{i}') for i, word in enumerate(WORDS[:8])
+    )
+    Question.objects.bulk_create(
+        (
+            Question(
+                title=f'{_sentence(rng, 6)} {i}؟',
+                slug=f'bench-question-{i}',
+                content=_sentence(rng, 60),
+                asker_name='پرسنده',
+                asker_email='asker@dadgan.com',
+                category=rng.choice(qa_categories),
+                is_answered=True,
+                is_published=True,
+            )
+            for i in range(count)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Answer.objects.bulk_create(
+        (
+            Answer(
+                question_id=question_id,
+                content=_sentence(rng, 120),
+                answerer_name='وکیل',
+                votes=rng.randint(0, 20),
+                is_best_answer=(n == 0),
+                is_published=True,
+            )
+            for question_id in Question.objects.values_list('pk', flat=True).iterator()
+            for n in range(ANSWERS_PER_QUESTION)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    answer_stats.reconcile()
+    fulltext.rebuild()
+    if fulltext.inverted.is_enabled():
+        fulltext.inverted.rebuild()
+    autocomplete.invalidate()
+
+    return {
+        'blog_detail': list(BlogPost.objects.values_list('slug', flat=True)),
+        'qa_detail': list(Question.objects.values_list('slug', flat=True)),
+    }
@@ -0,0 +1,131 @@
+"""Request drivers and latency statistics for benchmark runs."""
+
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+
+from .dataset import SEARCH_TERMS
+
+PAGES = ['home', 'blog_list', 'blog_detail', 'qa_list', 'qa_detail', 'search', 'search_api']
+
+
+def page_urls(page, slugs, count):
+    """
+    Return ``count`` URLs for ``page``.  Detail pages cycle through every
+    seeded object and search pages through ``SEARCH_TERMS``, so runs measure
+    a realistic mix of cache hits and misses rather than one hot URL.
+    """
+    if page in ('blog_detail', 'qa_detail'):
+        values = itertools.cycle(slugs[page])
+        return [reverse(f'lawfirm:{page}', kwargs={'slug': next(values)}) for _ in range(count)]
+    url = reverse(f'lawfirm:{page}')
+    if page in ('search', 'search_api'):
+        terms = itertools.cycle(SEARCH_TERMS)
+        return [f'{url}?q={quote(next(terms))}' for _ in range(count)]
+    return [url] * count
+
+
+class TestClientTarget:
+    """In-process requests through the Django test client (no network, one at a time)."""
+
+    name = 'test_client'
+    concurrency = 1
+
+    def __init__(self, session_cookie=None):
+        self.client = Client()
+        if session_cookie:
+            self.client.cookies[session_cookie[0]] = session_cookie[1]
+
+    def fetch(self, url):
+        return self.client.get(url).status_code
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGITarget:
+    """HTTP requests against a threaded WSGI server on a local port."""
+
+    name = 'wsgi'
+
+    def __init__(self, concurrency=4, session_cookie=None):
+        self.concurrency = concurrency
+        self.headers = {'Cookie': f'{session_cookie[0]}={session_cookie[1]}'} if session_cookie else {}
+        self.server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(),
+            server_class=ThreadedWSGIServer, handler_class=QuietRequestHandler,
+        )
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def fetch(self, url):
+        try:
+            with urlopen(Request(self.base_url + url, headers=self.headers), timeout=30) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _timed_fetch(target, url):
+    start = time.perf_counter()
+    status = target.fetch(url)
+    return time.perf_counter() - start, status
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2),
+    }
+
+
+def measure(target, urls, warmup=0):
+    """Request every URL of ``urls`` on ``target``; return the summary statistics."""
+    for url in urls[:warmup]:
+        target.fetch(url)
+
+    start = time.perf_counter()
+    if target.concurrency == 1:
+        results = [_timed_fetch(target, url) for url in urls]
+    else:
+        with ThreadPoolExecutor(max_workers=target.concurrency) as pool:
+            results = list(pool.map(lambda url: _timed_fetch(target, url), urls))
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for _, status in results if status != 200)
+    return summarize([latency for latency, _ in results], errors, elapsed)
@@ -0,0 +1,157 @@
+"""
+Page and fragment caching for the public content pages.
+
+Cached data is keyed on a *generation* number per content group ('blog',
+'qa', 'site').  Saving or deleting any model that feeds a group bumps its
+generation (see lawfirm/signals.py), so every page or fragment built from
+the old data simply stops being looked up and expires on its own; nothing
+has to enumerate the keys it invalidates.
+
+``cache_page_for_anonymous`` serves whole GET responses to anonymous
+visitors from the cache.  Every page carries a ``{% csrf_token %}`` (the
+live-search form in base.html), so the token value is cut out before a
+response is stored and the current visitor's token is put back on each hit.
+Logged-in users get freshly rendered pages, with the expensive listings
+wrapped in ``{% cache %}`` fragments keyed on the same generations.
+"""
+
+import hashlib
+import re
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .counters import record_view
+from .models import (
+    Answer, BlogPost, Category, ConsultationType, QACategory, Question, SiteSettings, Testimonial
+)
+
+GENERATION_KEY = 'cachegen:{}'
+
+# Content group(s) each model feeds
+DEPENDENCIES = {
+    BlogPost: ('blog',),
+    Category: ('blog',),
+    Question: ('qa',),
+    Answer: ('qa',),
+    QACategory: ('qa',),
+    Testimonial: ('site',),
+    ConsultationType: ('site',),
+    SiteSettings: ('site',),
+}
+
+GROUPS = sorted({group for groups in DEPENDENCIES.values() for group in groups})
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b'__csrf_token__'
+
+
+def page_timeout():
+    return getattr(settings, 'CACHE_PAGE_TIMEOUT', 600)
+
+
+def get_generations(groups):
+    """Return the current generation of each group in ``groups``, in order."""
+    keys = [GENERATION_KEY.format(group) for group in groups]
+    values = cache.get_many(keys)
+    return tuple(values.get(key, 0) for key in keys)
+
+
+def bump(*groups):
+    """Invalidate everything cached from ``groups``."""
+    for group in groups:
+        key = GENERATION_KEY.format(group)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def invalidate_model(model):
+    bump(*DEPENDENCIES.get(model, ()))
+
+
+class CacheVersions:
+    """
+    Template-side view of the group generations, for ``{% cache %}`` keys::
+
+        {% cache fragment_cache_timeout blog_list cache_versions.blog request.get_full_path %}
+
+    The generations are fetched (in one ``get_many``) on first use only.
+    """
+
+    def __init__(self):
+        self._versions = None
+
+    def __getitem__(self, group):
+        if self._versions is None:
+            self._versions = dict(zip(GROUPS, get_generations(GROUPS)))
+        return self._versions[group]
+
+
+def page_cache_key(request, name, groups):
+    params = sorted(request.GET.lists())
+    location = f'{request.scheme}://{request.get_host()}{request.path}?{params}'
+    digest = hashlib.md5(location.encode()).hexdigest()
+    generations = '.'.join(map(str, get_generations(groups)))
+    return f'page:{name}:{generations}:{digest}'
+
+
+def _is_cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # A pending flash message would be baked into the page
+    return len(get_messages(request)) == 0
+
+
+def track_views(response, obj):
+    """Make cache hits of ``response`` count as views of ``obj``."""
+    response.page_cache_views = (obj._meta.label_lower, obj.pk)
+    return response
+
+
+def cache_page_for_anonymous(*groups):
+    """
+    Serve the decorated view's GET responses to anonymous visitors from the
+    cache until one of ``groups`` changes or ``CACHE_PAGE_TIMEOUT`` passes.
+    The key covers scheme, host, path and querystring.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, view.__name__, groups)
+            entry = cache.get(key)
+            if entry is not None:
+                content, content_type, views = entry
+                if views:
+                    label, pk = views
+                    record_view(apps.get_model(label), pk)
+                response = HttpResponse(
+                    content.replace(CSRF_PLACEHOLDER, get_token(request).encode()),
+                    content_type=content_type,
+                )
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if request.method == 'GET' and response.status_code == 200 and not (
+                response.streaming or response.cookies
+            ):
+                content = CSRF_INPUT_RE.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+                views = getattr(response, 'page_cache_views', None)
+                cache.set(key, (content, response['Content-Type'], views), page_timeout())
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,15 @@
+from .caching import CacheVersions, page_timeout
+from .models import SiteSettings
+
+
+def cache_versions(request):
+    """Generation numbers and timeout for ``{% cache %}`` fragment keys"""
+    return {
+        'cache_versions': CacheVersions(),
+        'fragment_cache_timeout': page_timeout(),
+    }
+
+
+def site_settings(request):
+    """Site title, contact details and stats for every template"""
+    return {'site_settings': SiteSettings.load()}
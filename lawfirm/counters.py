@@ -0,0 +1,267 @@
+"""
+Buffered (write-behind) view counters for BlogPost and Question.
+
+Page hits are accumulated in the cache instead of being written to the
+database on every request.  Pending hits are written back in batched
+``UPDATE ... SET views = views + n`` statements once enough hits have piled
+up or the flush interval has elapsed.  The flush never runs inside the
+request that makes it due: it is done once that response has been sent
+(``request_finished``), by an idle ``manage.py run_worker``, or on demand by
+``manage.py flush_view_counts``.  Pages show the ``views`` column as stored,
+so a count lags by up to one flush.
+
+Each object has its own counter key, bumped with ``cache.incr``.  The flusher
+finds the keys through a registry that needs no read-modify-write: the hit
+that takes a counter from 0 to 1 takes the next number of a sequence (again
+``cache.incr``) and adds its key to that numbered slot with ``cache.add``.
+A flush reads the slots filled since the last one.  A slot it finds empty is claimed
+with ``cache.add`` so the hit still writing it takes another number instead,
+and a counter that picked up hits while it was being written back is
+registered again by the flusher, so no pending count goes unregistered.
+
+All of this relies on ``cache.add`` and ``cache.incr`` being atomic, which
+holds for Redis, memcached and the local-memory backend, but not for the
+file or database caches, where both are a read followed by a write and
+concurrent workers lose hits and can flush the same hits twice.  On those
+backends views are not buffered: ``record_view`` issues the single
+``UPDATE ... SET views = views + 1`` itself.
+
+With Redis or memcached every worker feeds the same buffer; with the
+local-memory backend each worker buffers its own hits and flushes them itself.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'viewcount'
+SEQUENCE_KEY = f'{KEY_PREFIX}:sequence'
+FLUSHED_KEY = f'{KEY_PREFIX}:flushed'
+PENDING_KEY = f'{KEY_PREFIX}:pending'
+LAST_FLUSH_KEY = f'{KEY_PREFIX}:last_flush'
+LOCK_KEY = f'{KEY_PREFIX}:lock'
+LOCK_TIMEOUT = 60
+# Left in a slot found empty; outlives any hit still about to fill it
+SKIPPED = '-'
+SKIPPED_TIMEOUT = 3600
+
+# Backends whose add() and incr() are atomic for every process sharing them
+ATOMIC_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+}
+
+# Set by record_view once a flush is due, acted on after the response
+_local = threading.local()
+_warned = False
+
+
+def _cache_alias():
+    return getattr(settings, 'VIEW_COUNTER_CACHE', 'default')
+
+
+def _get_cache():
+    return caches[_cache_alias()]
+
+
+def is_buffered():
+    """Whether the counter cache is safe to buffer views in."""
+    return settings.CACHES[_cache_alias()]['BACKEND'] in ATOMIC_BACKENDS
+
+
+def _counter_key(label, pk):
+    return f'{KEY_PREFIX}:{label}:{pk}'
+
+
+def _slot_key(number):
+    return f'{KEY_PREFIX}:slot:{number}'
+
+
+def _incr(cache, key, delta=1):
+    """Atomically increment ``key``, creating it if needed."""
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key was evicted between add() and incr()
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def _register(cache, key):
+    """Put ``key`` in the next free slot of the registry."""
+    while True:
+        if cache.add(SEQUENCE_KEY, 0, timeout=None):
+            # The sequence was evicted and numbering starts over: so must the flusher
+            cache.set(FLUSHED_KEY, 0, timeout=None)
+        try:
+            number = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            continue
+        if cache.add(_slot_key(number), key, timeout=None):
+            return
+        # The flusher gave up on this slot before it was filled
+
+
+def _flush_due(cache, pending):
+    if pending >= getattr(settings, 'VIEW_COUNTER_FLUSH_THRESHOLD', 100):
+        return True
+    last_flush = cache.get(LAST_FLUSH_KEY)
+    if last_flush is None:
+        cache.add(LAST_FLUSH_KEY, time.time(), timeout=None)
+        return False
+    return time.time() - last_flush >= getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30)
+
+
+def record_view(obj, pk=None):
+    """
+    Record one view of ``obj`` (a model instance, or a model class plus ``pk``).
+
+    Returns the number of views waiting to be written for that object, which
+    is always 0 when the counter cache cannot buffer them.
+    """
+    global _warned
+    model = obj if isinstance(obj, type) else type(obj)
+    if pk is None:
+        pk = obj.pk
+    if not is_buffered():
+        if not _warned:
+            _warned = True
+            logger.warning(
+                'Cache %r cannot buffer view counts atomically; writing each view to the database',
+                _cache_alias(),
+            )
+        model._default_manager.filter(pk=pk).update(views=F('views') + 1)
+        return 0
+    cache = _get_cache()
+    key = _counter_key(model._meta.label_lower, pk)
+
+    pending_for_obj = _incr(cache, key)
+    if pending_for_obj == 1:
+        # The first hit since the last flush registers the key
+        _register(cache, key)
+
+    if _flush_due(cache, _incr(cache, PENDING_KEY)):
+        _local.flush_requested = True
+    return pending_for_obj
+
+
+def pending_views(obj):
+    """Return the number of buffered, not yet flushed views of ``obj``."""
+    return _get_cache().get(_counter_key(obj._meta.label_lower, obj.pk)) or 0
+
+
+def flush_if_requested():
+    """Flush if a view recorded in this thread made it due; see ``request_finished``."""
+    if getattr(_local, 'flush_requested', False):
+        _local.flush_requested = False
+        flush()
+
+
+def flush_if_due():
+    """Flush if the interval or threshold has been reached; for ``run_worker``."""
+    cache = _get_cache()
+    if _flush_due(cache, cache.get(PENDING_KEY) or 0):
+        flush()
+
+
+def _registered_keys(cache):
+    """The counter keys registered since the last flush; marks their slots as read."""
+    done = cache.get(FLUSHED_KEY) or 0
+    last = cache.get(SEQUENCE_KEY) or 0
+    if done > last:
+        # The sequence was evicted and restarted
+        done = 0
+    slots = [_slot_key(number) for number in range(done + 1, last + 1)]
+    registered = cache.get_many(slots)
+    keys = set()
+    skipped = []
+    for slot in slots:
+        key = registered.get(slot)
+        if key is None:
+            if cache.add(slot, SKIPPED, timeout=SKIPPED_TIMEOUT):
+                # Its hit is between taking the number and filling the slot
+                # and will take another number
+                skipped.append(slot)
+                continue
+            key = cache.get(slot)
+        if key is not None and key != SKIPPED:
+            keys.add(key)
+    cache.set(FLUSHED_KEY, last, timeout=None)
+    if (cache.get(SEQUENCE_KEY) or 0) < last:
+        # Restarted since it was read: the new numbers have not been read yet
+        cache.set(FLUSHED_KEY, 0, timeout=None)
+    cache.delete_many([slot for slot in slots if slot not in skipped])
+    return keys
+
+
+def flush():
+    """
+    Write all buffered views to the database.
+
+    Objects with the same number of pending hits are updated together, so a
+    flush issues one UPDATE per (model, hit count) pair. Returns the number of
+    views written, or ``None`` if another process is already flushing.
+    """
+    if not is_buffered():
+        # Nothing is buffered, and the lock would not be one
+        return 0
+    cache = _get_cache()
+    if not cache.add(LOCK_KEY, True, timeout=LOCK_TIMEOUT):
+        return None
+
+    try:
+        cache.set(LAST_FLUSH_KEY, time.time(), timeout=None)
+        cache.set(PENDING_KEY, 0, timeout=None)
+        counts = cache.get_many(_registered_keys(cache))
+
+        grouped = defaultdict(lambda: defaultdict(list))
+        for key, count in counts.items():
+            if not count:
+                continue
+            label, pk = key[len(KEY_PREFIX) + 1:].rsplit(':', 1)
+            grouped[label][count].append(pk)
+        if not grouped:
+            return 0
+
+        total = 0
+        with transaction.atomic():
+            for label, by_count in grouped.items():
+                manager = apps.get_model(label)._default_manager
+                for count, pks in by_count.items():
+                    manager.filter(pk__in=pks).update(views=F('views') + count)
+                    total += count * len(pks)
+
+        # Subtract only what was written; hits recorded meanwhile stay buffered
+        # and, having found the counter above zero, were not registered.
+        for key, count in counts.items():
+            if count:
+                try:
+                    left = cache.decr(key, count)
+                except ValueError:
+                    continue
+                if left > 0:
+                    _register(cache, key)
+        return total
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Failed to flush buffered view counts at exit')
@@ -0,0 +1,8 @@
+"""
+Database connection management.
+
+``pool`` keeps idle connections for reuse across the threads of a process,
+``backends.mysql`` is the MySQL backend that draws from it, and
+``metrics`` counts how often requests reuse a connection rather than
+opening one.  See the Database section of dadgan_project/settings.py.
+"""
@@ -0,0 +1,46 @@
+"""
+MySQL backend that recycles connections through ``lawfirm.db.pool``.
+
+Selected in settings.py when ``DB_POOL_SIZE`` is set.  Pool options live in
+the ``POOL`` key of the database settings::
+
+    'POOL': {'SIZE': 10, 'RECYCLE': 3600}
+"""
+
+from django.db.backends.mysql import base
+
+from ...pool import get_pool
+
+
+def ping(connection):
+    try:
+        connection.ping()
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(self.alias, options.get('SIZE', 10), options.get('RECYCLE', 3600), ping)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire()
+        if connection is None:
+            connection = super().get_new_connection(conn_params)
+            self.pool.register(connection)
+        return connection
+
+    def _close(self):
+        # Connections in a transaction or after an error are really closed
+        if (
+            self.connection is not None
+            and self.autocommit
+            and not self.in_atomic_block
+            and not self.errors_occurred
+            and self.pool.release(self.connection)
+        ):
+            return
+        return super()._close()
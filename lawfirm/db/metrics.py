@@ -0,0 +1,55 @@
+"""
+Per-process counters of database connection reuse.
+
+``requests``      requests handled
+``connects``      times Django had to (re)connect, pooled or not
+``pool_hits``     connects served by an idle pooled connection
+``pool_misses``   connects that had to open a new server connection
+``pool_discards`` pooled connections closed as dead, too old or surplus
+``replica_reads`` reads routed to a read replica
+``replica_skips`` replica checks that found it lagging or unreachable
+
+A summary is logged to ``lawfirm.db`` every ``DB_METRICS_LOG_EVERY``
+requests (0 disables it).
+"""
+
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger('lawfirm.db')
+
+_counts = Counter()
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counts[name] += amount
+        return _counts[name]
+
+
+def snapshot():
+    """Return the counters plus derived reuse ratios."""
+    with _lock:
+        counts = dict(_counts)
+    requests = counts.get('requests', 0)
+    connects = counts.get('connects', 0)
+    pooled = counts.get('pool_hits', 0) + counts.get('pool_misses', 0)
+    counts['connection_reuse'] = round(1 - connects / requests, 3) if requests else None
+    counts['pool_hit_rate'] = round(counts.get('pool_hits', 0) / pooled, 3) if pooled else None
+    return counts
+
+
+def reset():
+    with _lock:
+        _counts.clear()
+
+
+def request_finished():
+    requests = incr('requests')
+    every = getattr(settings, 'DB_METRICS_LOG_EVERY', 0)
+    if every and requests % every == 0:
+        logger.info('database connections: %s', snapshot())
@@ -0,0 +1,107 @@
+"""
+In-process pool of idle DB-API connections.
+
+Django gives every thread (and every async task running sync code) its own
+connection.  With threaded or async workers, persistent connections
+therefore multiply with the thread count and are lost when a thread ends.
+The pool instead keeps up to ``size`` idle connections per database alias
+and process: a connection is handed back after each request and picked up
+by whichever thread connects next.
+
+Connections older than ``recycle`` seconds are closed rather than reused
+(MySQL drops them after ``wait_timeout`` anyway), and a connection that has
+been idle for more than ``PING_AFTER`` seconds is pinged before reuse.
+Opening times are held in a ``WeakKeyDictionary``, so a connection closed
+outside the pool (e.g. by Django after an error) leaves nothing behind for
+a later connection to inherit.
+"""
+
+import threading
+import time
+import weakref
+from collections import deque
+
+from . import metrics
+
+PING_AFTER = 5
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, size, recycle=3600, ping=None):
+        self.size = size
+        self.recycle = recycle
+        self.ping = ping
+        self._idle = deque()
+        self._created = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._idle)
+
+    def register(self, connection):
+        """Record a newly opened connection so its age can be tracked."""
+        with self._lock:
+            self._created[connection] = time.monotonic()
+        metrics.incr('pool_misses')
+
+    def _expired(self, connection, now):
+        return now - self._created.get(connection, now) > self.recycle
+
+    def _discard(self, connection):
+        self._created.pop(connection, None)
+        metrics.incr('pool_discards')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Return a live idle connection, or ``None`` if a new one must be opened."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, idle_since = self._idle.pop()
+            now = time.monotonic()
+            if self._expired(connection, now):
+                self._discard(connection)
+                continue
+            if self.ping and now - idle_since > PING_AFTER and not self.ping(connection):
+                self._discard(connection)
+                continue
+            metrics.incr('pool_hits')
+            return connection
+
+    def release(self, connection):
+        """
+        Keep ``connection`` for reuse.  Returns ``False`` if the pool is full
+        or the connection is too old; the caller then closes it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.size and not self._expired(connection, now):
+                self._idle.append((connection, now))
+                return True
+            self._created.pop(connection, None)
+        metrics.incr('pool_discards')
+        return False
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+def get_pool(alias, size, recycle=3600, ping=None):
+    """Return the process-wide pool of database ``alias``, creating it on first use."""
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                pool = _pools[alias] = ConnectionPool(size, recycle, ping)
+    return pool
@@ -0,0 +1,154 @@
+"""
+Route content reads to read replicas.
+
+Replica aliases are listed in ``settings.DATABASE_REPLICAS`` (built from
+``DB_REPLICAS``).  During a request, reads of the public content models below
+go to one replica, chosen per request, and everything else goes to
+``default``.  A request is pinned to ``default``:
+
+* from its first write onwards, so it reads its own writes;
+* for its whole duration when it is a POST (or other unsafe method);
+* for ``DB_REPLICA_PIN_SECONDS`` after an unsafe request that wrote, via a
+  cookie, so the page a form redirects to shows the change.
+
+A replica that is more than ``DB_REPLICA_MAX_LAG`` seconds behind, or that
+cannot be reached, is skipped; its state is checked at most every
+``DB_REPLICA_CHECK_INTERVAL`` seconds per process.  For ``DB_REPLICA_MAX_LAG``
+seconds after any content change all requests read from ``default``, so pages
+and fragments cached under the new cache generation (lawfirm/caching.py) are
+not rebuilt from a replica that has not caught up yet.  Code running outside
+a request (management commands, workers) always uses ``default``.
+"""
+
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from . import metrics
+
+PIN_COOKIE = 'db_pin'
+CHANGED_KEY = 'db:content_changed'
+
+REPLICA_MODELS = {
+    'lawfirm.category',
+    'lawfirm.blogpost',
+    'lawfirm.qacategory',
+    'lawfirm.question',
+    'lawfirm.answer',
+    'lawfirm.consultationtype',
+    'lawfirm.testimonial',
+    'lawfirm.sitesettings',
+    'lawfirm.searchdocument',
+}
+
+_state = contextvars.ContextVar('db_routing', default=None)
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def start_request(pinned=False):
+    """Begin routing a request; returns a token for ``end_request``."""
+    return _state.set(RequestState(pinned))
+
+
+def end_request(token):
+    """Finish routing a request; returns its ``RequestState``."""
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def max_lag():
+    return getattr(settings, 'DB_REPLICA_MAX_LAG', 10)
+
+
+def content_changed():
+    """Note a committed content write the replicas may not have yet."""
+    if getattr(settings, 'DATABASE_REPLICAS', None):
+        cache.set(CHANGED_KEY, True, max_lag())
+
+
+def replica_lag(alias):
+    """
+    Seconds ``alias`` is behind its primary: 0 for a server that is not a
+    replica (or a non-MySQL database), ``None`` if replication is stopped.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            return 0
+        columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, row)).get('Seconds_Behind_Master')
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < getattr(settings, 'DB_REPLICA_CHECK_INTERVAL', 5):
+        return checked[1]
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        lag = None
+    healthy = lag is not None and lag <= max_lag()
+    with _health_lock:
+        _health[alias] = (now, healthy)
+    if not healthy:
+        metrics.incr('replica_skips')
+    return healthy
+
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        if state.replica is None:
+            healthy = []
+            if cache.get(CHANGED_KEY) is None:
+                healthy = [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+            state.replica = random.choice(healthy) if healthy else 'default'
+        if state.replica == 'default':
+            return None
+        metrics.incr('replica_reads')
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
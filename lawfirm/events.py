@@ -0,0 +1,49 @@
+"""
+In-process publish/subscribe for async views.
+
+An async view ``subscribe``s to a channel name and gets an ``asyncio.Event``
+that ``publish`` sets, from any thread, e.g. an ``on_commit`` callback of a
+sync view.  Events carry no data: subscribers re-read what they need, so a
+wake-up that is lost or merged with another costs nothing.
+
+Only subscribers in the publishing process are woken.  Events from other
+processes (other ASGI workers, ``manage.py run_worker``) are picked up by
+subscribers polling on a timeout, see ``notifications.stream``.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+
+
+@contextmanager
+def subscribe(*channels):
+    """Yield an ``asyncio.Event`` set whenever one of ``channels`` is published to."""
+    subscription = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        for channel in channels:
+            _subscribers[channel].add(subscription)
+    try:
+        yield subscription[1]
+    finally:
+        with _lock:
+            for channel in channels:
+                _subscribers[channel].discard(subscription)
+                if not _subscribers[channel]:
+                    del _subscribers[channel]
+
+
+def publish(*channels):
+    """Wake the subscribers of ``channels`` in this process."""
+    with _lock:
+        subscriptions = [subscription for channel in channels for subscription in _subscribers.get(channel, ())]
+    for loop, event in subscriptions:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # The subscriber's loop has closed
+            pass
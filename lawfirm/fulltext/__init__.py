@@ -0,0 +1,147 @@
+"""
+Full-text search for blog posts and questions.
+
+BlogPost and Question rows are mirrored into ``SearchDocument`` with
+Persian-normalized title/body text whenever they are saved (see
+lawfirm/signals.py).  The database indexes those rows with MySQL FULLTEXT or
+SQLite FTS5, so a query never scans the content tables themselves.
+
+With ``SEARCH_ENGINE = 'inverted'`` queries are answered instead by the
+pure-Python index in ``inverted``/``mmap_index``, which needs no database
+support at all.
+
+Views only use ``search()`` and ``suggest()``::
+
+    blogs = fulltext.search(BlogPost.objects.filter(published=True), query)
+"""
+
+from django.db.models import Case, IntegerField, When
+
+from ..models import BlogPost, Question, SearchDocument
+from . import inverted
+from .backends import get_backend
+from .normalize import normalize, query_terms
+
+__all__ = ['search', 'suggest', 'index_object', 'remove_object', 'reindex', 'rebuild', 'normalize', 'query_terms']
+
+# Upper bound on the ranked id list fetched from the index per query
+MAX_RESULTS = 500
+
+DOC_TYPES = {
+    BlogPost: 'blog',
+    Question: 'question',
+}
+
+# Fields whose change requires re-indexing the object
+INDEXED_FIELDS = {
+    BlogPost: {'title', 'excerpt', 'content', 'published'},
+    Question: {'title', 'content', 'is_published'},
+}
+
+
+def build_document(obj):
+    """Return the SearchDocument field values for a BlogPost or Question."""
+    if isinstance(obj, BlogPost):
+        return {
+            'title': normalize(obj.title),
+            'body': normalize(f'{obj.excerpt}\n{obj.content}'),
+            'published': obj.published,
+        }
+    return {
+        'title': normalize(obj.title),
+        'body': normalize(obj.content),
+        'published': obj.is_published,
+    }
+
+
+def index_object(obj):
+    """Create or refresh the search document of ``obj``."""
+    SearchDocument.objects.update_or_create(
+        doc_type=DOC_TYPES[type(obj)],
+        object_id=obj.pk,
+        defaults=build_document(obj),
+    )
+
+
+def remove_object(obj):
+    SearchDocument.objects.filter(doc_type=DOC_TYPES[type(obj)], object_id=obj.pk).delete()
+
+
+def reindex(model, pks):
+    """
+    Refresh the search documents of the ``model`` rows ``pks``, for writes
+    that skip post_save (``QuerySet.update``).
+    """
+    for obj in model.objects.filter(pk__in=pks):
+        index_object(obj)
+    if inverted.is_enabled():
+        inverted.refresh({(model, pk) for pk in pks})
+
+
+def rebuild(batch_size=500):
+    """Re-create every search document from scratch. Returns the number indexed."""
+    SearchDocument.objects.all().delete()
+    total = 0
+    for model, doc_type in DOC_TYPES.items():
+        documents = []
+        for obj in model.objects.iterator(chunk_size=batch_size):
+            documents.append(SearchDocument(doc_type=doc_type, object_id=obj.pk, **build_document(obj)))
+            if len(documents) >= batch_size:
+                SearchDocument.objects.bulk_create(documents)
+                total += len(documents)
+                documents = []
+        SearchDocument.objects.bulk_create(documents)
+        total += len(documents)
+    return total
+
+
+def search(queryset, query, limit=MAX_RESULTS):
+    """
+    Restrict ``queryset`` (of BlogPost or Question) to rows matching ``query``,
+    ordered by relevance; at most ``limit`` of them.
+    """
+    if not query_terms(query):
+        return queryset.none()
+
+    # The queryset's own filters go into the id query, ahead of ``limit``
+    ids = get_backend(queryset.db).search(DOC_TYPES[queryset.model], query, limit, within=queryset)
+    if not ids:
+        return queryset.none()
+
+    rank = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank')
+
+
+def suggest(query, limit=5):
+    """
+    Return live-search payloads (type, title, url, category, icon) for up to
+    ``limit`` blog posts followed by up to ``limit`` questions.
+    """
+    if inverted.is_enabled():
+        results = inverted.suggest(query, limit=limit)
+        if results is not None:
+            return results
+
+    blogs = search(BlogPost.objects.filter(published=True).for_listing(), query, limit=limit)
+    questions = search(Question.objects.filter(is_published=True).select_related('category'), query, limit=limit)
+    results = [
+        {
+            'type': 'blog',
+            'title': blog.title,
+            'url': blog.get_absolute_url(),
+            'category': blog.category.name,
+            'icon': 'fa-newspaper'
+        }
+        for blog in blogs
+    ]
+    results += [
+        {
+            'type': 'question',
+            'title': question.title,
+            'url': question.get_absolute_url(),
+            'category': question.category.name,
+            'icon': 'fa-question-circle'
+        }
+        for question in questions
+    ]
+    return results
@@ -0,0 +1,139 @@
+"""
+In-memory autocomplete for the live search box.
+
+Normalized titles of published posts/questions, every word-suffix of those
+titles, and category names are kept in one sorted list; a prefix lookup is
+a ``bisect`` plus a short scan.  Result payloads (title, url, category) are
+precomputed, so a suggestion request runs no database queries.
+
+Content signals store a new random version token in the cache; each
+process rebuilds its copy lazily the next time it serves a suggestion after
+a change.  A token, unlike a counter, cannot come back to a value a process
+already holds when the cache is cleared or the key evicted.
+"""
+
+import threading
+import uuid
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from ..models import BlogPost, Category, QACategory, Question
+from .normalize import normalize
+
+VERSION_KEY = 'autocomplete:version'
+
+# Matches scanned per lookup before ranking; bounds the cost of 1-2 letter prefixes
+MAX_CANDIDATES = 200
+
+
+class SuggestionIndex:
+    """Sorted (title suffix, position, entry) rows over precomputed payloads."""
+
+    def __init__(self, entries):
+        """``entries`` is a list of (title to match, payload) pairs."""
+        self.payloads = []
+        rows = []
+        for entry_no, (title, payload) in enumerate(entries):
+            self.payloads.append(payload)
+            words = normalize(title).split()
+            for position in range(len(words)):
+                # position 0 is the whole title; later ones start mid-title
+                rows.append((' '.join(words[position:]), position, entry_no))
+        rows.sort()
+        self.keys = [row[0] for row in rows]
+        self.rows = rows
+
+    def lookup(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        candidates = []
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and len(candidates) < MAX_CANDIDATES:
+            if not self.keys[index].startswith(prefix):
+                break
+            _, position, entry_no = self.rows[index]
+            candidates.append((position > 0, entry_no))
+            index += 1
+
+        # Title-start matches first, then by entry order (newest content first)
+        results, seen = [], set()
+        for _, entry_no in sorted(candidates):
+            if entry_no not in seen:
+                seen.add(entry_no)
+                results.append(self.payloads[entry_no])
+                if len(results) == limit:
+                    break
+        return results
+
+
+def build_entries():
+    entries = []
+    for post in BlogPost.objects.filter(published=True).select_related('category').only(
+        'title', 'slug', 'category__name'
+    ):
+        entries.append((post.title, {
+            'type': 'blog',
+            'title': post.title,
+            'url': post.get_absolute_url(),
+            'category': post.category.name,
+            'icon': 'fa-newspaper',
+        }))
+    for question in Question.objects.filter(is_published=True).select_related('category').only(
+        'title', 'slug', 'category__name'
+    ):
+        entries.append((question.title, {
+            'type': 'question',
+            'title': question.title,
+            'url': question.get_absolute_url(),
+            'category': question.category.name,
+            'icon': 'fa-question-circle',
+        }))
+    for model, url_name, section in (
+        (Category, 'lawfirm:blog_list', 'مقالات'),
+        (QACategory, 'lawfirm:qa_list', 'پرسش و پاسخ'),
+    ):
+        for name, slug in model.objects.values_list('name', 'slug'):
+            entries.append((name, {
+                'type': 'category',
+                'title': name,
+                'url': f'{reverse(url_name)}?category={slug}',
+                'category': section,
+                'icon': 'fa-folder-open',
+            }))
+    return entries
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def invalidate():
+    """Mark every process's suggestion index stale."""
+    cache.set(VERSION_KEY, _new_version(), timeout=None)
+
+
+def get_index():
+    global _index, _index_version
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Cleared or evicted: start a version every process will rebuild for
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                _index = SuggestionIndex(build_entries())
+                _index_version = version
+    return _index
+
+
+def suggest(prefix, limit=8):
+    return get_index().lookup(prefix, limit=limit)
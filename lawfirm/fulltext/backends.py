@@ -0,0 +1,135 @@
+"""
+Database-specific full-text query backends.
+
+Each backend takes the query as typed and returns the ``object_id``s of
+published ``SearchDocument`` rows of one type that match all of its terms
+(as prefixes), best match first.  The database backends split the query
+with ``normalize.query_terms``; the inverted index uses its own tokenizer.
+Title matches weigh more than body matches.  ``within``, a queryset of the
+content rows the caller will show, is applied in the same query, so the
+``limit`` counts only rows that pass the caller's filters.
+"""
+
+from django.db import DatabaseError, connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from ..models import SearchDocument
+from . import inverted
+from .normalize import query_terms
+
+
+def _within_sql(within, alias):
+    """``within`` as a primary-key subquery and its parameters."""
+    return within.order_by().values('pk').query.get_compiler(alias).as_sql()
+
+TITLE_WEIGHT = 3
+
+SQLITE_FTS_TABLE = 'lawfirm_searchdocument_fts'
+
+
+class SimpleBackend:
+    """Substring matching over the normalized documents, for databases without full-text support."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def search(self, doc_type, query, limit, within=None):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        documents = SearchDocument.objects.using(self.alias).filter(doc_type=doc_type, published=True)
+        if within is not None:
+            documents = documents.filter(object_id__in=within.order_by().values('pk'))
+        title_hits = []
+        for term in terms:
+            documents = documents.filter(Q(title__contains=term) | Q(body__contains=term))
+            title_hits.append(When(title__contains=term, then=Value(TITLE_WEIGHT)))
+        rank = sum(Case(when, default=Value(0), output_field=IntegerField()) for when in title_hits)
+        return list(
+            documents.annotate(rank=rank)
+            .order_by('-rank', '-object_id')
+            .values_list('object_id', flat=True)[:limit]
+        )
+
+
+class SQLiteBackend(SimpleBackend):
+    """FTS5 virtual table kept in sync with SearchDocument by triggers (see migration 0005)."""
+
+    _available = {}
+
+    def is_available(self):
+        if self.alias not in self._available:
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [SQLITE_FTS_TABLE],
+                )
+                self._available[self.alias] = cursor.fetchone() is not None
+        return self._available[self.alias]
+
+    def search(self, doc_type, query, limit, within=None):
+        if not self.is_available():
+            return super().search(doc_type, query, limit, within)
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        params = [match, doc_type]
+        restrict = ''
+        if within is not None:
+            within_sql, within_params = _within_sql(within, self.alias)
+            restrict = f'AND d.object_id IN ({within_sql}) '
+            params.extend(within_params)
+        sql = (
+            f'SELECT d.object_id FROM {SQLITE_FTS_TABLE} f '
+            f'JOIN lawfirm_searchdocument d ON d.id = f.rowid '
+            f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND d.doc_type = %s AND d.published = 1 {restrict}'
+            f'ORDER BY bm25({SQLITE_FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) LIMIT %s'
+        )
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class MySQLBackend(SimpleBackend):
+    """InnoDB FULLTEXT indexes on (title) and (title, body), queried in boolean mode."""
+
+    def search(self, doc_type, query, limit, within=None):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        against = ' '.join(f'+{term}*' for term in terms)
+        params = [doc_type, against]
+        restrict = ''
+        if within is not None:
+            within_sql, within_params = _within_sql(within, self.alias)
+            restrict = f'AND object_id IN ({within_sql}) '
+            params.extend(within_params)
+        sql = (
+            'SELECT object_id FROM lawfirm_searchdocument '
+            'WHERE doc_type = %s AND published = 1 '
+            f'AND MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) {restrict}'
+            f'ORDER BY MATCH(title) AGAINST (%s IN BOOLEAN MODE) * {TITLE_WEIGHT} '
+            '+ MATCH(title, body) AGAINST (%s IN BOOLEAN MODE) DESC '
+            'LIMIT %s'
+        )
+        try:
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute(sql, params + [against, against, limit])
+                return [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            # FULLTEXT indexes missing (e.g. migration run on another engine)
+            return super().search(doc_type, query, limit, within)
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'mysql': MySQLBackend,
+}
+
+
+def get_backend(alias='default'):
+    backend = BACKENDS.get(connections[alias].vendor, SimpleBackend)(alias)
+    if inverted.is_enabled():
+        return inverted.InvertedBackend(fallback=backend)
+    return backend
@@ -0,0 +1,218 @@
+"""
+Self-contained search engine built on the mmap'd inverted index.
+
+Enabled with ``SEARCH_ENGINE = 'inverted'`` for databases without a
+Persian-capable FULLTEXT parser.  Saves and deletes of BlogPost, Question and
+Answer ``schedule`` their document, and once the transaction commits every
+document scheduled in it is re-read from the database and written in one
+update of the file; queries are answered from the file alone.
+
+The file is immutable, so an update loads the whole index and writes it out
+again: its cost grows with the corpus, not with the change.  That is fine
+for a few thousand documents edited by hand; bulk changes should be made in
+one transaction (a single rewrite) or followed by ``manage.py
+rebuild_search_index``.
+"""
+
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import BlogPost, Question
+from .mmap_index import IndexBuilder, IndexReader
+from .normalize import MAX_QUERY_TERMS
+from .tokenizer import tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+TITLE_WEIGHT = 3
+
+_reader = None
+_reader_stamp = None
+_reader_lock = threading.Lock()
+# (model, pk) of the documents waiting for their transaction to commit
+_pending = threading.local()
+
+
+def is_enabled():
+    return getattr(settings, 'SEARCH_ENGINE', 'database') == 'inverted'
+
+
+def index_path():
+    return str(settings.SEARCH_INDEX_PATH)
+
+
+def get_reader():
+    """Return a reader for the current index file, re-mapping it after a rewrite."""
+    global _reader, _reader_stamp
+    try:
+        stat = os.stat(index_path())
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if stamp != _reader_stamp:
+        with _reader_lock:
+            if stamp != _reader_stamp:
+                _reader = IndexReader(index_path())
+                _reader_stamp = stamp
+    return _reader
+
+
+@contextmanager
+def _write_lock():
+    path = index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def document_key(obj):
+    return f"{'blog' if isinstance(obj, BlogPost) else 'question'}:{obj.pk}"
+
+
+def build_entry(obj):
+    """Return ``(payload, term weights)`` for a published BlogPost or Question."""
+    weights = Counter()
+    for term in tokenize(obj.title):
+        weights[term] += TITLE_WEIGHT
+    if isinstance(obj, BlogPost):
+        weights.update(tokenize(obj.excerpt))
+        weights.update(tokenize(obj.content))
+        payload = {'type': 'blog', 'icon': 'fa-newspaper'}
+    else:
+        weights.update(tokenize(obj.content))
+        for answer in obj.answers.all():
+            if answer.is_published:
+                weights.update(tokenize(answer.content))
+        payload = {'type': 'question', 'icon': 'fa-question-circle'}
+    payload.update({
+        'title': obj.title,
+        'url': obj.get_absolute_url(),
+        'category': obj.category.name,
+    })
+    return payload, weights
+
+
+def _is_published(obj):
+    return obj.published if isinstance(obj, BlogPost) else obj.is_published
+
+
+def _pending_documents():
+    if not hasattr(_pending, 'documents'):
+        _pending.documents = set()
+    return _pending.documents
+
+
+def schedule(model, pk):
+    """Bring the document of the ``model`` row ``pk`` up to date once the transaction commits."""
+    _pending_documents().add((model, pk))
+    transaction.on_commit(flush)
+
+
+def flush():
+    """Write every scheduled document with one update of the index file."""
+    pending = _pending_documents()
+    if pending:
+        documents = set(pending)
+        pending.clear()
+        refresh(documents)
+
+
+def refresh(documents):
+    """
+    Re-read ``documents``, ``(model, pk)`` pairs, from the database and add,
+    refresh or drop each in the index file.  Rows that are gone or
+    unpublished are dropped.
+    """
+    pks = {BlogPost: set(), Question: set()}
+    for model, pk in documents:
+        pks[model].add(pk)
+    rows = list(BlogPost.objects.filter(pk__in=pks[BlogPost]).select_related('category'))
+    rows += Question.objects.filter(pk__in=pks[Question]).select_related('category').prefetch_related('answers')
+    current = {document_key(obj): obj for obj in rows}
+    with _write_lock():
+        builder = IndexBuilder.from_file(index_path())
+        for model, pk in documents:
+            key = document_key(model(pk=pk))
+            obj = current.get(key)
+            if obj is not None and _is_published(obj):
+                builder.add(key, *build_entry(obj))
+            else:
+                builder.remove(key)
+        builder.write(index_path())
+
+
+def rebuild():
+    """Write a fresh index file from the database. Returns the number of documents."""
+    builder = IndexBuilder()
+    posts = BlogPost.objects.filter(published=True).select_related('category')
+    questions = Question.objects.filter(is_published=True).select_related('category')
+    for obj in list(posts.iterator()) + list(questions.prefetch_related('answers')):
+        builder.add(document_key(obj), *build_entry(obj))
+    with _write_lock():
+        builder.write(index_path())
+    return len(builder.documents)
+
+
+def split_query(query_text):
+    """
+    Turn a query into (exact terms, prefixes).  The query goes through the
+    tokenizer that built the index, so ZWNJ compounds, affixes, stopwords and
+    stems come out as they were indexed.  Every term but the last must match
+    a whole indexed term; the last one is still being typed and matches as a
+    prefix.  The stem of a word is always a prefix of it, so prefix-matching
+    the stemmed last term also finds inflected forms.
+    """
+    terms = list(dict.fromkeys(tokenize(query_text)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], []
+    *complete, last = terms
+    return complete, [last]
+
+
+def query(query_text, doc_type=None, limit=10):
+    """Return the payloads of the best matching documents, or ``None`` without an index."""
+    reader = get_reader()
+    if reader is None:
+        return None
+    exact, prefixes = split_query(query_text)
+    return reader.search(exact, prefixes, doc_type=doc_type, limit=limit)
+
+
+def suggest(query_text, limit=5):
+    """Live-search payloads for ``query_text``: up to ``limit`` posts and ``limit`` questions."""
+    results = []
+    for doc_type in ('blog', 'question'):
+        matches = query(query_text, doc_type=doc_type, limit=limit)
+        if matches is None:
+            return None
+        results.extend({k: v for k, v in match.items() if k != 'key'} for match in matches)
+    return results
+
+
+class InvertedBackend:
+    """``lawfirm.fulltext.backends`` interface over the index file."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def search(self, doc_type, query_text, limit, within=None):
+        # The index cannot apply the caller's filters: rank every match, then
+        # keep the ones ``within`` lets through
+        matches = query(query_text, doc_type=doc_type, limit=None if within is not None else limit)
+        if matches is None:
+            return self.fallback.search(doc_type, query_text, limit, within)
+        ids = [int(match['key'].split(':')[1]) for match in matches]
+        if within is not None:
+            allowed = set(within.filter(pk__in=ids).values_list('pk', flat=True))
+            ids = [pk for pk in ids if pk in allowed]
+        return ids[:limit]
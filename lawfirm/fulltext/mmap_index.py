@@ -0,0 +1,225 @@
+"""
+Compact on-disk inverted index, read through ``mmap``.
+
+The file is written once by ``IndexBuilder.write()`` and then only read, so
+every worker process can map the same file and share its pages through the
+OS page cache.  Lookups binary-search the sorted term table in place; nothing
+but the header is parsed at open time.
+
+File layout (native byte order, every section 4-byte aligned)::
+
+    header        magic, version, term/doc counts, section offsets
+    term offsets  (terms + 1) x uint32, offsets into the term blob
+    term blob     UTF-8 terms, sorted bytewise
+    post offsets  (terms + 1) x uint32, offsets (in entries) into postings
+    postings      (doc number, weight) x uint32 pairs, grouped by term
+    doc types     docs x uint32, index into DOC_TYPES
+    doc offsets   (docs + 1) x uint32, offsets into the doc blob
+    doc blob      one UTF-8 JSON payload per document
+"""
+
+import array
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections import defaultdict
+
+MAGIC = b'DGIX'
+VERSION = 1
+# magic, version, term count, doc count, seven section offsets, two reserved
+HEADER = struct.Struct('=4s12I')
+
+DOC_TYPES = ['blog', 'question']
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+class IndexBuilder:
+    """In-memory form of the index: ``{key: (payload, {term: weight})}``."""
+
+    def __init__(self):
+        self.documents = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """Load an existing index file so it can be updated incrementally."""
+        builder = cls()
+        try:
+            reader = IndexReader(path)
+        except (FileNotFoundError, ValueError):
+            return builder
+
+        weights = defaultdict(dict)
+        for term_no in range(reader.term_count):
+            term = reader.term(term_no).decode()
+            for doc_no, weight in reader.postings(term_no):
+                weights[doc_no][term] = weight
+        for doc_no in range(reader.doc_count):
+            payload = reader.document(doc_no)
+            builder.documents[payload['key']] = (payload, weights[doc_no])
+        return builder
+
+    def add(self, key, payload, weights):
+        self.documents[key] = (dict(payload, key=key), dict(weights))
+
+    def remove(self, key):
+        self.documents.pop(key, None)
+
+    def write(self, path):
+        """Serialize to ``path`` atomically (write a temp file, then rename)."""
+        keys = sorted(self.documents)
+        postings = defaultdict(list)
+        for doc_no, key in enumerate(keys):
+            for term, weight in self.documents[key][1].items():
+                postings[term].append((doc_no, weight))
+
+        terms = sorted(term.encode() for term in postings)
+        term_offsets = array.array('I', [0])
+        post_offsets = array.array('I', [0])
+        entries = array.array('I')
+        for term in terms:
+            term_offsets.append(term_offsets[-1] + len(term))
+            for doc_no, weight in postings[term.decode()]:
+                entries.extend((doc_no, weight))
+            post_offsets.append(len(entries) // 2)
+
+        doc_types = array.array('I')
+        doc_offsets = array.array('I', [0])
+        doc_blob = []
+        for key in keys:
+            payload = self.documents[key][0]
+            doc_types.append(DOC_TYPES.index(payload['type']))
+            encoded = json.dumps(payload, ensure_ascii=False).encode()
+            doc_blob.append(encoded)
+            doc_offsets.append(doc_offsets[-1] + len(encoded))
+
+        sections = [
+            term_offsets.tobytes(),
+            _pad(b''.join(terms)),
+            post_offsets.tobytes(),
+            entries.tobytes(),
+            doc_types.tobytes(),
+            doc_offsets.tobytes(),
+            b''.join(doc_blob),
+        ]
+        positions = []
+        position = HEADER.size
+        for section in sections:
+            positions.append(position)
+            position += len(section)
+        header = HEADER.pack(MAGIC, VERSION, len(terms), len(keys), *positions, 0, 0)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                for section in sections:
+                    f.write(section)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class IndexReader:
+    """Read-only view of an index file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if len(buf) < HEADER.size:
+            raise ValueError(f'{path} is not a search index')
+        (magic, version, self.term_count, self.doc_count, term_offsets, term_blob,
+         post_offsets, postings, doc_types, doc_offsets, doc_blob, *_) = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} search index')
+
+        def uint32s(start, count):
+            return buf[start:start + 4 * count].cast('I')
+
+        self._term_offsets = uint32s(term_offsets, self.term_count + 1)
+        self._term_blob = term_blob
+        self._post_offsets = uint32s(post_offsets, self.term_count + 1)
+        self._postings = uint32s(postings, self._post_offsets[-1] * 2)
+        self._doc_types = uint32s(doc_types, self.doc_count)
+        self._doc_offsets = uint32s(doc_offsets, self.doc_count + 1)
+        self._doc_blob = doc_blob
+        self._buf = buf
+
+    def term(self, term_no):
+        start = self._term_blob + self._term_offsets[term_no]
+        end = self._term_blob + self._term_offsets[term_no + 1]
+        return bytes(self._buf[start:end])
+
+    def postings(self, term_no):
+        start, end = self._post_offsets[term_no], self._post_offsets[term_no + 1]
+        entries = self._postings[2 * start:2 * end]
+        return zip(entries[0::2], entries[1::2])
+
+    def document(self, doc_no):
+        start = self._doc_blob + self._doc_offsets[doc_no]
+        end = self._doc_blob + self._doc_offsets[doc_no + 1]
+        return json.loads(bytes(self._buf[start:end]))
+
+    def _lower_bound(self, key):
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, term):
+        """Return ``{doc number: weight}`` for an exact term."""
+        key = term.encode()
+        term_no = self._lower_bound(key)
+        if term_no < self.term_count and self.term(term_no) == key:
+            return dict(self.postings(term_no))
+        return {}
+
+    def lookup_prefix(self, prefix):
+        """Return ``{doc number: summed weight}`` over every term starting with ``prefix``."""
+        key = prefix.encode()
+        matches = defaultdict(int)
+        term_no = self._lower_bound(key)
+        while term_no < self.term_count and self.term(term_no).startswith(key):
+            for doc_no, weight in self.postings(term_no):
+                matches[doc_no] += weight
+            term_no += 1
+        return matches
+
+    def search(self, terms, prefixes=(), doc_type=None, limit=10):
+        """
+        Return the payloads of documents containing every term in ``terms``
+        and, for each entry of ``prefixes``, at least one term with that
+        prefix; highest total weight first.
+        """
+        if not terms and not prefixes:
+            return []
+        scores = None
+        for matches in [self.lookup(term) for term in terms] + [self.lookup_prefix(p) for p in prefixes]:
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {doc_no: scores[doc_no] + weight for doc_no, weight in matches.items() if doc_no in scores}
+            if not scores:
+                return []
+
+        if doc_type is not None:
+            type_code = DOC_TYPES.index(doc_type)
+            scores = {doc_no: score for doc_no, score in scores.items() if self._doc_types[doc_no] == type_code}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [self.document(doc_no) for doc_no, _ in ranked]
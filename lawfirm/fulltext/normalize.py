@@ -0,0 +1,62 @@
+"""
+Persian-aware text normalization shared by indexing and querying.
+
+Both the indexed documents and the user's query go through ``normalize`` so
+that Arabic and Persian spellings of the same word (ي/ی, ك/ک, ة/ه ...),
+diacritics, tatweel, ZWNJ-joined compounds and Persian digits all compare
+equal.
+"""
+
+import re
+
+CHARACTER_MAP = str.maketrans({
+    # Arabic letters typed on Arabic keyboards
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    'ؤ': 'و',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'آ': 'ا',
+    # Persian and Arabic-Indic digits
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    # ZWNJ and non-breaking space separate words
+    '\u200c': ' ',
+    '\u00a0': ' ',
+})
+
+ZWNJ = '\u200c'
+
+# Same mapping, but ZWNJ survives so the tokenizer can see word-internal joins
+CHARACTER_MAP_KEEP_ZWNJ = {k: v for k, v in CHARACTER_MAP.items() if k != ord(ZWNJ)}
+
+# Harakat, superscript alef, tatweel, ZWJ and bidi marks
+STRIP_RE = re.compile('[\u064b-\u065f\u0670\u0640\u200d\u200e\u200f]')
+SPACE_RE = re.compile(r'\s+')
+TERM_RE = re.compile(r'\w+')
+
+MAX_QUERY_TERMS = 10
+
+
+def normalize(text, keep_zwnj=False):
+    """Return ``text`` lower-cased, with Persian spelling variants unified."""
+    if not text:
+        return ''
+    text = STRIP_RE.sub('', text.translate(CHARACTER_MAP_KEEP_ZWNJ if keep_zwnj else CHARACTER_MAP))
+    return SPACE_RE.sub(' ', text).strip().lower()
+
+
+def query_terms(query):
+    """Split a search query into distinct normalized terms."""
+    terms = []
+    for term in TERM_RE.findall(normalize(query)):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
@@ -0,0 +1,25 @@
+"""
+Light Persian stemmer.
+
+Strips at most one inflectional suffix (plural, comparative, possessive)
+from a normalized word.  It is deliberately conservative: indexing and
+querying use the same stemmer, so an occasional over-stem only merges two
+rare words, while an aggressive stemmer would merge common ones.
+"""
+
+# Longest first, so 'هایشان' wins over 'ها'
+SUFFIXES = sorted([
+    'هایمان', 'هایتان', 'هایشان', 'هایی', 'های', 'ها',
+    'ترین', 'تر',
+    'مان', 'تان', 'شان',
+    'ات', 'ان',
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+
+def stem(word):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
@@ -0,0 +1,48 @@
+"""
+Persian tokenizer for the self-contained inverted index.
+
+Words are split on whitespace and punctuation.  Inside a word, ZWNJ marks
+detachable affixes: a leading verbal prefix (می/نمی) and trailing
+suffixes written after a ZWNJ (کتاب‌ها, بزرگ‌ترین) are dropped before the
+remaining stem goes through the light stemmer.
+"""
+
+import re
+
+from .normalize import ZWNJ, normalize
+from .stemmer import stem
+
+WORD_RE = re.compile(r'[\w%s]+' % ZWNJ)
+
+VERB_PREFIXES = {'می', 'نمی'}
+
+ZWNJ_SUFFIXES = {
+    'ها', 'های', 'هایی', 'هایم', 'هایت', 'هایش', 'هایمان', 'هایتان', 'هایشان',
+    'ام', 'ات', 'اش', 'ای', 'ایم', 'اید', 'اند', 'مان', 'تان', 'شان',
+    'تر', 'ترین', 'ی',
+}
+
+STOPWORDS = {
+    'و', 'در', 'به', 'از', 'که', 'را', 'با', 'این', 'ان', 'برای', 'تا', 'یا',
+    'هم', 'نیز', 'اما', 'اگر', 'بر', 'یک', 'است', 'بود', 'شد', 'می', 'نمی', 'ها', 'های',
+}
+
+
+def _join_affixes(word):
+    parts = [part for part in word.split(ZWNJ) if part]
+    if len(parts) > 1 and parts[0] in VERB_PREFIXES:
+        parts = parts[1:]
+    while len(parts) > 1 and parts[-1] in ZWNJ_SUFFIXES:
+        parts = parts[:-1]
+    return ''.join(parts)
+
+
+def tokenize(text):
+    """Return the stemmed index terms of ``text`` in order, stopwords removed."""
+    terms = []
+    for word in WORD_RE.findall(normalize(text, keep_zwnj=True)):
+        word = _join_affixes(word)
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        terms.append(stem(word))
+    return terms
@@ -0,0 +1,211 @@
+"""
+Database-backed background jobs.
+
+Side effects that need not finish before the response is sent (user
+notifications now, e-mail or SMS later) are queued as ``Job`` rows and run
+by ``manage.py run_worker``, so nothing but the existing database is needed.
+A task is a function registered under a name with ``@task``; it is called
+with the payloads of all the due jobs of that name at once, so it can handle
+a batch in a few statements::
+
+    @jobs.task('notifications.consultations')
+    def send(payloads):
+        ...
+
+    jobs.enqueue('notifications.consultations', {'consultation': 1})
+
+Workers claim a batch by flipping it from pending to running with one
+conditional UPDATE (after ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database has it), so several of them can share the table.  Finished jobs are
+deleted.  When a batch raises, its jobs are run again one by one to find the
+bad ones, which are retried with exponential backoff until ``max_attempts``
+and then left ``failed`` for the admin.  Jobs whose worker died are taken
+back after ``JOBS_LOCK_TIMEOUT`` seconds.
+
+With ``JOBS_RUN_INLINE`` (the default, for deployments without a worker)
+the tasks run in the queuing process as soon as its transaction commits, and
+only the ones that fail are queued for a worker.  Whenever jobs are queued,
+and on every idle poll of a worker, ``check_backlog`` logs an error if jobs
+have been overdue for ``JOBS_BACKLOG_AGE`` seconds, at most once a minute.
+"""
+
+import logging
+import os
+import socket
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKLOG_CHECK_KEY = 'jobs:backlog-checked'
+BACKLOG_CHECK_INTERVAL = 60
+
+_tasks = {}
+
+
+def task(name):
+    """Register the decorated function as the handler of jobs named ``name``."""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(name, payload=None, delay=0):
+    """Queue one job; see ``enqueue_many``."""
+    enqueue_many(name, [payload], delay)
+
+
+def enqueue_many(name, payloads, delay=0):
+    """
+    Queue a ``name`` job for each JSON-serializable payload, to run ``delay``
+    seconds from now.  The rows are written in the caller's transaction, so
+    nothing is queued if it rolls back.
+    """
+    if name not in _tasks:
+        raise ValueError(f'Unknown job {name!r}')
+    payloads = [payload if payload is not None else {} for payload in payloads]
+    if not payloads:
+        return
+    if _setting('JOBS_RUN_INLINE', False) and not delay:
+        transaction.on_commit(lambda: _run_inline(name, payloads))
+        return
+    _insert(name, payloads, timezone.now() + timedelta(seconds=delay))
+
+
+def _insert(name, payloads, run_at):
+    Job.objects.bulk_create(
+        Job(name=name, payload=payload, run_at=run_at, max_attempts=_setting('JOBS_MAX_ATTEMPTS', 5))
+        for payload in payloads
+    )
+    check_backlog()
+
+
+def overdue():
+    """Number of jobs still pending ``JOBS_BACKLOG_AGE`` seconds after they were due."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOBS_BACKLOG_AGE', 600))
+    return Job.objects.filter(status=Job.PENDING, run_at__lt=cutoff).count()
+
+
+def check_backlog():
+    """Log an error when jobs pile up, e.g. because no worker is running; at most once a minute."""
+    if not cache.add(BACKLOG_CHECK_KEY, True, BACKLOG_CHECK_INTERVAL):
+        return 0
+    count = overdue()
+    if count:
+        logger.error(
+            '%s background jobs are overdue by more than %s seconds; is manage.py run_worker running?',
+            count, _setting('JOBS_BACKLOG_AGE', 600),
+        )
+    return count
+
+
+def _run_inline(name, payloads):
+    try:
+        with transaction.atomic():
+            _tasks[name](payloads)
+    except Exception:
+        logger.exception('Job %s failed inline, queued for a worker', name)
+        _insert(name, payloads, timezone.now())
+
+
+def requeue_stale():
+    """Give the jobs of workers that died (or hung) back to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=_setting('JOBS_LOCK_TIMEOUT', 300))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_at=None, locked_by='', last_error='Worker did not finish the job',
+    )
+    return failed + stale.update(status=Job.PENDING, locked_at=None, locked_by='')
+
+
+def claim(batch_size=None, worker=None):
+    """Mark up to ``batch_size`` due jobs as running for ``worker`` and return them."""
+    batch_size = batch_size or _setting('JOBS_BATCH_SIZE', 100)
+    worker = worker or worker_name()
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status=Job.PENDING, run_at__lte=now).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # Still pending: without SKIP LOCKED another worker may have taken some
+        Job.objects.filter(pk__in=ids, status=Job.PENDING).update(
+            status=Job.RUNNING, locked_at=now, locked_by=worker, attempts=F('attempts') + 1,
+        )
+        return list(Job.objects.filter(pk__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now))
+
+
+def _failed(jobs, error):
+    now = timezone.now()
+    delay = _setting('JOBS_RETRY_DELAY', 30)
+    for job in jobs:
+        if job.name in _tasks and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = now + timedelta(seconds=delay * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.FAILED
+        job.locked_at, job.locked_by, job.last_error = None, '', error
+    Job.objects.bulk_update(jobs, ['status', 'run_at', 'locked_at', 'locked_by', 'last_error'])
+
+
+def _run(name, jobs):
+    handler = _tasks.get(name)
+    if handler is None:
+        logger.error('No handler for job %s', name)
+        _failed(jobs, f'Unknown job {name!r}')
+        return
+    try:
+        with transaction.atomic():
+            handler([job.payload for job in jobs])
+    except Exception:
+        if len(jobs) > 1:
+            # Run them one at a time so only the bad ones are retried
+            for job in jobs:
+                _run(name, [job])
+            return
+        logger.exception('Job %s #%s failed (attempt %s)', name, jobs[0].pk, jobs[0].attempts)
+        _failed(jobs, traceback.format_exc())
+        return
+    Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+
+
+def work(batch_size=None, worker=None):
+    """Run one batch of due jobs; returns how many were claimed."""
+    requeue_stale()
+    jobs = claim(batch_size, worker)
+    by_name = defaultdict(list)
+    for job in jobs:
+        by_name[job.name].append(job)
+    for name, group in by_name.items():
+        _run(name, group)
+    return len(jobs)
+
+
+def run_pending(batch_size=None):
+    """Run every due job, for ``run_worker --once`` and tests."""
+    total = 0
+    while True:
+        claimed = work(batch_size)
+        if not claimed:
+            return total
+        total += claimed
@@ -0,0 +1,174 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import uuid
+from copy import deepcopy
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from lawfirm import counters
+from lawfirm.bench import dataset, runner
+
+CLIENTS = ['test_client', 'wsgi']
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(
+            ['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    try:
+        return git('rev-parse', '--short', 'HEAD'), bool(git('status', '--porcelain', '--untracked-files=no'))
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the public pages against a seeded throwaway database and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--thousands', type=float, default=1,
+                            help='Thousands of blog posts and of questions to seed (default 1)')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per page (default 200)')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per page first (default 20)')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Concurrent connections to the WSGI server (default 4)')
+        parser.add_argument('--pages', nargs='+', choices=runner.PAGES, default=runner.PAGES)
+        parser.add_argument('--clients', nargs='+', choices=CLIENTS, default=CLIENTS)
+        parser.add_argument('--login', action='store_true',
+                            help='Request pages as a logged-in user (bypasses the anonymous page cache)')
+        parser.add_argument('--output', help='Result file (default bench-results/<time>-<commit>.json)')
+        parser.add_argument('--compare', help='Earlier result file to compare against')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                previous = json.load(f)
+
+        workdir = tempfile.mkdtemp(prefix='dadgan-bench-')
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+                # A file, not shared memory, so WSGI server threads behave like real workers
+                connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, f'{alias}.sqlite3')
+
+        # Keys of the benchmark never mix with the site's entries in a shared cache
+        caches = deepcopy(settings.CACHES)
+        for config in caches.values():
+            config['KEY_PREFIX'] = f'bench-{uuid.uuid4().hex[:8]}'
+
+        overrides = override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=['testserver', '127.0.0.1'],
+            CACHES=caches,
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+            SEARCH_INDEX_PATH=os.path.join(workdir, 'lawfirm.idx'),
+        )
+        with overrides:
+            self.stdout.write('Creating benchmark database...')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                results = self.run(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        report = self.build_report(options, results)
+        path = options['output'] or os.path.join(
+            settings.BASE_DIR, 'bench-results',
+            f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'nogit'}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        self.print_results(results, previous)
+        self.stdout.write(self.style.SUCCESS(f'✓ Results written to {path}'))
+
+    def run(self, options):
+        self.stdout.write(f"Seeding {int(options['thousands'] * 1000)} posts and questions...")
+        slugs = dataset.seed(options['thousands'])
+
+        session_cookie = None
+        if options['login']:
+            client = Client()
+            client.force_login(User.objects.get(username='bench-author'))
+            cookie = client.cookies[settings.SESSION_COOKIE_NAME]
+            session_cookie = (cookie.key, cookie.value)
+
+        results = {}
+        for client_name in options['clients']:
+            if client_name == 'wsgi':
+                target = runner.WSGITarget(options['concurrency'], session_cookie)
+            else:
+                target = runner.TestClientTarget(session_cookie)
+            try:
+                results[client_name] = {}
+                for page in options['pages']:
+                    urls = runner.page_urls(page, slugs, options['requests'])
+                    self.stdout.write(f'  {client_name} {page}...')
+                    results[client_name][page] = runner.measure(target, urls, warmup=options['warmup'])
+            finally:
+                target.close()
+
+        # Write buffered views into the benchmark database before it is dropped
+        counters.flush()
+        return results
+
+    def build_report(self, options, results):
+        commit, dirty = git_revision()
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': commit,
+                'dirty': dirty,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connections['default'].vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'search_engine': getattr(settings, 'SEARCH_ENGINE', 'database'),
+                'thousands': options['thousands'],
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'concurrency': options['concurrency'],
+                'login': options['login'],
+            },
+            'results': results,
+        }
+
+    def print_results(self, results, previous):
+        previous_results = previous['results'] if previous else {}
+        for client_name, pages in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{client_name}'))
+            self.stdout.write(f"{'page':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+            for page, stats in pages.items():
+                line = (
+                    f"{page:<14}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}"
+                    f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}"
+                )
+                before = previous_results.get(client_name, {}).get(page)
+                if before:
+                    line += '   ' + '  '.join(
+                        f'{label} {self.change(before[key], stats[key])}'
+                        for label, key in (('req/s', 'throughput_rps'), ('p50', 'p50_ms'), ('p95', 'p95_ms'))
+                    )
+                self.stdout.write(line)
+
+    @staticmethod
+    def change(before, after):
+        if not before:
+            return 'n/a'
+        return f'{(after - before) / before * 100:+.1f}%'
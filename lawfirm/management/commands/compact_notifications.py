@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from lawfirm import notifications
+
+
+class Command(BaseCommand):
+    help = 'Delete old read notifications and withdrawn broadcasts (NOTIFICATION_RETENTION_DAYS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Keep read notifications this many days (default: NOTIFICATION_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        deleted, broadcasts = notifications.compact(
+            days=options['days'], batch_size=options['batch_size'], dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'- {deleted} notifications and {broadcasts} broadcasts are past retention'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Deleted {deleted} notifications and {broadcasts} broadcasts'
+            ))
@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from lawfirm.models import (
+    Answer, BlogPost, Category, ConsultationRequest, ContactMessage, Notification, QACategory, Question, Testimonial,
+)
+from lawfirm.pagination import CursorPaginator
+
+
+def later_page(queryset, per_page):
+    """The query CursorPaginator runs for a page after the first."""
+    paginator = CursorPaginator(queryset, per_page)
+    return queryset.filter(paginator.rows_after([timezone.now(), 0]))[:per_page + 1]
+
+
+def hot_queries():
+    """The listing/detail queries of the public pages, as the views build them."""
+    category = Category.objects.first() or Category(pk=0)
+    qa_category = QACategory.objects.first() or QACategory(pk=0)
+    question = Question.objects.first() or Question(pk=0)
+    user = User.objects.first() or User(pk=0)
+    return [
+        ('home blog posts', BlogPost.objects.filter(published=True).for_listing()[:3]),
+        ('home questions', Question.objects.filter(is_published=True).with_listing_data()[:4]),
+        ('home testimonials', Testimonial.objects.filter(is_published=True)[:3]),
+        ('blog list', BlogPost.objects.filter(published=True).for_listing()[:6]),
+        ('blog list, later page', later_page(BlogPost.objects.filter(published=True).for_listing(), 6)),
+        ('blog list by category', BlogPost.objects.filter(published=True, category=category).for_listing()[:6]),
+        ('related blog posts', BlogPost.objects.filter(
+            category=category, published=True,
+        ).exclude(pk=0).for_listing()[:3]),
+        ('Q&A list', Question.objects.filter(is_published=True).with_listing_data()[:10]),
+        ('Q&A list, later page', later_page(Question.objects.filter(is_published=True).with_listing_data(), 10)),
+        ('Q&A list by category', Question.objects.filter(
+            is_published=True, category=qa_category,
+        ).with_listing_data()[:10]),
+        ('related questions', Question.objects.filter(
+            category=qa_category, is_published=True,
+        ).exclude(pk=0).with_listing_data()[:5]),
+        ('question answers', Answer.objects.filter(question=question, is_published=True)),
+        ('best answer', Answer.objects.filter(question=question, is_best_answer=True)[:1]),
+        ('sitemap shard', Question.objects.filter(
+            pk__gt=0, pk__lte=5000, is_published=True,
+        ).order_by('pk').values_list('slug', 'updated_at')),
+        ('unread notifications', Notification.objects.filter(user=user, is_read=False)),
+        ('profile notifications', Notification.objects.filter(user=user).order_by('-created_at', '-id')[:6]),
+        ('profile consultations', ConsultationRequest.objects.filter(user=user).select_related(
+            'consultation_type',
+        ).order_by('-created_at', '-id')[:11]),
+        ('profile messages', ContactMessage.objects.filter(user=user).order_by('-created_at', '-id')[:11]),
+    ]
+
+
+def explain_sqlite(cursor, sql, params):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    plan = [row[-1] for row in cursor.fetchall()]
+    indexes = [step.split(' INDEX ')[1].split()[0] for step in plan if ' INDEX ' in step]
+    scans = [step.split()[1] for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+    sorts = [step for step in plan if step.startswith('USE TEMP B-TREE')]
+    return indexes, scans, sorts, plan
+
+
+def explain_mysql(cursor, sql, params):
+    cursor.execute(f'EXPLAIN {sql}', params)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    indexes = [row['key'] for row in rows if row['key'] and row['key'] != 'PRIMARY']
+    scans = [row['table'] for row in rows if row['type'] == 'ALL']
+    sorts = [row['table'] for row in rows if 'filesort' in (row['Extra'] or '')]
+    plan = [' '.join(f'{key}={value}' for key, value in row.items() if value is not None) for row in rows]
+    return indexes, scans, sorts, plan
+
+
+EXPLAINERS = {
+    'sqlite': explain_sqlite,
+    'mysql': explain_mysql,
+}
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot listing/detail queries and report whether they use an index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--verbose-plan', action='store_true', help='Print the full query plans')
+        parser.add_argument('--strict', action='store_true',
+                            help='Fail if any query scans a whole table or sorts without an index')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(f'EXPLAIN parsing is not supported for {connection.vendor}')
+
+        problems = 0
+        for name, queryset in hot_queries():
+            sql, params = queryset.query.get_compiler(using=options['database']).as_sql()
+            with connection.cursor() as cursor:
+                indexes, scans, sorts, plan = explain(cursor, sql, params)
+
+            if scans or sorts:
+                problems += 1
+                details = '; '.join(
+                    [f'full scan of {table}' for table in scans] + ['sort without index'] * bool(sorts)
+                )
+                self.stdout.write(self.style.WARNING(f'- {name}: {details}'))
+            else:
+                used = ', '.join(dict.fromkeys(indexes)) or 'primary key only'
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}: {used}'))
+            if options['verbose_plan']:
+                for step in plan:
+                    self.stdout.write(f'    {step}')
+
+        if problems and options['strict']:
+            raise CommandError(f'{problems} hot queries do not use an index')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lawfirm import counters
+
+
+class Command(BaseCommand):
+    help = 'Write buffered BlogPost/Question view counts to the database'
+
+    def handle(self, *args, **kwargs):
+        written = counters.flush()
+        if written is None:
+            self.stdout.write(self.style.WARNING('Another process is flushing view counts, skipped.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Flushed {written} buffered views'))
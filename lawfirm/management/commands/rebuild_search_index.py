@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from lawfirm import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for blog posts and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inverted',
+            action='store_true',
+            help='Also write the inverted index file even if SEARCH_ENGINE is not "inverted"',
+        )
+
+    def handle(self, *args, **options):
+        total = fulltext.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {total} documents'))
+
+        if options['inverted'] or fulltext.inverted.is_enabled():
+            total = fulltext.inverted.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Wrote {total} documents to {fulltext.inverted.index_path()}'
+            ))
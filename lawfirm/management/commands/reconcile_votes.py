@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from lawfirm import votes
+from lawfirm.models import Answer, Question
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Question/Answer vote tallies from the vote ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many tallies are out of date',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        for model in (Question, Answer):
+            stale = votes.reconcile(model, dry_run=dry_run)
+            name = model._meta.verbose_name_plural
+            if dry_run:
+                self.stdout.write(self.style.WARNING(f'- {name}: {stale} tallies out of date'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}: {stale} tallies fixed'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from lawfirm import answer_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized answer counts and best answer of every question'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many questions are out of date',
+        )
+
+    def handle(self, *args, **options):
+        stale = answer_stats.reconcile(dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'- {stale} questions have stale answer statistics'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ Answer statistics of {stale} questions fixed'))
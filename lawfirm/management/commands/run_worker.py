@@ -0,0 +1,62 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from lawfirm import counters, jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (notifications and other side effects) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Jobs claimed at a time (default: JOBS_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=None,
+            help='Seconds to wait when the queue is empty (default: JOBS_POLL_INTERVAL)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are due and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            ran = jobs.run_pending(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Ran {ran} jobs'))
+            return
+
+        sleep = options['sleep'] if options['sleep'] is not None else settings.JOBS_POLL_INTERVAL
+        worker = jobs.worker_name()
+        self.stopping = False
+        # Finish the current batch when docker stop sends SIGTERM
+        signal.signal(signal.SIGTERM, self.stop)
+        self.stdout.write(f'Worker {worker} waiting for jobs')
+
+        ran = 0
+        try:
+            while not self.stopping:
+                # Drop connections past CONN_MAX_AGE or broken while idle
+                close_old_connections()
+                claimed = jobs.work(options['batch_size'], worker)
+                ran += claimed
+                if not claimed:
+                    jobs.check_backlog()
+                    counters.flush_if_due()
+                    time.sleep(sleep)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✓ Worker stopped after {ran} jobs'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,90 @@
+"""
+Per-request database middleware.
+
+``ReplicaPinningMiddleware`` scopes read-replica routing (lawfirm/db/router.py)
+to each request.
+
+``QueryCountMiddleware``, enabled by ``QUERY_COUNT_HEADERS``, adds the
+number of queries a request issued and the time spent in them to its
+response::
+
+    X-DB-Queries: 7
+    X-DB-Time: 3.2ms
+
+Requests above ``QUERY_COUNT_WARN_QUERIES`` queries or
+``QUERY_COUNT_WARN_MS`` milliseconds of database time are logged to the
+``lawfirm.queries`` logger.
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .db import router
+
+logger = logging.getLogger('lawfirm.queries')
+
+
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'DB_REPLICA_PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        unsafe = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        token = router.start_request(pinned=unsafe or router.PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = router.end_request(token)
+        if unsafe and state.wrote and self.pin_seconds:
+            response.set_cookie(router.PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class QueryStats:
+    """``execute_wrapper`` callable that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryCountMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_COUNT_HEADERS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.warn_queries = getattr(settings, 'QUERY_COUNT_WARN_QUERIES', 50)
+        self.warn_ms = getattr(settings, 'QUERY_COUNT_WARN_MS', 500)
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        milliseconds = stats.duration * 1000
+        response['X-DB-Queries'] = str(stats.count)
+        response['X-DB-Time'] = f'{milliseconds:.1f}ms'
+        if stats.count > self.warn_queries or milliseconds > self.warn_ms:
+            logger.warning(
+                '%s %s issued %d queries in %.1fms',
+                request.method, request.get_full_path(), stats.count, milliseconds,
+            )
+        return response
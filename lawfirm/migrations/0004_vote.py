@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_legacy_tallies(apps, schema_editor):
+    """Record existing vote totals as one 'legacy' ledger row per target so reconciliation keeps them."""
+    Vote = apps.get_model('lawfirm', 'Vote')
+    Question = apps.get_model('lawfirm', 'Question')
+    Answer = apps.get_model('lawfirm', 'Answer')
+    rows = [
+        Vote(voter='legacy', question_id=pk, value=votes)
+        for pk, votes in Question.objects.exclude(votes=0).values_list('pk', 'votes')
+    ]
+    rows += [
+        Vote(voter='legacy', answer_id=pk, value=votes)
+        for pk, votes in Answer.objects.exclude(votes=0).values_list('pk', 'votes')
+    ]
+    Vote.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lawfirm', '0003_consultationrequest_admin_message_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('voter', models.CharField(help_text='user:<id> یا session:<key>', max_length=64, verbose_name='رأی\u200cدهنده')),
+                ('value', models.IntegerField(verbose_name='مقدار')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاریخ آپدیت')),
+                ('answer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vote_records', to='lawfirm.answer', verbose_name='پاسخ')),
+                ('question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vote_records', to='lawfirm.question', verbose_name='سوال')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='votes', to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'رأی',
+                'verbose_name_plural': 'آرا',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('voter', 'question'), name='unique_question_vote'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('voter', 'answer'), name='unique_answer_vote'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('answer__isnull', True), ('question__isnull', False)), models.Q(('answer__isnull', False), ('question__isnull', True)), _connector='OR'), name='vote_single_target'),
+        ),
+        migrations.RunPython(seed_legacy_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:37
+
+import re
+
+from django.db import DatabaseError, migrations, models
+
+# A copy of lawfirm.fulltext.normalize as of this migration, so later changes
+# to that module cannot change what the migration does
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'ؤ': 'و',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا', 'آ': 'ا',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '\u200c': ' ',
+    '\u00a0': ' ',
+})
+STRIP_RE = re.compile('[\u064b-\u065f\u0670\u0640\u200d\u200e\u200f]')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    return SPACE_RE.sub(' ', STRIP_RE.sub('', text.translate(CHARACTER_MAP))).strip().lower()
+
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE lawfirm_searchdocument_fts USING fts5("
+    "title, body, content='lawfirm_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER lawfirm_searchdocument_ai AFTER INSERT ON lawfirm_searchdocument BEGIN "
+    "INSERT INTO lawfirm_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER lawfirm_searchdocument_ad AFTER DELETE ON lawfirm_searchdocument BEGIN "
+    "INSERT INTO lawfirm_searchdocument_fts(lawfirm_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER lawfirm_searchdocument_au AFTER UPDATE ON lawfirm_searchdocument BEGIN "
+    "INSERT INTO lawfirm_searchdocument_fts(lawfirm_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO lawfirm_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS lawfirm_searchdocument_ai",
+    "DROP TRIGGER IF EXISTS lawfirm_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS lawfirm_searchdocument_au",
+    "DROP TABLE IF EXISTS lawfirm_searchdocument_fts",
+]
+
+MYSQL_FULLTEXT = [
+    "ALTER TABLE lawfirm_searchdocument ADD FULLTEXT INDEX searchdoc_title_ft (title)",
+    "ALTER TABLE lawfirm_searchdocument ADD FULLTEXT INDEX searchdoc_title_body_ft (title, body)",
+]
+
+MYSQL_FULLTEXT_DROP = [
+    "ALTER TABLE lawfirm_searchdocument DROP INDEX searchdoc_title_ft",
+    "ALTER TABLE lawfirm_searchdocument DROP INDEX searchdoc_title_body_ft",
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FTS, 'mysql': MYSQL_FULLTEXT}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        try:
+            schema_editor.execute(statement)
+        except DatabaseError:
+            # SQLite built without FTS5: searches fall back to substring matching
+            break
+
+
+def drop_fulltext_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FTS_DROP, 'mysql': MYSQL_FULLTEXT_DROP}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def populate(apps, schema_editor):
+    SearchDocument = apps.get_model('lawfirm', 'SearchDocument')
+    BlogPost = apps.get_model('lawfirm', 'BlogPost')
+    Question = apps.get_model('lawfirm', 'Question')
+    documents = [
+        SearchDocument(
+            doc_type='blog', object_id=post.pk, published=post.published,
+            title=normalize(post.title), body=normalize(f'{post.excerpt}\n{post.content}'),
+        )
+        for post in BlogPost.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(
+            doc_type='question', object_id=question.pk, published=question.is_published,
+            title=normalize(question.title), body=normalize(question.content),
+        )
+        for question in Question.objects.iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawfirm', '0004_vote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(choices=[('blog', 'مقاله'), ('question', 'سوال')], max_length=20, verbose_name='نوع')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='شناسه')),
+                ('title', models.CharField(max_length=255, verbose_name='عنوان')),
+                ('body', models.TextField(verbose_name='متن')),
+                ('published', models.BooleanField(default=False, verbose_name='منتشر شده')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاریخ آپدیت')),
+            ],
+            options={
+                'verbose_name': 'سند جستجو',
+                'verbose_name_plural': 'اسناد جستجو',
+                'indexes': [models.Index(fields=['doc_type', 'published'], name='searchdoc_type_published_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('doc_type', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawfirm', '0005_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', '-is_best_answer', '-votes', 'created_at', 'is_published'], name='answer_question_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['-created_at', 'published'], name='blogpost_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['category', '-created_at', 'published'], name='blogpost_cat_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', 'is_read'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_at', 'is_published'], name='question_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['category', '-created_at', 'is_published'], name='question_cat_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['-created_at', 'is_published'], name='testimonial_created_pub_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawfirm', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='blogpost',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'مقاله', 'verbose_name_plural': 'مقالات'},
+        ),
+        migrations.AlterModelOptions(
+            name='question',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name': 'سوال', 'verbose_name_plural': 'سوالات'},
+        ),
+        migrations.RemoveIndex(
+            model_name='blogpost',
+            name='blogpost_created_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='blogpost',
+            name='blogpost_cat_created_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='question',
+            name='question_created_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='question',
+            name='question_cat_created_pub_idx',
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['-created_at', '-id', 'published'], name='blogpost_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['category', '-created_at', '-id', 'published'], name='blogpost_cat_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_at', '-id', 'is_published'], name='question_created_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['category', '-created_at', '-id', 'is_published'], name='question_cat_created_pub_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:03
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def populate(apps, schema_editor):
+    Answer = apps.get_model('lawfirm', 'Answer')
+    Question = apps.get_model('lawfirm', 'Question')
+    counts = {
+        row['question']: row
+        for row in Answer.objects.order_by().values('question').annotate(
+            total=Count('pk'), published=Count('pk', filter=Q(is_published=True)),
+        )
+    }
+    best_answers = {}
+    for question_id, answer_id in (
+        Answer.objects.filter(is_published=True, is_best_answer=True).order_by('-pk').values_list('question', 'pk')
+    ):
+        best_answers[question_id] = answer_id
+    questions = []
+    for question in Question.objects.filter(pk__in=counts.keys()).iterator():
+        question.answer_count = counts[question.pk]['total']
+        question.published_answer_count = counts[question.pk]['published']
+        question.best_answer_id = best_answers.get(question.pk)
+        questions.append(question)
+    Question.objects.bulk_update(
+        questions, ['answer_count', 'published_answer_count', 'best_answer'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawfirm', '0007_keyset_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد پاسخ\u200cها'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='best_answer',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='lawfirm.answer', verbose_name='بهترین پاسخ'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='published_answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد پاسخ\u200cهای منتشر شده'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lawfirm', '0008_question_answer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='وظیفه')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='داده\u200cها')),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('running', 'در حال اجرا'), ('failed', 'ناموفق')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='دفعات اجرا')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='حداکثر دفعات اجرا')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان اجرا')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان شروع')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='پردازشگر')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخرین خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+            ],
+            options={
+                'verbose_name': 'کار پس\u200cزمینه',
+                'verbose_name_plural': 'کارهای پس\u200cزمینه',
+                'ordering': ['run_at', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,61 @@
-from django.db import models
+import time
+
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .counters import record_view
+
+SITE_SETTINGS_VERSION_KEY = 'sitesettings:version'
+
+# Per-process copy of the SiteSettings row, see SiteSettings.load()
+_site_settings = {'version': None, 'instance': None, 'loaded_at': None}
+
+# Stands for a tracked field that was deferred when the row was loaded
+NOT_LOADED = object()
+
+
+class ChangeTrackingMixin:
+    """
+    Remembers the ``TRACKED_FIELDS`` values a row was loaded with, so
+    ``post_save`` receivers can ask ``changed_fields()`` instead of reading
+    the row again.  Fields that were deferred, and instances that were not
+    loaded from the database, have nothing to compare and never count as
+    changed.
+    """
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._tracked_values()
+        return instance
+
+    def _tracked_values(self, fields=None):
+        return {
+            name: self.__dict__.get(self._meta.get_field(name).attname, NOT_LOADED)
+            for name in (self.TRACKED_FIELDS if fields is None else fields)
+        }
+
+    def loaded_value(self, name):
+        return getattr(self, '_loaded_values', {}).get(name, NOT_LOADED)
+
+    def changed_fields(self):
+        """Tracked fields whose value differs from the one loaded from the database."""
+        return {
+            name for name, value in self._tracked_values().items()
+            if self.loaded_value(name) is not NOT_LOADED and value != self.loaded_value(name)
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The saved values are what the next save is compared with
+        update_fields = kwargs.get('update_fields')
+        fields = self.TRACKED_FIELDS if update_fields is None else set(self.TRACKED_FIELDS) & set(update_fields)
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **self._tracked_values(fields)}
 
 
 class Category(models.Model):
@@ -19,6 +73,15 @@ class Category(models.Model):
         return self.name
 
 
+class BlogPostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Rows for post lists and cards: category and author joined in, the
+        article body left out.
+        """
+        return self.select_related('category', 'author').defer('content')
+
+
 class BlogPost(models.Model):
     title = models.CharField(max_length=200, verbose_name="عنوان")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="نامک")
@@ -38,10 +101,16 @@ class BlogPost(models.Model):
     seo_description = models.CharField(max_length=160, blank=True, verbose_name="توضیح SEO", help_text="توضیحی برای موتور جستجو (حداکثر 160 کاراکتر)")
     seo_keywords = models.CharField(max_length=255, blank=True, verbose_name="کلمات کلیدی SEO", help_text="کلماتی جدا شده با کاما")
 
+    objects = BlogPostQuerySet.as_manager()
+
     class Meta:
         verbose_name = "مقاله"
         verbose_name_plural = "مقالات"
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id', 'published'], name='blogpost_created_pub_idx'),
+            models.Index(fields=['category', '-created_at', '-id', 'published'], name='blogpost_cat_created_pub_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -50,8 +119,8 @@ class BlogPost(models.Model):
         return reverse('lawfirm:blog_detail', kwargs={'slug': self.slug})
 
     def increment_views(self):
-        self.views += 1
-        self.save(update_fields=['views'])
+        """Record a view; ``views`` is updated in batches by lawfirm.counters"""
+        record_view(self)
     
     def get_seo_title(self):
         """Return SEO title or fallback to title"""
@@ -88,6 +157,18 @@ class QACategory(models.Model):
         return self.name
 
 
+ANSWER_STAT_FIELDS = {'answer_count', 'published_answer_count', 'best_answer'}
+
+
+class QuestionQuerySet(models.QuerySet):
+    def with_listing_data(self):
+        """
+        Everything a question list shows, in one query: the category joined
+        in, answer statistics from the denormalized columns.
+        """
+        return self.select_related('category')
+
+
 class Question(models.Model):
     title = models.CharField(max_length=200, verbose_name="عنوان سوال")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="نامک")
@@ -98,6 +179,13 @@ class Question(models.Model):
     views = models.PositiveIntegerField(default=0, verbose_name="تعداد بازدید")
     votes = models.IntegerField(default=0, verbose_name="امتیاز")
     is_answered = models.BooleanField(default=False, verbose_name="پاسخ داده شده")
+    # Kept up to date from the answers by lawfirm.answer_stats
+    answer_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد پاسخ‌ها")
+    published_answer_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد پاسخ‌های منتشر شده")
+    best_answer = models.ForeignKey(
+        'Answer', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name="بهترین پاسخ",
+    )
     is_published = models.BooleanField(default=False, verbose_name="منتشر شده")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ آپدیت")
@@ -107,10 +195,16 @@ class Question(models.Model):
     seo_description = models.CharField(max_length=160, blank=True, verbose_name="توضیح SEO", help_text="توضیحی برای موتور جستجو (حداکثر 160 کاراکتر)")
     seo_keywords = models.CharField(max_length=255, blank=True, verbose_name="کلمات کلیدی SEO", help_text="کلماتی جدا شده با کاما")
 
+    objects = QuestionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "سوال"
         verbose_name_plural = "سوالات"
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id', 'is_published'], name='question_created_pub_idx'),
+            models.Index(fields=['category', '-created_at', '-id', 'is_published'], name='question_cat_created_pub_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -118,15 +212,30 @@ class Question(models.Model):
     def get_absolute_url(self):
         return reverse('lawfirm:qa_detail', kwargs={'slug': self.slug})
 
+    def save(self, *args, **kwargs):
+        # An edit must not write back answer statistics read before it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ANSWER_STAT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def increment_views(self):
-        self.views += 1
-        self.save(update_fields=['views'])
+        """Record a view; ``views`` is updated in batches by lawfirm.counters"""
+        record_view(self)
+
+    @property
+    def has_best_answer(self):
+        return self.best_answer_id is not None
 
     def get_best_answer(self):
-        return self.answers.filter(is_best_answer=True).first()
+        """The published best answer, fetched once per instance"""
+        return self.best_answer if self.best_answer_id else None
 
     def get_answers_count(self):
-        return self.answers.count()
+        """Number of published answers"""
+        return self.published_answer_count
     
     def get_seo_title(self):
         """Return SEO title or fallback to title"""
@@ -169,18 +278,59 @@ class Answer(models.Model):
         verbose_name = "پاسخ"
         verbose_name_plural = "پاسخ‌ها"
         ordering = ['-is_best_answer', '-votes', 'created_at']
+        indexes = [
+            models.Index(
+                fields=['question', '-is_best_answer', '-votes', 'created_at', 'is_published'],
+                name='answer_question_order_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"پاسخ {self.answerer_name} به {self.question.title}"
 
     def save(self, *args, **kwargs):
-        # If this answer is marked as best answer, unmark others
-        if self.is_best_answer:
-            Answer.objects.filter(question=self.question, is_best_answer=True).update(is_best_answer=False)
-            # Update question as answered
-            self.question.is_answered = True
-            self.question.save(update_fields=['is_answered'])
-        super().save(*args, **kwargs)
+        # One transaction with the question statistics refreshed on post_save
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.is_best_answer:
+                # Unmarks the question's other best answer and answers it
+                from .answers import mark_best_answer
+                mark_best_answer(self)
+
+
+class Vote(models.Model):
+    """One row per voter per question/answer; Question.votes and Answer.votes hold the tally"""
+    VALUE_CHOICES = [
+        (1, 'مثبت'),
+        (-1, 'منفی'),
+    ]
+
+    voter = models.CharField(max_length=64, verbose_name="رأی‌دهنده", help_text="user:<id> یا session:<key>")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="کاربر", related_name='votes')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, null=True, blank=True, verbose_name="سوال", related_name='vote_records')
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, null=True, blank=True, verbose_name="پاسخ", related_name='vote_records')
+    value = models.IntegerField(verbose_name="مقدار")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ آپدیت")
+
+    class Meta:
+        verbose_name = "رأی"
+        verbose_name_plural = "آرا"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['voter', 'question'], name='unique_question_vote'),
+            models.UniqueConstraint(fields=['voter', 'answer'], name='unique_answer_vote'),
+            # Exactly one target, or a NULL one would slip past the unique constraints
+            models.CheckConstraint(
+                check=models.Q(question__isnull=False, answer__isnull=True)
+                | models.Q(question__isnull=True, answer__isnull=False),
+                name='vote_single_target',
+            ),
+        ]
+
+    def __str__(self):
+        target = self.question_id and f"سوال {self.question_id}" or f"پاسخ {self.answer_id}"
+        return f"{self.voter} → {target} ({self.value:+d})"
 
 
 class ConsultationType(models.Model):
@@ -199,7 +349,7 @@ class ConsultationType(models.Model):
         return f"{self.name} - {self.price:,} تومان"
 
 
-class ConsultationRequest(models.Model):
+class ConsultationRequest(ChangeTrackingMixin, models.Model):
     CONSULTATION_FIELDS = [
         ('family', 'حقوق خانواده'),
         ('criminal', 'حقوق کیفری'),
@@ -230,10 +380,16 @@ class ConsultationRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ درخواست")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ آپدیت")
 
+    # Changes the user is notified about, see lawfirm/notifications.py
+    TRACKED_FIELDS = ('status', 'scheduled_date', 'admin_message')
+
     class Meta:
         verbose_name = "درخواست مشاوره"
         verbose_name_plural = "درخواست‌های مشاوره"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='consultation_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"مشاوره {self.full_name} - {self.get_field_display()}"
@@ -254,6 +410,9 @@ class ContactMessage(models.Model):
         verbose_name = "پیام تماس"
         verbose_name_plural = "پیام‌های تماس"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='contactmsg_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"پیام {self.full_name} - {self.created_at.strftime('%Y/%m/%d')}"
@@ -272,6 +431,9 @@ class Testimonial(models.Model):
         verbose_name = "نظر مشتری"
         verbose_name_plural = "نظرات مشتریان"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'is_published'], name='testimonial_created_pub_idx'),
+        ]
 
     def __str__(self):
         return f"نظر {self.name}"
@@ -303,10 +465,42 @@ class SiteSettings(models.Model):
 
     def save(self, *args, **kwargs):
         # Ensure only one instance exists
-        if not self.pk and SiteSettings.objects.exists():
+        if not self.pk and SiteSettings.load() is not None:
             raise Exception('تنها یک نمونه از تنظیمات سایت مجاز است')
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def load(cls):
+        """
+        Return the site settings (or None), loaded once per process.
+
+        Saves and deletes bump a version number in the cache (see
+        lawfirm/signals.py); the row is re-read after that changes, or after
+        ``SITE_SETTINGS_TTL`` seconds in case the bump went to a cache this
+        process does not share.
+        """
+        version = cache.get(SITE_SETTINGS_VERSION_KEY, 0)
+        now = time.monotonic()
+        loaded_at = _site_settings['loaded_at']
+        if (
+            _site_settings['version'] != version or loaded_at is None
+            or now - loaded_at >= getattr(settings, 'SITE_SETTINGS_TTL', 60)
+        ):
+            _site_settings['instance'] = cls.objects.first()
+            _site_settings['version'] = version
+            _site_settings['loaded_at'] = now
+        return _site_settings['instance']
+
+    @classmethod
+    def invalidate(cls):
+        """Make every process reload the settings on its next load()"""
+        _site_settings['version'] = None
+        cache.add(SITE_SETTINGS_VERSION_KEY, 0, timeout=None)
+        try:
+            cache.incr(SITE_SETTINGS_VERSION_KEY)
+        except ValueError:
+            cache.set(SITE_SETTINGS_VERSION_KEY, 1, timeout=None)
+
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
@@ -329,6 +523,9 @@ class Notification(models.Model):
         verbose_name = "اطلاع"
         verbose_name_plural = "اطلاعات"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id', 'is_read'], name='notification_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -336,3 +533,98 @@ class Notification(models.Model):
     def mark_as_read(self):
         self.is_read = True
         self.save(update_fields=['is_read'])
+
+
+class Broadcast(models.Model):
+    """A site-wide announcement: one row for everyone, read per user through BroadcastReceipt"""
+    title = models.CharField(max_length=200, verbose_name="عنوان")
+    message = models.TextField(verbose_name="پیام")
+    is_active = models.BooleanField(default=True, verbose_name="فعال")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+
+    class Meta:
+        verbose_name = "اطلاعیه عمومی"
+        verbose_name_plural = "اطلاعیه‌های عمومی"
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return self.title
+
+
+class BroadcastReceipt(models.Model):
+    """Marks a broadcast as read by a user; no row means unread"""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='receipts', verbose_name="اطلاعیه")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_receipts', verbose_name="کاربر")
+    read_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان خواندن")
+
+    class Meta:
+        verbose_name = "رسید اطلاعیه"
+        verbose_name_plural = "رسیدهای اطلاعیه"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_receipt'),
+        ]
+
+    def __str__(self):
+        return f"{self.broadcast} - {self.user.username}"
+
+
+class SearchDocument(models.Model):
+    """Normalized copy of a BlogPost/Question used by the full-text index (lawfirm.fulltext)"""
+    DOC_TYPES = [
+        ('blog', 'مقاله'),
+        ('question', 'سوال'),
+    ]
+
+    doc_type = models.CharField(max_length=20, choices=DOC_TYPES, verbose_name="نوع")
+    object_id = models.PositiveBigIntegerField(verbose_name="شناسه")
+    title = models.CharField(max_length=255, verbose_name="عنوان")
+    body = models.TextField(verbose_name="متن")
+    published = models.BooleanField(default=False, verbose_name="منتشر شده")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ آپدیت")
+
+    class Meta:
+        verbose_name = "سند جستجو"
+        verbose_name_plural = "اسناد جستجو"
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['doc_type', 'published'], name='searchdoc_type_published_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_doc_type_display()} {self.object_id}: {self.title}"
+
+
+class Job(models.Model):
+    """A queued background task, run by `manage.py run_worker` (lawfirm.jobs)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'در صف'),
+        (RUNNING, 'در حال اجرا'),
+        (FAILED, 'ناموفق'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="وظیفه")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="داده‌ها")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="وضعیت")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="دفعات اجرا")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="حداکثر دفعات اجرا")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="زمان اجرا")
+    locked_at = models.DateTimeField(blank=True, null=True, verbose_name="زمان شروع")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="پردازشگر")
+    last_error = models.TextField(blank=True, verbose_name="آخرین خطا")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+
+    class Meta:
+        verbose_name = "کار پس‌زمینه"
+        verbose_name_plural = "کارهای پس‌زمینه"
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
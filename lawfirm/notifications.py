@@ -0,0 +1,383 @@
+"""
+User notifications about their consultation requests.
+
+``consultation_notifications`` turns one saved consultation into the
+``Notification`` rows it calls for, using the values the row was loaded with
+(``ChangeTrackingMixin``) rather than reading it again.  ``notify_consultations``
+builds them for any number of consultations and writes them with a single
+``bulk_create``.
+
+Saves do not write notifications themselves: the ``post_save`` receiver in
+lawfirm/signals.py passes what changed, and the new values, to
+``queue_consultations``, and a job (lawfirm/jobs.py) writes the
+notifications of every queued change in one go.
+
+Site-wide announcements are ``Broadcast`` rows, one for everybody, and a
+``BroadcastReceipt`` per user who has read one, instead of a notification
+row per user.
+
+The unread badge on every page asks for ``unread_count`` (notifications plus
+broadcasts), which is kept per user in the cache together with the id of the
+user's newest notification.  Every read looks that id up (one step down the
+``user, created_at, id, is_read`` index) and counts again when it changed,
+so notifications written by a process that does not share the cache, such
+as a job worker, still show at once.  Reading or deleting notifications
+resets the cached count.  A broadcast changes everybody's count, so it
+moves all users to new cache keys at once.  A count that was missed, e.g.
+by a reset racing a recount, lasts at most ``NOTIFICATION_COUNT_TIMEOUT``
+seconds.
+
+``compact`` deletes read notifications older than
+``NOTIFICATION_RETENTION_DAYS`` and withdrawn broadcasts, in batches, so the
+per-user queries keep reading few index entries
+(``manage.py compact_notifications``).
+
+Pages served through ASGI keep the badge current with ``stream``, a
+Server-Sent Events feed of new notifications and unread counts: the same
+changes publish the user's channel (lawfirm/events.py), and each stream
+polls the database every ``NOTIFICATION_STREAM_POLL`` seconds for changes
+published by other processes.  A stream closes its database connection after
+each poll (handing it back to the pool, if one is configured) instead of
+holding it for its whole lifetime.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, events, jobs
+from .models import Broadcast, BroadcastReceipt, ConsultationRequest, Notification
+
+CONSULTATION_JOB = 'notifications.consultations'
+UNREAD_KEY = 'notifications:unread:{}:{}'
+# Cache generation group (lawfirm/caching.py) and events channel of broadcasts
+BROADCASTS = 'broadcasts'
+# Milliseconds EventSource waits before reconnecting
+STREAM_RETRY = 5000
+STREAM_BATCH = 50
+
+STATUS_NOTIFICATIONS = {
+    'confirmed': (
+        'consultation_scheduled',
+        'درخواست مشاوره تأیید شد',
+        'درخواست مشاوره شما توسط مدیریت تأیید شد. لطفاً برای مشاهده جزئیات وارد پروفایل خود شوید.',
+    ),
+    'completed': (
+        'consultation_completed',
+        'مشاوره انجام شد',
+        'مشاوره شما با موفقیت انجام شد. از استفاده از خدمات ما متشکریم.',
+    ),
+    'cancelled': (
+        'consultation_update',
+        'درخواست مشاوره لغو شد',
+        'درخواست مشاوره شما لغو شده است. برای اطلاعات بیشتر با ما تماس بگیرید.',
+    ),
+}
+
+
+def consultation_notifications(consultation, created=False, changed=None):
+    """
+    Unsaved notifications for ``consultation``, just created or changed in
+    ``changed`` (by default ``consultation.changed_fields()``).
+    """
+    if not consultation.user_id:
+        return []
+
+    def notification(notification_type, title, message):
+        return Notification(
+            user_id=consultation.user_id, notification_type=notification_type,
+            title=title, message=message, consultation=consultation,
+        )
+
+    if created:
+        return [notification(
+            'general', 'درخواست مشاوره ثبت شد',
+            'درخواست مشاوره شما با موفقیت ثبت شد. منتظر تأیید مدیریت باشید.',
+        )]
+
+    if changed is None:
+        changed = consultation.changed_fields()
+    notifications = []
+    if 'status' in changed and consultation.status in STATUS_NOTIFICATIONS:
+        notifications.append(notification(*STATUS_NOTIFICATIONS[consultation.status]))
+    if 'scheduled_date' in changed and consultation.scheduled_date:
+        scheduled_date_str = consultation.scheduled_date.strftime('%Y/%m/%d')
+        scheduled_time_str = consultation.scheduled_date.strftime('%H:%M')
+        notifications.append(notification(
+            'consultation_scheduled', 'زمان مشاوره تعیین شد',
+            f'زمان مشاوره شما تعیین شد: {scheduled_date_str} ساعت {scheduled_time_str}',
+        ))
+    if 'admin_message' in changed and consultation.admin_message:
+        notifications.append(notification('consultation_update', 'پیام جدید از مدیریت', consultation.admin_message))
+    return notifications
+
+
+def notify_consultations(changes, batch_size=500):
+    """
+    Write the notifications for ``changes``, ``(consultation, created, changed)``
+    tuples as taken by ``consultation_notifications``, in one ``bulk_create``.
+    """
+    notifications = [
+        notification
+        for consultation, created, changed in changes
+        for notification in consultation_notifications(consultation, created, changed)
+    ]
+    if notifications:
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        unread_added(notification.user_id for notification in notifications)
+    return notifications
+
+
+def _unread_timeout():
+    return getattr(settings, 'NOTIFICATION_COUNT_TIMEOUT', 3600)
+
+
+def _unread_key(user_id):
+    return UNREAD_KEY.format(caching.get_generations([BROADCASTS])[0], user_id)
+
+
+def unread_broadcasts(user_id):
+    """Active broadcasts made since the user ``user_id`` joined that they have not read."""
+    joined = User.objects.filter(pk=user_id).values('date_joined')
+    return Broadcast.objects.filter(is_active=True, created_at__gte=Subquery(joined)).exclude(
+        receipts__user_id=user_id,
+    )
+
+
+def _newest_id(user_id):
+    return Notification.objects.filter(user_id=user_id).order_by('-created_at', '-id').values_list(
+        'pk', flat=True,
+    ).first() or 0
+
+
+def unread_count(user_id):
+    """Number of unread notifications and broadcasts of the user ``user_id``."""
+    key = _unread_key(user_id)
+    newest = _newest_id(user_id)
+    cached = cache.get(key)
+    if cached is not None and cached[1] == newest:
+        return cached[0]
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    count += unread_broadcasts(user_id).count()
+    cache.set(key, (count, newest), _unread_timeout())
+    return count
+
+
+def user_channel(user_id):
+    return f'notifications:{user_id}'
+
+
+def unread_added(user_ids):
+    """Recount the badges of ``user_ids``, who got new notifications, once committed."""
+    user_ids = set(user_ids)
+
+    def reset():
+        cache.delete_many([_unread_key(user_id) for user_id in user_ids])
+        events.publish(*(user_channel(user_id) for user_id in user_ids))
+
+    if user_ids:
+        transaction.on_commit(reset)
+
+
+def reset_unread(user_id):
+    """Drop the cached count of ``user_id`` once committed, after notifications were read or deleted."""
+    def reset():
+        cache.delete(_unread_key(user_id))
+        events.publish(user_channel(user_id))
+
+    transaction.on_commit(reset)
+
+
+def broadcasts_changed():
+    """A broadcast was added, withdrawn or deleted: recount every user's badge once committed."""
+    def bump():
+        caching.bump(BROADCASTS)
+        events.publish(BROADCASTS)
+
+    transaction.on_commit(bump)
+
+
+def mark_broadcasts_read(user_id, up_to=None):
+    """Record that ``user_id`` read their unread broadcasts (those up to the id ``up_to``)."""
+    broadcasts = unread_broadcasts(user_id)
+    if up_to is not None:
+        broadcasts = broadcasts.filter(pk__lte=up_to)
+    receipts = BroadcastReceipt.objects.bulk_create(
+        [BroadcastReceipt(broadcast_id=pk, user_id=user_id) for pk in broadcasts.values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    if receipts:
+        reset_unread(user_id)
+    return len(receipts)
+
+
+def compact(days=None, batch_size=1000, dry_run=False):
+    """
+    Delete read notifications older than ``days`` (``NOTIFICATION_RETENTION_DAYS``)
+    and broadcasts withdrawn as long ago, with their receipts.
+
+    Notifications are walked in primary key order a batch at a time, so each
+    DELETE is short and the whole run reads the table once.  Returns the
+    number of notifications and of broadcasts deleted (or due, on a dry run).
+    """
+    if days is None:
+        days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timedelta(days=days)
+
+    notifications = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            Notification.objects.filter(pk__gt=last_pk, is_read=True, created_at__lt=cutoff)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_pk = ids[-1]
+        if not dry_run:
+            Notification.objects.filter(pk__in=ids).delete()
+        notifications += len(ids)
+
+    broadcast_ids = list(
+        Broadcast.objects.filter(is_active=False, created_at__lt=cutoff).values_list('pk', flat=True)
+    )
+    if broadcast_ids and not dry_run:
+        # A receipt per reader: delete them in batches before their broadcasts
+        while True:
+            receipt_ids = list(
+                BroadcastReceipt.objects.filter(broadcast__in=broadcast_ids).values_list('pk', flat=True)[:batch_size]
+            )
+            if not receipt_ids:
+                break
+            BroadcastReceipt.objects.filter(pk__in=receipt_ids).delete()
+        Broadcast.objects.filter(pk__in=broadcast_ids).delete()
+    return notifications, len(broadcast_ids)
+
+
+def _event(name, data, event_id):
+    data = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'id: {event_id}\nevent: {name}\ndata: {data}\n\n'
+
+
+def _release_connection():
+    # Each stream runs its queries in a thread of its own, whose connection
+    # would otherwise stay open until the stream ends
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+@sync_to_async
+def _latest_id(user_id):
+    try:
+        return Notification.objects.filter(user_id=user_id).order_by('-pk').values_list('pk', flat=True).first() or 0
+    finally:
+        _release_connection()
+
+
+@sync_to_async
+def _changes(user_id, last_id):
+    try:
+        rows = list(
+            Notification.objects.filter(user_id=user_id, pk__gt=last_id).order_by('pk')
+            .values('id', 'notification_type', 'title', 'message', 'created_at')[:STREAM_BATCH]
+        )
+        return rows, unread_count(user_id)
+    finally:
+        _release_connection()
+
+
+async def stream(user_id, last_id=None):
+    """
+    Server-Sent Events for ``user_id``: a ``notification`` event for each
+    notification after ``last_id`` (by default, after the latest one) and a
+    ``count`` event whenever the unread count changes, starting with the
+    current count.  Event ids are notification ids, so a reconnecting
+    EventSource resumes from its ``Last-Event-ID``.
+
+    The stream ends after ``NOTIFICATION_STREAM_LIFETIME`` seconds and the
+    browser reconnects, so connections of departed clients do not pile up.
+    """
+    loop = asyncio.get_running_loop()
+    poll = getattr(settings, 'NOTIFICATION_STREAM_POLL', 15)
+    deadline = loop.time() + getattr(settings, 'NOTIFICATION_STREAM_LIFETIME', 300)
+    with events.subscribe(user_channel(user_id), BROADCASTS) as wake:
+        if last_id is None:
+            last_id = await _latest_id(user_id)
+        yield f'retry: {STREAM_RETRY}\n\n'
+        count = None
+        while True:
+            wake.clear()
+            rows, unread = await _changes(user_id, last_id)
+            for row in rows:
+                last_id = row['id']
+                yield _event('notification', row, last_id)
+            if unread != count:
+                count = unread
+                yield _event('count', {'count': count}, last_id)
+            if len(rows) == STREAM_BATCH:
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), min(poll, remaining))
+            except asyncio.TimeoutError:
+                # Also keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+
+
+def queue_consultations(changes):
+    """
+    Queue the notifications for ``changes`` (see ``notify_consultations``) for
+    a worker.  The payload carries the new values of the changed fields, so
+    each change is told as it was made even if the row changes again before
+    the job runs.
+    """
+    payloads = []
+    for consultation, created, changed in changes:
+        if changed is None:
+            changed = consultation.changed_fields()
+        if consultation.user_id and (created or changed):
+            values = {field: getattr(consultation, field) for field in changed}
+            payloads.append({
+                'consultation': consultation.pk, 'user': consultation.user_id, 'created': created,
+                'changed': sorted(changed), 'values': json.loads(json.dumps(values, cls=DjangoJSONEncoder)),
+            })
+    jobs.enqueue_many(CONSULTATION_JOB, payloads)
+
+
+def _queued_consultation(payload, current):
+    """The consultation as it was when ``payload`` was queued."""
+    if 'values' not in payload:
+        # Queued without the values: fall back to the row as it is now
+        return current
+    values = dict(payload['values'])
+    if values.get('scheduled_date'):
+        values['scheduled_date'] = parse_datetime(values['scheduled_date'])
+    return ConsultationRequest(pk=current.pk, user_id=payload['user'], **values)
+
+
+@jobs.task(CONSULTATION_JOB)
+def send_consultation_notifications(payloads):
+    consultations = ConsultationRequest.objects.only(
+        'user', *ConsultationRequest.TRACKED_FIELDS,
+    ).in_bulk({payload['consultation'] for payload in payloads})
+    # Deleted consultations no longer need telling about
+    notify_consultations(
+        (
+            _queued_consultation(payload, consultations[payload['consultation']]),
+            payload['created'], set(payload['changed']),
+        )
+        for payload in payloads if payload['consultation'] in consultations
+    )
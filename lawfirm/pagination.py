@@ -0,0 +1,155 @@
+"""
+Keyset (cursor) pagination for the blog and Q&A listings.
+
+``Paginator`` pages with ``OFFSET``, which makes every deeper page scan all
+the rows before it, and asks for ``COUNT(*)`` on each request.
+``CursorPaginator`` instead remembers the sort key of the last row shown
+and asks for the rows after it::
+
+    WHERE created_at <= %s AND (created_at < %s OR (created_at = %s AND id < %s))
+    ORDER BY created_at DESC, id DESC LIMIT 7
+
+which reads the same few index entries on page 1 and on page 1000.  The
+position travels in opaque, signed ``cursor`` tokens (``next_cursor`` /
+``previous_cursor``), and the total is taken from a cached count that is
+refreshed when the listing's content group changes.
+"""
+
+import hashlib
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+from .caching import get_generations, page_timeout
+
+CURSOR_SALT = 'lawfirm.pagination'
+
+
+def cached_count(queryset, group):
+    """``queryset.count()``, cached until ``group`` changes (see lawfirm/caching.py)."""
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'count:{group}:{get_generations([group])[0]}:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, page_timeout())
+    return count
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def count(self):
+        return self.paginator.count
+
+
+class CursorPaginator:
+    """
+    Page ``queryset`` by ``ordering``, a list of fields (``-`` for descending)
+    that together are unique, such as ``['-created_at', '-id']``.  Fields may
+    be annotations.  ``group`` is the content group whose changes refresh the
+    cached total.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), group=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        self.group = group
+
+    @property
+    def count(self):
+        if self.group is None:
+            return self.queryset.count()
+        return cached_count(self.queryset, self.group)
+
+    def encode_cursor(self, obj, backwards):
+        position = [self._serialize(getattr(obj, name)) for name, _ in self.ordering]
+        return signing.dumps({'p': position, 'b': backwards}, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return ``(position, backwards)``; a missing or tampered token means the first page."""
+        if not cursor:
+            return None, False
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            if len(data['p']) != len(self.ordering):
+                return None, False
+            position = [self._deserialize(name, value) for (name, _), value in zip(self.ordering, data['p'])]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None, False
+        return position, bool(data.get('b'))
+
+    def _serialize(self, value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def _deserialize(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation such as search_rank
+            return value
+        return field.to_python(value)
+
+    def rows_after(self, position, backwards=False):
+        """Q for the rows after ``position`` in the (possibly reversed) ordering."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # A plain range on the first key, implied by the OR above, lets the
+        # database seek into the index instead of scanning it from the start
+        (name, descending), value = self.ordering[0], position[0]
+        return Q(**{f"{name}__{'lte' if descending != backwards else 'gte'}": value}) & condition
+
+    def get_page(self, cursor=None):
+        position, backwards = self.decode_cursor(cursor)
+        order_by = [f"{'-' if descending != backwards else ''}{name}" for name, descending in self.ordering]
+        queryset = self.queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self.rows_after(position, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if backwards:
+            # We came back from a later page, so there is one
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, position is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], backwards=False)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
@@ -39,6 +39,7 @@ def render_seo_meta_tags(obj):
 # Template tag for structured data (Schema.org)
 def render_question_schema(question):
     """Render Schema.org Question schema"""
+    best_answer = question.get_best_answer()
     schema = {
         "@context": "https://schema.org",
         "@type": "FAQPage",
@@ -58,12 +59,11 @@ def render_question_schema(question):
                     "@type": "Organization",
                     "name": "موسسه حقوقی دادگان"
                 }
-            } if question.get_best_answer() else None
+            } if best_answer else None
         }
     }
     
     # Add best answer if exists
-    best_answer = question.get_best_answer()
     if best_answer:
         schema["mainEntity"]["acceptedAnswer"]["text"] = best_answer.content
     else:
@@ -1,84 +1,141 @@
-from django.db.models.signals import post_save
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from django.utils import timezone
-from datetime import timedelta
-from .models import ConsultationRequest, Notification
+from . import answer_stats, caching, counters, fulltext, notifications, sitemaps
+from .db import metrics as db_metrics, router as db_router
+from .fulltext import autocomplete
+from .models import (
+    BlogPost, Question, Answer, Category, QACategory, Broadcast, ConsultationRequest, Notification, SiteSettings
+)
+
+AUTOCOMPLETE_FIELDS = {'title', 'name', 'slug', 'category', 'published', 'is_published'}
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Question)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text index in sync with blog posts and questions"""
+    if update_fields and not set(update_fields) & fulltext.INDEXED_FIELDS[sender]:
+        return
+    fulltext.index_object(instance)
+    if fulltext.inverted.is_enabled():
+        fulltext.inverted.schedule(sender, instance.pk)
+
+
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Question)
+def delete_search_document(sender, instance, **kwargs):
+    fulltext.remove_object(instance)
+    if fulltext.inverted.is_enabled():
+        fulltext.inverted.schedule(sender, instance.pk)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=QACategory)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=QACategory)
+def invalidate_autocomplete(sender, instance, update_fields=None, **kwargs):
+    """Titles, slugs, categories or publication changed: rebuild live-search suggestions"""
+    if update_fields and not set(update_fields) & AUTOCOMPLETE_FIELDS:
+        return
+    # Once committed, or a request could rebuild from the old rows under the new version
+    transaction.on_commit(autocomplete.invalidate)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Question)
+def invalidate_sitemap(sender, instance, update_fields=None, **kwargs):
+    """Rebuild the sitemap shard listing the row"""
+    if update_fields and not set(update_fields) & sitemaps.FIELDS:
+        return
+    sitemaps.invalidate(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def update_question_search_entry(sender, instance, **kwargs):
+    """Answers are indexed as part of their question in the inverted index"""
+    if fulltext.inverted.is_enabled():
+        # By commit time the question may be gone too (a cascading delete)
+        fulltext.inverted.schedule(Question, instance.question_id)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def refresh_answer_stats(sender, instance, update_fields=None, **kwargs):
+    """Keep the question's denormalized answer statistics in step"""
+    if update_fields and not set(update_fields) & {'question', 'is_published', 'is_best_answer'}:
+        return
+    answer_stats.refresh(instance.question_id)
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def invalidate_site_settings(sender, **kwargs):
+    """Reload the cached site settings once the change is committed"""
+    transaction.on_commit(SiteSettings.invalidate)
+
+
+def invalidate_page_cache(sender, **kwargs):
+    """Content feeding the cached public pages changed"""
+    # After the commit, or a request in between re-caches the old content under the new generation
+    transaction.on_commit(lambda: caching.invalidate_model(sender))
+    transaction.on_commit(db_router.content_changed)
+
+
+for model in caching.DEPENDENCIES:
+    post_save.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_page_cache, sender=model, dispatch_uid=f'page_cache_delete_{model.__name__}')
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    db_metrics.incr('connects')
+
+
+@receiver(request_finished)
+def count_request(sender, **kwargs):
+    db_metrics.request_finished()
+
+
+@receiver(request_finished)
+def flush_view_counts(sender, **kwargs):
+    """Write buffered views once the response that made the flush due is sent"""
+    counters.flush_if_requested()
 
 
 @receiver(post_save, sender=ConsultationRequest)
 def create_notification_on_consultation_update(sender, instance, created, **kwargs):
-    """
-    Signal to create notification when consultation is updated
-    """
-    if not instance.user:
-        return
-    
-    # Only create notification if status changed or scheduled_date was set
+    """Tell the user about a new consultation, or a status, schedule or message change"""
+    notifications.queue_consultations([(instance, created, None)])
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the cached unread-notification count of the user in step"""
     if created:
-        # New consultation created
-        Notification.objects.create(
-            user=instance.user,
-            notification_type='general',
-            title='درخواست مشاوره ثبت شد',
-            message='درخواست مشاوره شما با موفقیت ثبت شد. منتظر تأیید مدیریت باشید.',
-            consultation=instance,
-        )
-    else:
-        # Check if consultation was updated
-        try:
-            previous = ConsultationRequest.objects.get(pk=instance.pk)
-            
-            # Notification for status change
-            if previous.status != instance.status:
-                if instance.status == 'confirmed':
-                    Notification.objects.create(
-                        user=instance.user,
-                        notification_type='consultation_scheduled',
-                        title='درخواست مشاوره تأیید شد',
-                        message='درخواست مشاوره شما توسط مدیریت تأیید شد. لطفاً برای مشاهده جزئیات وارد پروفایل خود شوید.',
-                        consultation=instance,
-                    )
-                elif instance.status == 'completed':
-                    Notification.objects.create(
-                        user=instance.user,
-                        notification_type='consultation_completed',
-                        title='مشاوره انجام شد',
-                        message='مشاوره شما با موفقیت انجام شد. از استفاده از خدمات ما متشکریم.',
-                        consultation=instance,
-                    )
-                elif instance.status == 'cancelled':
-                    Notification.objects.create(
-                        user=instance.user,
-                        notification_type='consultation_update',
-                        title='درخواست مشاوره لغو شد',
-                        message='درخواست مشاوره شما لغو شده است. برای اطلاعات بیشتر با ما تماس بگیرید.',
-                        consultation=instance,
-                    )
-            
-            # Notification for scheduled date
-            if previous.scheduled_date != instance.scheduled_date and instance.scheduled_date:
-                # Format date in Persian format
-                scheduled_date_str = instance.scheduled_date.strftime('%Y/%m/%d')
-                scheduled_time_str = instance.scheduled_date.strftime('%H:%M')
-                
-                message = f'زمان مشاوره شما تعیین شد: {scheduled_date_str} ساعت {scheduled_time_str}'
-                
-                Notification.objects.create(
-                    user=instance.user,
-                    notification_type='consultation_scheduled',
-                    title='زمان مشاوره تعیین شد',
-                    message=message,
-                    consultation=instance,
-                )
-            
-            # Notification for admin message
-            if previous.admin_message != instance.admin_message and instance.admin_message:
-                Notification.objects.create(
-                    user=instance.user,
-                    notification_type='consultation_update',
-                    title='پیام جدید از مدیریت',
-                    message=instance.admin_message,
-                    consultation=instance,
-                )
-        except ConsultationRequest.DoesNotExist:
-            pass
+        if not instance.is_read:
+            notifications.unread_added([instance.user_id])
+    elif update_fields is None or 'is_read' in update_fields:
+        notifications.reset_unread(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def forget_unread_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        notifications.reset_unread(instance.user_id)
+
+
+@receiver(post_save, sender=Broadcast)
+@receiver(post_delete, sender=Broadcast)
+def broadcast_changed(sender, instance, **kwargs):
+    """Announcements count towards every user's unread badge"""
+    notifications.broadcasts_changed()
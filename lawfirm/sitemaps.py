@@ -0,0 +1,195 @@
+"""
+Sharded, cached sitemap.xml.
+
+``/sitemap.xml`` is a sitemap index naming one document for the fixed pages
+and one per *shard* of each section: a shard holds the published rows whose
+primary keys fall in one ``SITEMAP_SHARD_SIZE``-wide range, so it is read
+with a primary-key range scan and a row keeps its shard for good.  Each
+shard is built from a ``values_list`` stream (slug and ``updated_at``, which
+becomes the ``lastmod``) and cached with its newest ``lastmod``, which the
+index repeats.
+
+Every shard has its own cache generation (lawfirm/caching.py).  Saving or
+deleting a row bumps the generation of its shard and of the index once the
+transaction commits, so only that shard is rebuilt; a shard built from data
+read before the change is stored under the old generation and never served.
+``invalidate`` with no primary keys (bulk writes) drops a whole section.
+Cached documents also expire after ``SITEMAP_CACHE_TIMEOUT`` seconds.
+
+The last shard of a section comes from its ``MAX(id)``, cached under the
+index generation; shard numbers past it are refused without a query, so
+crawling made-up numbers neither runs queries nor fills the cache.
+
+Documents are cached with a placeholder for the scheme and host, which are
+filled in from each request.
+"""
+
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.urls import reverse
+from django.utils.encoding import iri_to_uri
+
+from . import caching
+from .models import BlogPost, Question
+
+# section -> (model, filter of the rows listed, url name of a row)
+SECTIONS = {
+    'blog': (BlogPost, {'published': True}, 'lawfirm:blog_detail'),
+    'qa': (Question, {'is_published': True}, 'lawfirm:qa_detail'),
+}
+# Fields whose change can move a row in or out of its shard or change its entry
+FIELDS = {'slug', 'published', 'is_published', 'updated_at'}
+PAGES = ['lawfirm:home', 'lawfirm:blog_list', 'lawfirm:qa_list']
+
+INDEX_GROUP = 'sitemap'
+# Cache generation groups dropping every cached sitemap document when bumped
+GROUPS = [INDEX_GROUP, *(f'sitemap:{section}' for section in SECTIONS)]
+SHARD_KEY = 'sitemap:{}:{}:{}:{}'
+INDEX_KEY = 'sitemap:index:{}:{}'
+LAST_SHARD_KEY = 'sitemap:last:{}:{}:{}'
+
+ORIGIN_PLACEHOLDER = '__origin__'
+SLUG_PLACEHOLDER = '__slug__'
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def shard_size():
+    return getattr(settings, 'SITEMAP_SHARD_SIZE', 5000)
+
+
+def _timeout():
+    return getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 86400)
+
+
+def shard_of(pk):
+    return (pk - 1) // shard_size() + 1
+
+
+def _section_group(section):
+    return f'sitemap:{section}'
+
+
+def _shard_group(section, shard):
+    return f'sitemap:{section}:{shard}'
+
+
+def _loc(path):
+    return f'<loc>{ORIGIN_PLACEHOLDER}{escape(path)}</loc>'
+
+
+def _lastmod(value):
+    return f'<lastmod>{value.isoformat(timespec="seconds")}</lastmod>' if value else ''
+
+
+def _build_shard(section, shard):
+    """The ``<urlset>`` of one shard and its newest ``updated_at``, or ``(None, None)`` if it is empty."""
+    model, filters, url_name = SECTIONS[section]
+    size = shard_size()
+    # reverse() once, then put each slug in its place
+    url = reverse(url_name, kwargs={'slug': SLUG_PLACEHOLDER})
+    rows = model.objects.filter(pk__gt=(shard - 1) * size, pk__lte=shard * size, **filters).order_by('pk')
+    entries = []
+    newest = None
+    for slug, updated_at in rows.values_list('slug', 'updated_at').iterator(chunk_size=2000):
+        entries.append(f'<url>{_loc(url.replace(SLUG_PLACEHOLDER, iri_to_uri(slug)))}{_lastmod(updated_at)}</url>')
+        if newest is None or updated_at > newest:
+            newest = updated_at
+    if not entries:
+        return None, None
+    return f'{XML_HEADER}<urlset xmlns="{NAMESPACE}">\n' + '\n'.join(entries) + '\n</urlset>\n', newest
+
+
+def _last_shard(section):
+    """The number of the last shard of ``section``, 0 if it has no rows."""
+    key = LAST_SHARD_KEY.format(section, shard_size(), caching.get_generations([INDEX_GROUP])[0])
+    last = cache.get(key)
+    if last is None:
+        model = SECTIONS[section][0]
+        last_pk = model.objects.aggregate(last=Max('pk'))['last']
+        last = shard_of(last_pk) if last_pk else 0
+        cache.set(key, last, _timeout())
+    return last
+
+
+def _shards(section, shards):
+    """``{shard: (document, lastmod)}`` for ``shards`` of ``section``, building the ones not cached."""
+    groups = [_section_group(section)] + [_shard_group(section, shard) for shard in shards]
+    generations = caching.get_generations(groups)
+    keys = {
+        shard: SHARD_KEY.format(section, shard_size(), f'{generations[0]}.{generation}', shard)
+        for shard, generation in zip(shards, generations[1:])
+    }
+    cached = cache.get_many(keys.values())
+    documents = {}
+    missing = {}
+    for shard, key in keys.items():
+        if key in cached:
+            documents[shard] = cached[key]
+        else:
+            documents[shard] = missing[key] = _build_shard(section, shard)
+    if missing:
+        cache.set_many(missing, _timeout())
+    return documents
+
+
+def shard(section, number):
+    """The cached ``<urlset>`` of one shard, or ``None`` if there is no such shard."""
+    if section not in SECTIONS or not 1 <= number <= _last_shard(section):
+        return None
+    return _shards(section, [number])[number][0]
+
+
+def pages():
+    """The ``<urlset>`` of the fixed pages."""
+    entries = '\n'.join(f'<url>{_loc(reverse(name))}</url>' for name in PAGES)
+    return f'{XML_HEADER}<urlset xmlns="{NAMESPACE}">\n{entries}\n</urlset>\n'
+
+
+def index():
+    """
+    The cached sitemap index.  Building it costs a ``MAX(id)`` per section
+    (unless cached) plus the shards that are not cached.
+    """
+    key = INDEX_KEY.format(shard_size(), caching.get_generations([INDEX_GROUP])[0])
+    document = cache.get(key)
+    if document is not None:
+        return document
+
+    entries = [f'<sitemap>{_loc(reverse("lawfirm:sitemap_pages"))}</sitemap>']
+    for section in SECTIONS:
+        last = _last_shard(section)
+        if not last:
+            continue
+        for number, (document, lastmod) in sorted(_shards(section, range(1, last + 1)).items()):
+            if document is not None:
+                path = reverse('lawfirm:sitemap_shard', kwargs={'section': section, 'number': number})
+                entries.append(f'<sitemap>{_loc(path)}{_lastmod(lastmod)}</sitemap>')
+    document = f'{XML_HEADER}<sitemapindex xmlns="{NAMESPACE}">\n' + '\n'.join(entries) + '\n</sitemapindex>\n'
+    cache.set(key, document, _timeout())
+    return document
+
+
+def with_origin(document, request):
+    """Fill ``request``'s scheme and host into a cached document."""
+    return document.replace(ORIGIN_PLACEHOLDER, escape(f'{request.scheme}://{request.get_host()}'))
+
+
+def invalidate(model, pks=None):
+    """
+    Rebuild the shards holding the rows ``pks`` of ``model`` (all of its
+    shards if ``pks`` is ``None``) and the index, once committed.
+    """
+    section = next((name for name, (section_model, *_) in SECTIONS.items() if section_model is model), None)
+    if section is None:
+        return
+    if pks is None:
+        groups = [_section_group(section)]
+    else:
+        groups = [_shard_group(section, number) for number in {shard_of(pk) for pk in pks}]
+    transaction.on_commit(lambda: caching.bump(INDEX_GROUP, *groups))
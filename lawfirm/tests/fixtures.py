@@ -0,0 +1,127 @@
+"""
+Seeded datasets for the test suite.
+
+``seed(size)`` fills the database with one of the ``SIZES`` below.  Rows are
+inserted with ``bulk_create`` (no signals), after which the question answer
+statistics are recomputed and the search index is rebuilt so search pages
+have something to find.
+"""
+
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+
+from lawfirm import answer_stats, fulltext
+from lawfirm.fulltext import autocomplete
+from lawfirm.models import (
+    Answer, BlogPost, Category, ConsultationRequest, ConsultationType, ContactMessage,
+    Notification, QACategory, Question, SiteSettings, Testimonial
+)
+
+SIZES = {
+    'small': {'posts': 3, 'questions': 3, 'answers': 1, 'per_user': 1},
+    'medium': {'posts': 40, 'questions': 40, 'answers': 3, 'per_user': 10},
+    'large': {'posts': 200, 'questions': 200, 'answers': 5, 'per_user': 40},
+}
+
+PASSWORD = 'dadgan-test-password'
+
+# Appears in every title, so searches match the whole dataset
+SEARCH_TERM = 'قرارداد'
+
+
+def seed(size='small'):
+    """Create a dataset of the given size and return its notable objects."""
+    counts = SIZES[size]
+
+    author = User.objects.create_user('author', 'author@dadgan.com', PASSWORD, first_name='وکیل')
+    client = User.objects.create_user('client', 'client@dadgan.com', PASSWORD)
+
+    # The per-process copy may still hold a row rolled back by an earlier test
+    SiteSettings.invalidate()
+    SiteSettings.objects.create(
+        site_description='مؤسسه حقوقی', phone='02100000000', email='info@dadgan.com', address='تهران'
+    )
+    consultation_type = ConsultationType.objects.create(
+        name='مشاوره حضوری', price=500000, duration=60, description='مشاوره'
+    )
+    Testimonial.objects.bulk_create(
+        Testimonial(name=f'موکل {i}', content='بسیار راضی بودم') for i in range(3)
+    )
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'دسته {i}', slug=f'category-{i}') for i in range(4)
+    )
+    BlogPost.objects.bulk_create(
+        BlogPost(
+            title=f'نکات {SEARCH_TERM} شماره {i}',
+            slug=f'post-{i}',
+            author=author,
+            category=categories[i % len(categories)],
+            excerpt='خلاصه مقاله',
+            content='متن مقاله ' * 200,
+            published=True,
+        )
+        for i in range(counts['posts'])
+    )
+
+    qa_categories = QACategory.objects.bulk_create(
+        QACategory(name=f'موضوع {i}', slug=f'topic-{i}') for i in range(4)
+    )
+    Question.objects.bulk_create(
+        Question(
+            title=f'سوال درباره {SEARCH_TERM} شماره {i}',
+            slug=f'question-{i}',
+            content='متن سوال',
+            asker_name='پرسنده',
+            asker_email='asker@dadgan.com',
+            category=qa_categories[i % len(qa_categories)],
+            is_answered=True,
+            is_published=True,
+        )
+        for i in range(counts['questions'])
+    )
+    Answer.objects.bulk_create(
+        Answer(
+            question=question,
+            content='متن پاسخ',
+            answerer_name='وکیل',
+            is_best_answer=(n == 0),
+            is_published=True,
+        )
+        for question in Question.objects.all()
+        for n in range(counts['answers'])
+    )
+
+    ConsultationRequest.objects.bulk_create(
+        ConsultationRequest(
+            full_name='موکل',
+            phone='09120000000',
+            consultation_type=consultation_type,
+            field='civil',
+            description='شرح مسئله',
+            user=client,
+        )
+        for _ in range(counts['per_user'])
+    )
+    ContactMessage.objects.bulk_create(
+        ContactMessage(full_name='موکل', phone='09120000000', subject='موضوع', user=client)
+        for _ in range(counts['per_user'])
+    )
+    Notification.objects.bulk_create(
+        Notification(user=client, notification_type='general', title='اطلاعیه', message='متن')
+        for _ in range(counts['per_user'])
+    )
+
+    answer_stats.reconcile()
+    fulltext.rebuild()
+    autocomplete.invalidate()
+
+    return SimpleNamespace(
+        author=author,
+        client=client,
+        post=BlogPost.objects.earliest('pk'),
+        question=Question.objects.earliest('pk'),
+        blog_category=categories[0],
+        qa_category=qa_categories[0],
+    )
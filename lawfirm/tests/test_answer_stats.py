@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lawfirm import answer_stats, answers
+from lawfirm.models import Answer, QACategory, Question
+from lawfirm.seo import render_question_schema
+
+
+class QuestionTestCase(TestCase):
+    def setUp(self):
+        category = QACategory.objects.create(name='خانواده', slug='family')
+        self.question = Question.objects.create(
+            title='سوال', slug='question', content='متن', asker_name='پرسنده',
+            asker_email='asker@dadgan.com', category=category, is_published=True,
+        )
+
+    def answer(self, **kwargs):
+        return Answer.objects.create(question=self.question, content='پاسخ', answerer_name='وکیل', **kwargs)
+
+    def stats(self):
+        self.question.refresh_from_db()
+        return self.question.answer_count, self.question.published_answer_count, self.question.best_answer_id
+
+
+class AnswerStatsTests(QuestionTestCase):
+    def test_saves_and_deletes_keep_stats_current(self):
+        draft = self.answer()
+        self.assertEqual(self.stats(), (1, 0, None))
+        best = self.answer(is_published=True, is_best_answer=True)
+        self.assertEqual(self.stats(), (2, 1, best.pk))
+        draft.is_published = True
+        draft.save()
+        self.assertEqual(self.stats(), (2, 2, best.pk))
+        best.delete()
+        self.assertEqual(self.stats(), (1, 1, None))
+
+    def test_new_best_answer_replaces_old(self):
+        self.answer(is_published=True, is_best_answer=True)
+        newer = self.answer(is_published=True, is_best_answer=True)
+        self.assertEqual(self.stats(), (2, 2, newer.pk))
+
+    def test_reconcile_repairs_bulk_writes(self):
+        self.answer(is_published=True)
+        Answer.objects.update(is_published=False)
+        self.assertEqual(answer_stats.reconcile(dry_run=True), 1)
+        self.assertEqual(self.stats(), (1, 1, None))
+        self.assertEqual(answer_stats.reconcile(), 1)
+        self.assertEqual(self.stats(), (1, 0, None))
+        self.assertEqual(answer_stats.reconcile(), 0)
+
+    def test_schema_needs_no_answer_queries(self):
+        best = self.answer(is_published=True, is_best_answer=True)
+        question = Question.objects.select_related('best_answer').get(pk=self.question.pk)
+        with self.assertNumQueries(0):
+            schema = render_question_schema(question)
+        self.assertEqual(schema['mainEntity']['acceptedAnswer']['text'], best.content)
+
+    def test_editing_question_keeps_stats(self):
+        question = Question.objects.get(pk=self.question.pk)
+        self.answer(is_published=True)
+        question.title = 'سوال ویرایش شده'
+        question.save()
+        self.assertEqual(self.stats(), (1, 1, None))
+
+
+class MarkBestAnswerTests(QuestionTestCase):
+    def test_marking_unmarks_the_previous_best_answer(self):
+        first = self.answer(is_published=True, is_best_answer=True)
+        second = self.answer(is_published=True)
+        self.assertTrue(answers.mark_best_answer(second))
+        self.assertEqual(list(Answer.objects.filter(is_best_answer=True)), [second])
+        self.assertEqual(self.stats(), (2, 2, second.pk))
+        first.refresh_from_db()
+        self.assertFalse(first.is_best_answer)
+
+    def test_marking_the_current_best_answer_writes_nothing(self):
+        best = self.answer(is_published=True, is_best_answer=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(answers.mark_best_answer(best))
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_bulk_marking_across_questions(self):
+        other = Question.objects.create(
+            title='سوال دیگر', slug='other', content='متن', asker_name='پرسنده',
+            asker_email='asker@dadgan.com', category=self.question.category, is_published=True,
+        )
+        older = self.answer(is_published=True)
+        newer = self.answer(is_published=True)
+        elsewhere = Answer.objects.create(question=other, content='پاسخ', answerer_name='وکیل', is_published=True)
+        self.assertEqual(answers.mark_best_answers([older.pk, newer.pk, elsewhere.pk]), 2)
+        self.assertEqual(set(Answer.objects.filter(is_best_answer=True)), {newer, elsewhere})
+        self.assertEqual(set(Question.objects.filter(is_answered=True)), {self.question, other})
+        other.refresh_from_db()
+        self.assertEqual(other.best_answer_id, elsewhere.pk)
+
+    def test_unmarking(self):
+        best = self.answer(is_published=True, is_best_answer=True)
+        self.assertEqual(answers.unmark_best_answers([best.pk]), 1)
+        self.assertEqual(self.stats(), (1, 1, None))
+        self.assertEqual(answers.unmark_best_answers([best.pk]), 0)
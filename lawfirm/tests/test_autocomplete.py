@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from lawfirm.fulltext import autocomplete
+from lawfirm.fulltext.autocomplete import SuggestionIndex
+from lawfirm.models import BlogPost
+
+from .fixtures import SEARCH_TERM, seed
+
+
+def entry(title):
+    return title, {'title': title}
+
+
+class SuggestionIndexTests(SimpleTestCase):
+    def titles(self, index, prefix, limit=8):
+        return [payload['title'] for payload in index.lookup(prefix, limit=limit)]
+
+    def test_title_starts_rank_before_later_words(self):
+        index = SuggestionIndex([entry('حقوق کار'), entry('قانون کار و کارگر'), entry('کارت بانکی')])
+        self.assertEqual(self.titles(index, 'کار'), ['کارت بانکی', 'حقوق کار', 'قانون کار و کارگر'])
+        self.assertEqual(self.titles(index, 'کار', limit=2), ['کارت بانکی', 'حقوق کار'])
+        self.assertEqual(self.titles(index, 'کارگ'), ['قانون کار و کارگر'])
+        self.assertEqual(self.titles(index, 'حقوق ک'), ['حقوق کار'])
+        self.assertEqual(self.titles(index, 'مالیات'), [])
+        self.assertEqual(self.titles(index, '  '), [])
+
+    def test_lookup_is_normalized(self):
+        index = SuggestionIndex([entry('مهریه و نفقه')])
+        self.assertEqual(self.titles(index, 'مهريه'), ['مهریه و نفقه'])
+        self.assertEqual(self.titles(index, 'نفقة'), ['مهریه و نفقه'])
+
+    def test_candidates_are_bounded(self):
+        index = SuggestionIndex([entry(f'قرارداد {i}') for i in range(autocomplete.MAX_CANDIDATES + 50)])
+        self.assertEqual(len(index.lookup('قرار', limit=1000)), autocomplete.MAX_CANDIDATES)
+
+
+class SuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.invalidate()
+
+    def test_index_is_built_once_per_version(self):
+        with mock.patch.object(autocomplete, 'build_entries', wraps=autocomplete.build_entries) as build:
+            self.assertEqual(len(autocomplete.suggest('نکات')), BlogPost.objects.count())
+            with self.assertNumQueries(0):
+                autocomplete.suggest('سوال')
+            self.assertEqual(build.call_count, 1)
+
+            with self.captureOnCommitCallbacks() as callbacks:
+                BlogPost.objects.create(
+                    title='نکات تازه', slug='fresh', author=self.data.author, category=self.data.blog_category,
+                    excerpt='خلاصه', content='متن', published=True,
+                )
+                # Not before the commit, when other requests cannot see the row yet
+                autocomplete.suggest('نکات')
+                self.assertEqual(build.call_count, 1)
+            for callback in callbacks:
+                callback()
+            self.assertIn('نکات تازه', [result['title'] for result in autocomplete.suggest('نکات تازه')])
+            self.assertEqual(build.call_count, 2)
+
+            # A cleared cache cannot hand back a version this process already has
+            cache.clear()
+            autocomplete.suggest('نکات')
+            self.assertEqual(build.call_count, 3)
+
+    def test_api_returns_suggestions(self):
+        url = reverse('lawfirm:suggest_api')
+        results = self.client.get(url, {'q': 'دسته'}).json()['results']
+        self.assertEqual({result['type'] for result in results}, {'category'})
+        self.assertEqual(self.client.get(url, {'q': SEARCH_TERM[0]}).json(), {'results': []})
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from copy import deepcopy
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+
+from lawfirm.bench import dataset, runner
+from lawfirm.management.commands.bench import Command
+from lawfirm.models import Answer, BlogPost, Question
+
+
+class FakeTarget:
+    concurrency = 1
+
+    def __init__(self, statuses):
+        self.statuses = iter(statuses)
+        self.fetched = []
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        return next(self.statuses)
+
+
+class RunnerTests(SimpleTestCase):
+    def test_percentiles_use_the_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(runner.percentile(values, 0.50), 50)
+        self.assertEqual(runner.percentile(values, 0.99), 99)
+        self.assertEqual(runner.percentile([7], 0.95), 7)
+
+    def test_page_urls_cycle_through_objects_and_terms(self):
+        urls = runner.page_urls('blog_detail', {'blog_detail': ['a', 'b']}, 3)
+        self.assertEqual(urls, ['/blog/a/', '/blog/b/', '/blog/a/'])
+        urls = runner.page_urls('search', {}, len(dataset.SEARCH_TERMS) + 1)
+        self.assertEqual(urls[0], urls[-1])
+        self.assertEqual(len(set(urls)), len(dataset.SEARCH_TERMS))
+
+    def test_measure_skips_warmup_and_counts_errors(self):
+        target = FakeTarget([200, 200, 500, 200])
+        stats = runner.measure(target, ['/a', '/b', '/c'], warmup=1)
+        self.assertEqual(target.fetched, ['/a', '/a', '/b', '/c'])
+        self.assertEqual((stats['requests'], stats['errors']), (3, 1))
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+    def test_change_is_relative(self):
+        self.assertEqual(Command.change(200, 150), '-25.0%')
+        self.assertEqual(Command.change(0, 150), 'n/a')
+
+
+class BenchCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        # The command points the SQLite test database at its work directory
+        for alias in connections:
+            test_settings = connections[alias].settings_dict['TEST']
+            self.addCleanup(test_settings.update, deepcopy(test_settings))
+        # Runs against this test's database instead of creating another one
+        for name in ('setup_databases', 'teardown_databases'):
+            patcher = mock.patch(f'lawfirm.management.commands.bench.{name}')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_run_writes_and_compares_results(self):
+        output, previous = os.path.join(self.directory, 'run.json'), os.path.join(self.directory, 'before.json')
+        with open(previous, 'w', encoding='utf-8') as f:
+            json.dump({'results': {'test_client': {'home': {'throughput_rps': 1, 'p50_ms': 1, 'p95_ms': 1}}}}, f)
+        stdout = StringIO()
+        call_command(
+            'bench', thousands=0.005, requests=4, warmup=1, pages=['home', 'blog_detail', 'search_api'],
+            clients=['test_client'], output=output, compare=previous, stdout=stdout,
+        )
+
+        self.assertEqual((BlogPost.objects.count(), Question.objects.count()), (5, 5))
+        self.assertEqual(Answer.objects.count(), 5 * dataset.ANSWERS_PER_QUESTION)
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(report['meta']['requests'], 4)
+        results = report['results']['test_client']
+        self.assertEqual(list(results), ['home', 'blog_detail', 'search_api'])
+        for stats in results.values():
+            self.assertEqual((stats['requests'], stats['errors']), (4, 0))
+        # Only the page measured before gets a comparison
+        lines = stdout.getvalue().splitlines()
+        self.assertIn('req/s +', next(line for line in lines if line.startswith('home')))
+        self.assertNotIn('req/s +', next(line for line in lines if line.startswith('blog_detail')))
+        self.assertIn('✓ Results written to', lines[-1])
+
+    def test_requests_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', requests=0, stdout=StringIO())
@@ -0,0 +1,106 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lawfirm import caching, votes
+from lawfirm.models import Question, SiteSettings
+
+from .fixtures import PASSWORD, seed
+
+TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_served_from_the_cache(self):
+        url = reverse('lawfirm:blog_list')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(len(queries), 0)
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.client.login(username=self.data.client.username, password=PASSWORD)
+        url = reverse('lawfirm:blog_list')
+        self.client.get(url)
+        self.assertNotIn('X-Page-Cache', self.client.get(url))
+
+    def test_each_visitor_gets_a_working_csrf_token(self):
+        url = reverse('lawfirm:blog_list')
+        Client().get(url)
+        visitor = Client(enforce_csrf_checks=True)
+        response = visitor.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotIn(caching.CSRF_PLACEHOLDER, response.content)
+        token = TOKEN_RE.search(response.content.decode()).group(1)
+        login = visitor.post(reverse('lawfirm:login'), {
+            'username': 'nobody', 'password': 'wrong', 'csrfmiddlewaretoken': token,
+        })
+        self.assertEqual(login.status_code, 200)
+
+    def test_saving_content_invalidates_its_pages(self):
+        url = reverse('lawfirm:blog_detail', kwargs={'slug': self.data.post.slug})
+        self.client.get(url)
+        self.data.post.title = 'عنوان تازه'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.data.post.save()
+            # Not until the commit, so nothing re-caches the old content in between
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'عنوان تازه')
+        # A different group is left alone
+        qa = reverse('lawfirm:qa_list')
+        self.client.get(qa)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data.post.save()
+        self.assertEqual(self.client.get(qa)['X-Page-Cache'], 'hit')
+
+    def test_votes_invalidate_the_qa_pages(self):
+        before = caching.get_generations(['qa'])
+        with self.captureOnCommitCallbacks(execute=True):
+            votes.cast_vote(Question, self.data.question.pk, 'session:test', 1)
+        self.assertNotEqual(caching.get_generations(['qa']), before)
+
+
+class SiteSettingsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The per-process copy may still hold a row rolled back by an earlier test
+        SiteSettings.invalidate()
+        self.site_settings = SiteSettings.objects.create(
+            site_description='مؤسسه حقوقی', phone='02100000000', email='info@dadgan.com', address='تهران',
+        )
+        # on_commit does not run in a TestCase
+        SiteSettings.invalidate()
+
+    def test_save_is_seen_on_the_next_load(self):
+        self.assertEqual(SiteSettings.load().phone, '02100000000')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site_settings.phone = '02111111111'
+            self.site_settings.save()
+        self.assertEqual(SiteSettings.load().phone, '02111111111')
+
+    def test_copy_is_reloaded_after_the_ttl(self):
+        SiteSettings.load()
+        # A change whose cache bump this process never saw
+        SiteSettings.objects.update(phone='02122222222')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(SiteSettings.load().phone, '02100000000')
+        self.assertEqual(len(queries), 0)
+        with override_settings(SITE_SETTINGS_TTL=0):
+            self.assertEqual(SiteSettings.load().phone, '02122222222')
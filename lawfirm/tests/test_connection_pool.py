@@ -0,0 +1,106 @@
+import gc
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from lawfirm.db import metrics, pool
+from lawfirm.db.pool import ConnectionPool
+
+
+class FakeError(Exception):
+    pass
+
+
+class FakeConnection:
+    """A DB-API connection as far as the pool is concerned."""
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def ping(self):
+        if self.broken or self.closed:
+            raise FakeError('MySQL server has gone away')
+
+    def close(self):
+        self.closed = True
+
+
+# Stands in for MySQLdb, which is not needed to exercise the pool
+Database = SimpleNamespace(connect=FakeConnection, Error=FakeError)
+
+
+def ping(connection):
+    # Same as lawfirm.db.backends.mysql.base.ping
+    try:
+        connection.ping()
+    except Database.Error:
+        return False
+    return True
+
+
+def later(seconds):
+    return mock.patch('lawfirm.db.pool.time.monotonic', return_value=pool.time.monotonic() + seconds)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def open(self, connection_pool):
+        connection = Database.connect()
+        connection_pool.register(connection)
+        return connection
+
+    def test_released_connection_is_reused(self):
+        connection_pool = ConnectionPool(size=2, ping=ping)
+        connection = self.open(connection_pool)
+        self.assertTrue(connection_pool.release(connection))
+        self.assertIs(connection_pool.acquire(), connection)
+        self.assertIsNone(connection_pool.acquire())
+        self.assertFalse(connection.closed)
+        self.assertEqual(metrics.snapshot()['pool_hit_rate'], 0.5)
+
+    def test_surplus_connections_are_not_kept(self):
+        connection_pool = ConnectionPool(size=1)
+        first, second = self.open(connection_pool), self.open(connection_pool)
+        self.assertTrue(connection_pool.release(first))
+        self.assertFalse(connection_pool.release(second))
+        self.assertEqual(len(connection_pool), 1)
+
+    def test_old_connections_are_recycled(self):
+        connection_pool = ConnectionPool(size=2, recycle=60)
+        connection = self.open(connection_pool)
+        connection_pool.release(connection)
+        with later(61):
+            self.assertIsNone(connection_pool.acquire())
+        self.assertTrue(connection.closed)
+        # One past its age is not taken back either
+        connection = self.open(connection_pool)
+        with later(61):
+            self.assertFalse(connection_pool.release(connection))
+
+    def test_broken_connections_are_discarded(self):
+        connection_pool = ConnectionPool(size=2, ping=ping)
+        connection = self.open(connection_pool)
+        connection_pool.release(connection)
+        connection.broken = True
+        # Pinged once idle for more than PING_AFTER seconds
+        with later(pool.PING_AFTER + 1):
+            self.assertIsNone(connection_pool.acquire())
+        self.assertTrue(connection.closed)
+        self.assertEqual(metrics.snapshot()['pool_discards'], 1)
+
+    def test_connections_closed_elsewhere_are_forgotten(self):
+        connection_pool = ConnectionPool(size=2, recycle=60)
+        connection = self.open(connection_pool)
+        with later(61):
+            # Closed by Django after an error, never handed back
+            del connection
+            gc.collect()
+            # A new connection, possibly at the same address, starts out young
+            replacement = self.open(connection_pool)
+            self.assertTrue(connection_pool.release(replacement))
+            self.assertIs(connection_pool.acquire(), replacement)
+        self.assertEqual(len(connection_pool._created), 1)
@@ -0,0 +1,131 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from lawfirm import counters
+from lawfirm.models import BlogPost, Question
+
+from .fixtures import seed
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    VIEW_COUNTER_FLUSH_THRESHOLD=10 ** 9, VIEW_COUNTER_FLUSH_INTERVAL=10 ** 9,
+)
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+
+    def setUp(self):
+        cache.clear()
+
+    def views(self, obj):
+        return type(obj).objects.values_list('views', flat=True).get(pk=obj.pk)
+
+    def test_views_are_buffered_until_flushed(self):
+        post, question = self.data.post, self.data.question
+        before = self.views(post), self.views(question)
+        for _ in range(3):
+            post.increment_views()
+        counters.record_view(Question, question.pk)
+        self.assertEqual((counters.pending_views(post), counters.pending_views(question)), (3, 1))
+        # Shown as stored, not with the buffered hits added
+        self.assertEqual(post.views, before[0])
+        self.assertEqual((self.views(post), self.views(question)), before)
+
+        # One UPDATE per model and hit count, in a savepoint here
+        with self.assertNumQueries(4):
+            self.assertEqual(counters.flush(), 4)
+        self.assertEqual((self.views(post), self.views(question)), (before[0] + 3, before[1] + 1))
+        self.assertEqual(counters.pending_views(post), 0)
+        self.assertEqual(counters.flush(), 0)
+
+        post.increment_views()
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self.views(post), before[0] + 4)
+
+    def test_hits_during_a_flush_are_kept(self):
+        post = self.data.post
+        before = self.views(post)
+        post.increment_views()
+        get_many = cache.get_many
+
+        def get_many_then_hit(keys):
+            found = get_many(keys)
+            if counters._counter_key('lawfirm.blogpost', post.pk) in found:
+                post.increment_views()
+            return found
+
+        with mock.patch.object(cache, 'get_many', side_effect=get_many_then_hit):
+            self.assertEqual(counters.flush(), 1)
+        self.assertEqual(counters.pending_views(post), 1)
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self.views(post), before + 2)
+
+    def test_a_slot_read_before_it_is_filled_is_taken_again(self):
+        post = self.data.post
+        before = self.views(post)
+        # The hit has taken slot 1 but not filled it yet when the flush runs
+        cache.set(counters._counter_key('lawfirm.blogpost', post.pk), 1, timeout=None)
+        cache.set(counters.SEQUENCE_KEY, 1, timeout=None)
+        self.assertEqual(counters.flush(), 0)
+        counters._register(cache, counters._counter_key('lawfirm.blogpost', post.pk))
+        self.assertEqual(cache.get(counters.SEQUENCE_KEY), 2)
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(self.views(post), before + 1)
+
+    def test_concurrent_views_are_all_written(self):
+        objects = list(BlogPost.objects.all()) + list(Question.objects.all())
+        before = {obj: self.views(obj) for obj in objects}
+        hits = [obj for obj in objects for _ in range(25)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(counters.record_view, hits))
+        self.assertEqual(counters.flush(), len(hits))
+        for obj in objects:
+            self.assertEqual(self.views(obj), before[obj] + 25)
+
+    def test_flush_runs_after_the_response(self):
+        url = reverse('lawfirm:blog_detail', kwargs={'slug': self.data.post.slug})
+        before = self.views(self.data.post)
+        with override_settings(VIEW_COUNTER_FLUSH_THRESHOLD=2), \
+                mock.patch('lawfirm.counters.flush', wraps=counters.flush) as flush:
+            self.client.get(url)
+            flush.assert_not_called()
+            response = self.client.get(url)
+            flush.assert_called_once()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(self.views(self.data.post), before + 2)
+
+    def test_a_restarted_sequence_is_read_from_the_start(self):
+        post, question = self.data.post, self.data.question
+        before = self.views(post), self.views(question)
+        post.increment_views()
+        self.assertEqual(counters.flush(), 1)
+        self.assertEqual(cache.get(counters.FLUSHED_KEY), 1)
+        # Evicted, while the flushed position survives
+        cache.delete(counters.SEQUENCE_KEY)
+        counters.record_view(Question, question.pk)
+        post.increment_views()
+        self.assertEqual(counters.flush(), 2)
+        self.assertEqual((self.views(post), self.views(question)), (before[0] + 2, before[1] + 1))
+
+    def test_views_are_written_directly_without_an_atomic_cache(self):
+        post = self.data.post
+        before = self.views(post)
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={**settings.CACHES, 'views': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+            }},
+            VIEW_COUNTER_CACHE='views',
+        ):
+            self.assertFalse(counters.is_buffered())
+            with self.assertNumQueries(1):
+                self.assertEqual(counters.record_view(post), 0)
+            self.assertEqual(counters.flush(), 0)
+        self.assertEqual(self.views(post), before + 1)
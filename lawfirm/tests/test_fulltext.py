@@ -0,0 +1,130 @@
+import importlib
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from lawfirm import caching, fulltext
+from lawfirm.fulltext import backends
+from lawfirm.fulltext.normalize import MAX_QUERY_TERMS, normalize, query_terms
+from lawfirm.models import BlogPost, Question
+
+from .fixtures import PASSWORD, SEARCH_TERM, seed
+
+migration = importlib.import_module('lawfirm.migrations.0005_searchdocument')
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_arabic_spellings_become_persian(self):
+        self.assertEqual(normalize('كتاب علي'), 'کتاب علی')
+        self.assertEqual(normalize('مدرسة أمين'), 'مدرسه امین')
+        self.assertEqual(normalize('مُحَمَّـــد'), 'محمد')
+
+    def test_digits_and_separators(self):
+        self.assertEqual(normalize('ماده ۱۲ و ٣٤'), 'ماده 12 و 34')
+        self.assertEqual(normalize('کتاب‌ها  Law'), 'کتاب ها law')
+        self.assertEqual(normalize('کتاب‌ها', keep_zwnj=True), 'کتاب‌ها')
+        self.assertEqual(normalize(None), '')
+
+    def test_query_terms_are_distinct_and_capped(self):
+        self.assertEqual(query_terms('طلاق، طلاق! مهريه'), ['طلاق', 'مهریه'])
+        self.assertEqual(len(query_terms(' '.join(f'term{i}' for i in range(20)))), MAX_QUERY_TERMS)
+
+    def test_migration_copy_matches(self):
+        for text in ['كتاب‌هاي مُحَمَّد ۱۲', 'مدرسة أمين ـ Law', '']:
+            self.assertEqual(migration.normalize(text), normalize(text))
+
+
+class SearchBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('medium')
+
+    def backends(self):
+        yield backends.SimpleBackend('default')
+        sqlite = backends.SQLiteBackend('default')
+        if sqlite.is_available():
+            yield sqlite
+
+    def test_every_backend_finds_published_documents(self):
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                self.assertEqual(len(backend.search('blog', SEARCH_TERM, 100)), BlogPost.objects.count())
+                # Terms match as prefixes, and all of them must match
+                self.assertEqual(len(backend.search('question', 'قرار شمار', 100)), Question.objects.count())
+                self.assertEqual(backend.search('question', 'قرار مقاله', 100), [])
+                self.assertEqual(backend.search('blog', 'ناموجود', 100), [])
+
+    def test_filters_apply_before_the_limit(self):
+        category = self.data.blog_category
+        in_category = BlogPost.objects.filter(category=category)
+        for backend in self.backends():
+            with self.subTest(backend=type(backend).__name__):
+                ids = backend.search('blog', SEARCH_TERM, 5, within=in_category)
+                self.assertEqual(len(ids), 5)
+                self.assertEqual(set(in_category.filter(pk__in=ids).values_list('pk', flat=True)), set(ids))
+
+    def test_search_keeps_the_queryset_filters(self):
+        blogs = fulltext.search(
+            BlogPost.objects.filter(published=True, category=self.data.blog_category), SEARCH_TERM, limit=5
+        )
+        self.assertEqual(len(blogs), 5)
+        self.assertTrue(all(blog.category_id == self.data.blog_category.pk for blog in blogs))
+        # Arabic letters in the query match the Persian text
+        self.assertEqual(fulltext.search(BlogPost.objects.all(), 'نكات', limit=100).count(), BlogPost.objects.count())
+
+    def test_mysql_query_embeds_the_filters(self):
+        within = BlogPost.objects.filter(category=self.data.blog_category)
+        with mock.patch.object(backends, 'connections') as connections:
+            cursor = connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = [(3,), (1,)]
+            self.assertEqual(backends.MySQLBackend('default').search('blog', 'قرارداد', 5, within=within), [3, 1])
+        sql, params = cursor.execute.call_args.args
+        self.assertIn('AND object_id IN (SELECT', sql)
+        self.assertLess(sql.index('object_id IN'), sql.index('ORDER BY'))
+        self.assertEqual(params[:2], ['blog', '+قرارداد*'])
+        self.assertEqual(params[-4:], [self.data.blog_category.pk, '+قرارداد*', '+قرارداد*', 5])
+        self.assertEqual(sql.count('%s'), len(params))
+
+    def test_mysql_falls_back_without_fulltext_indexes(self):
+        with mock.patch.object(backends, 'connections') as connections:
+            connections.__getitem__.return_value.cursor.side_effect = DatabaseError
+            with mock.patch.object(backends.SimpleBackend, 'search', return_value=[7]) as simple:
+                self.assertEqual(backends.MySQLBackend('default').search('blog', 'قرارداد', 5), [7])
+        simple.assert_called_once_with('blog', 'قرارداد', 5, None)
+
+
+class AdminBulkPublishTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+        User.objects.create_superuser('admin', 'admin@dadgan.com', PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='admin', password=PASSWORD)
+
+    def act(self, action, posts):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:lawfirm_blogpost_changelist'), {
+                'action': action, '_selected_action': [post.pk for post in posts],
+            })
+        self.assertEqual(response.status_code, 302)
+
+    def found(self):
+        return set(fulltext.search(BlogPost.objects.all(), SEARCH_TERM).values_list('pk', flat=True))
+
+    def test_publish_actions_update_search_and_pages(self):
+        post = self.data.post
+        before = caching.get_generations(['blog'])
+        self.act('unpublish_posts', [post])
+        self.assertNotIn(post.pk, self.found())
+        self.assertNotEqual(caching.get_generations(['blog']), before)
+
+        before = caching.get_generations(['blog'])
+        self.act('publish_posts', [post])
+        self.assertIn(post.pk, self.found())
+        self.assertNotEqual(caching.get_generations(['blog']), before)
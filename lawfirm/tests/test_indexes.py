@@ -0,0 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .fixtures import seed
+
+
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        seed('small')
+        out = StringIO()
+        call_command('explain_hot_queries', '--strict', stdout=out)
+        self.assertNotIn('full scan', out.getvalue())
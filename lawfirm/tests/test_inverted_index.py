@@ -0,0 +1,132 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from lawfirm.fulltext import inverted
+from lawfirm.fulltext.mmap_index import IndexBuilder, IndexReader
+from lawfirm.fulltext.tokenizer import tokenize
+from lawfirm.models import Answer, BlogPost, Question
+
+from .fixtures import SEARCH_TERM, seed
+
+
+class TemporaryIndexMixin:
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'test.idx')
+
+
+class IndexFileTests(TemporaryIndexMixin, SimpleTestCase):
+    def write(self):
+        builder = IndexBuilder()
+        builder.add('blog:1', {'type': 'blog', 'title': 'قرارداد اجاره'}, {'قرارداد': 3, 'اجاره': 3})
+        builder.add('blog:2', {'type': 'blog', 'title': 'طلاق'}, {'طلاق': 3, 'قرار': 1})
+        builder.add('question:1', {'type': 'question', 'title': 'اجاره‌نامه'}, {'اجاره': 1, 'قرارداد': 1})
+        builder.write(self.path)
+        return IndexReader(self.path)
+
+    def test_exact_and_prefix_lookups(self):
+        reader = self.write()
+        self.assertEqual((reader.term_count, reader.doc_count), (4, 3))
+        self.assertEqual(len(reader.lookup('قرارداد')), 2)
+        self.assertEqual(reader.lookup('قرار'), {1: 1})
+        self.assertEqual(len(reader.lookup_prefix('قرار')), 3)
+        self.assertEqual(reader.lookup('ناموجود'), {})
+
+    def test_search_ranks_and_filters_by_type(self):
+        reader = self.write()
+        self.assertEqual([doc['key'] for doc in reader.search(['اجاره'], ['قرار'])], ['blog:1', 'question:1'])
+        self.assertEqual([doc['key'] for doc in reader.search([], ['قرار'], doc_type='question')], ['question:1'])
+        self.assertEqual(reader.search(['اجاره', 'طلاق']), [])
+
+    def test_file_round_trips_through_the_builder(self):
+        self.write()
+        builder = IndexBuilder.from_file(self.path)
+        self.assertEqual(builder.documents['blog:2'][1], {'طلاق': 3, 'قرار': 1})
+        builder.remove('blog:2')
+        builder.write(self.path)
+        self.assertEqual(IndexReader(self.path).lookup('طلاق'), {})
+
+    def test_other_files_are_refused(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(ValueError):
+            IndexReader(self.path)
+        self.assertEqual(IndexBuilder.from_file(self.path).documents, {})
+
+    def test_queries_are_tokenized_like_documents(self):
+        self.assertEqual(inverted.split_query('کتاب‌هایشان'), ([], tokenize('کتاب‌هایشان')))
+        self.assertEqual(inverted.split_query('بزرگ‌ترین و دادگاه'), (['بزرگ'], ['دادگاه']))
+        self.assertEqual(inverted.split_query('و از'), ([], []))
+
+    def test_tokenizer_drops_affixes_and_stopwords(self):
+        self.assertEqual(tokenize('کتاب‌ها و قراردادهای او'), ['کتاب', 'قرارداد', 'او'])
+        self.assertEqual(tokenize('می‌خواهم'), tokenize('خواهم'))
+
+
+class InvertedEngineTests(TemporaryIndexMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+
+    def setUp(self):
+        super().setUp()
+        overrides = override_settings(SEARCH_ENGINE='inverted', SEARCH_INDEX_PATH=self.path)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        inverted.rebuild()
+
+    def keys(self, doc_type):
+        return {match['key'] for match in inverted.query(SEARCH_TERM, doc_type=doc_type, limit=100)}
+
+    def test_rebuild_indexes_published_documents(self):
+        self.assertEqual(len(self.keys('blog')), BlogPost.objects.count())
+        self.assertEqual(len(self.keys('question')), Question.objects.count())
+
+    def test_unpublishing_drops_the_document(self):
+        post = self.data.post
+        with self.captureOnCommitCallbacks(execute=True):
+            post.published = False
+            post.save()
+        self.assertNotIn(f'blog:{post.pk}', self.keys('blog'))
+
+    def test_deleting_a_question_with_answers(self):
+        question = self.data.question
+        self.assertTrue(question.answers.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        self.assertNotIn(f'question:{question.pk}', self.keys('question'))
+
+    def test_one_rewrite_per_transaction(self):
+        with mock.patch.object(IndexBuilder, 'write', autospec=True, side_effect=IndexBuilder.write) as write:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for question in Question.objects.all():
+                        Answer.objects.create(question=question, content='پاسخ درباره وصیت', answerer_name='وکیل',
+                                              is_published=True)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(inverted.query('وصیت', doc_type='question', limit=100)), Question.objects.count())
+
+    def test_backend_applies_filters_before_the_limit(self):
+        in_category = BlogPost.objects.filter(category=self.data.blog_category)
+        ids = inverted.InvertedBackend(fallback=None).search('blog', SEARCH_TERM, 1, within=in_category)
+        self.assertEqual(ids, list(in_category.values_list('pk', flat=True)))
+
+    def test_zwnj_compounds_are_found(self):
+        titles = ['حقوق‌دان', 'بزرگ‌ترین دادگاه', 'کتاب‌هایشان']
+        with self.captureOnCommitCallbacks(execute=True):
+            for number, title in enumerate(titles):
+                BlogPost.objects.create(
+                    title=title, slug=f'zwnj-{number}', author=self.data.author, category=self.data.blog_category,
+                    excerpt='خلاصه', content='متن', published=True,
+                )
+        for title in titles + ['بزرگ‌ترین', 'حقوق‌د']:
+            with self.subTest(query=title):
+                matches = inverted.query(title, doc_type='blog', limit=10)
+                self.assertTrue(matches)
+                self.assertIn(matches[0]['title'], titles)
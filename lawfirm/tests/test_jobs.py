@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from lawfirm import jobs
+from lawfirm.models import Job
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record(payloads):
+    calls.append(sorted(payload['n'] for payload in payloads))
+    if any(payload.get('fail') for payload in payloads):
+        raise RuntimeError('failed')
+
+
+@override_settings(JOBS_RUN_INLINE=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        cache.clear()
+
+    def test_due_jobs_run_in_one_batch_and_are_deleted(self):
+        jobs.enqueue_many('tests.record', [{'n': 1}, {'n': 2}])
+        jobs.enqueue('tests.record', {'n': 3}, delay=60)
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(calls, [[1, 2]])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'n': 3}])
+
+    def test_failing_job_is_isolated_and_retried_with_backoff(self):
+        jobs.enqueue_many('tests.record', [{'n': 1}, {'n': 2, 'fail': True}])
+        jobs.run_pending()
+        self.assertEqual(calls, [[1, 2], [1], [2]])
+        job = Job.objects.get()
+        self.assertEqual((job.payload['n'], job.status, job.attempts), (2, Job.PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError', job.last_error)
+
+    def test_job_fails_after_max_attempts(self):
+        jobs.enqueue('tests.record', {'n': 1, 'fail': True})
+        Job.objects.update(max_attempts=2)
+        for _ in range(2):
+            Job.objects.update(run_at=timezone.now())
+            jobs.run_pending()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_jobs_of_dead_workers_are_requeued(self):
+        jobs.enqueue('tests.record', {'n': 1})
+        Job.objects.update(status=Job.RUNNING, attempts=1, locked_by='gone:1',
+                           locked_at=timezone.now() - timedelta(hours=1))
+        call_command('run_worker', once=True, stdout=StringIO())
+        self.assertEqual(calls, [[1]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_job_is_refused(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('tests.missing')
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_inline_jobs_run_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('tests.record', {'n': 1})
+        self.assertEqual(calls, [[1]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_overdue_jobs_are_logged_once_a_minute(self):
+        jobs.enqueue('tests.record', {'n': 1})
+        cache.clear()
+        self.assertEqual(jobs.check_backlog(), 0)
+        cache.clear()
+        Job.objects.update(run_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs('lawfirm.jobs', 'ERROR') as logs:
+            self.assertEqual(jobs.check_backlog(), 1)
+        self.assertIn('run_worker', logs.output[0])
+        self.assertEqual(jobs.check_backlog(), 0)
@@ -0,0 +1,30 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from lawfirm.models import SiteSettings
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryCountMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteSettings.invalidate()
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_headers_report_queries(self):
+        response = self.client.get(reverse('lawfirm:blog_list'))
+        self.assertIn('X-DB-Queries', response)
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertTrue(response['X-DB-Time'].endswith('ms'))
+
+    @override_settings(QUERY_COUNT_HEADERS=True, QUERY_COUNT_WARN_QUERIES=0)
+    def test_logs_requests_over_threshold(self):
+        with self.assertLogs('lawfirm.queries', 'WARNING') as logs:
+            self.client.get(reverse('lawfirm:blog_list'))
+        self.assertIn('/blog/', logs.output[0])
+
+    @override_settings(QUERY_COUNT_HEADERS=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('lawfirm:blog_list'))
+        self.assertNotIn('X-DB-Queries', response)
@@ -0,0 +1,292 @@
+import asyncio
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from lawfirm import consultations, jobs, notifications
+from lawfirm.models import (
+    Broadcast, BroadcastReceipt, ConsultationRequest, ConsultationType, Job, Notification,
+)
+from lawfirm.notifications import unread_count
+
+
+@override_settings(JOBS_RUN_INLINE=False)
+class ConsultationNotificationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        consultation_type = ConsultationType.objects.create(
+            name='مشاوره حضوری', price=500000, duration=60, description='مشاوره'
+        )
+        ConsultationRequest.objects.create(
+            full_name='موکل', phone='09120000000', consultation_type=consultation_type,
+            field='civil', description='شرح مسئله', user=self.user,
+        )
+        self.consultation = ConsultationRequest.objects.get()
+
+    def titles(self):
+        jobs.run_pending()
+        return list(Notification.objects.order_by('pk').values_list('title', flat=True))
+
+    def test_creation_is_notified(self):
+        self.assertEqual(self.titles(), ['درخواست مشاوره ثبت شد'])
+
+    def test_changes_are_notified_in_one_job_without_rereading(self):
+        self.consultation.status = 'confirmed'
+        self.consultation.scheduled_date = timezone.now()
+        self.consultation.admin_message = 'لطفاً مدارک را همراه داشته باشید.'
+        with CaptureQueriesContext(connection) as queries:
+            self.consultation.save()
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(statements.count('INSERT'), 1)
+        self.assertNotIn('SELECT', statements)
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(self.titles()[1:], [
+            'درخواست مشاوره تأیید شد', 'زمان مشاوره تعیین شد', 'پیام جدید از مدیریت',
+        ])
+
+    def test_each_change_is_told_as_it_was_made(self):
+        self.consultation.status = 'confirmed'
+        self.consultation.admin_message = 'لطفاً مدارک را همراه داشته باشید.'
+        self.consultation.save()
+        self.consultation.status = 'cancelled'
+        self.consultation.admin_message = ''
+        self.consultation.save()
+        self.assertEqual(self.titles()[1:], [
+            'درخواست مشاوره تأیید شد', 'پیام جدید از مدیریت', 'درخواست مشاوره لغو شد',
+        ])
+        self.assertEqual(Notification.objects.order_by('pk')[2].message, 'لطفاً مدارک را همراه داشته باشید.')
+
+    def test_scheduled_date_is_the_one_queued(self):
+        self.consultation.scheduled_date = datetime.fromisoformat('2026-03-01T10:30:00+00:00')
+        self.consultation.save()
+        ConsultationRequest.objects.update(scheduled_date=None)
+        self.titles()
+        self.assertIn('2026/03/01 ساعت 10:30', Notification.objects.order_by('pk').last().message)
+
+    def test_unchanged_and_repeated_saves_are_not_notified(self):
+        self.consultation.save()
+        self.consultation.status = 'completed'
+        self.consultation.save()
+        self.consultation.save()
+        self.assertEqual(self.titles(), ['درخواست مشاوره ثبت شد', 'مشاوره انجام شد'])
+
+    def test_deferred_fields_are_not_compared(self):
+        consultation = ConsultationRequest.objects.defer('admin_message').get()
+        consultation.admin_message = 'پیام'
+        consultation.save()
+        self.assertEqual(len(self.titles()), 1)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', JOBS_RUN_INLINE=False,
+)
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        consultation_type = ConsultationType.objects.create(
+            name='مشاوره حضوری', price=500000, duration=60, description='مشاوره'
+        )
+        ConsultationRequest.objects.bulk_create(
+            ConsultationRequest(
+                full_name='موکل', phone='09120000000', consultation_type=consultation_type,
+                field='civil', description='شرح مسئله', user=self.user if n % 5 else None,
+            )
+            for n in range(30)
+        )
+
+    def test_one_update_and_one_insert_for_many_requests(self):
+        ConsultationRequest.objects.filter(pk__in=ConsultationRequest.objects.values('pk')[:4]).update(
+            status='confirmed'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            changed = consultations.set_status(ConsultationRequest.objects.all(), 'confirmed')
+        self.assertEqual(changed, 26)
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual((statements.count('UPDATE'), statements.count('INSERT')), (1, 1))
+
+        jobs.run_pending()
+        self.assertEqual(ConsultationRequest.objects.filter(status='confirmed').count(), 30)
+        # Requests without a user have nobody to tell
+        self.assertEqual(
+            Notification.objects.filter(title='درخواست مشاوره تأیید شد').count(),
+            ConsultationRequest.objects.filter(user__isnull=False).exclude(
+                pk__in=ConsultationRequest.objects.values('pk')[:4]
+            ).count(),
+        )
+
+    def test_admin_action_notifies(self):
+        User.objects.create_superuser('admin', 'admin@dadgan.com', 'password')
+        self.client.login(username='admin', password='password')
+        selected = list(ConsultationRequest.objects.filter(user=self.user).values_list('pk', flat=True)[:3])
+        response = self.client.post(reverse('admin:lawfirm_consultationrequest_changelist'), {
+            'action': 'mark_as_cancelled', '_selected_action': selected,
+        })
+        self.assertEqual(response.status_code, 302)
+        jobs.run_pending()
+        self.assertEqual(Notification.objects.filter(title='درخواست مشاوره لغو شد').count(), 3)
+
+    def test_unknown_status_is_refused(self):
+        with self.assertRaises(ValueError):
+            consultations.set_status(ConsultationRequest.objects.all(), 'archived')
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        self.client.login(username='client', password='password')
+        self.url = reverse('lawfirm:notifications_count')
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.user, notification_type='general', title='اطلاعیه', message='متن')
+
+    def test_count_is_kept_in_cache(self):
+        self.notify()
+        self.assertEqual(self.client.get(self.url).json(), {'count': 1})
+        # The session, the user and the id of their newest notification
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).json(), {'count': 1})
+
+    def test_notifications_from_another_process_are_counted(self):
+        self.notify()
+        self.client.get(self.url)
+        # No signal, as if written by a worker that does not share the cache
+        Notification.objects.bulk_create([
+            Notification(user=self.user, notification_type='general', title='اطلاعیه', message='متن'),
+        ])
+        self.assertEqual(self.client.get(self.url).json(), {'count': 2})
+
+    def test_unchanged_count_is_not_modified(self):
+        self.notify()
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.notify()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_reading_resets_the_count(self):
+        self.notify()
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.get().mark_as_read()
+        self.assertEqual(self.client.get(self.url).json(), {'count': 0})
+
+    def test_anonymous_visitors_have_no_count(self):
+        self.client.logout()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), {'count': 0})
+
+
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        self.url = reverse('lawfirm:notification_stream')
+
+    def test_outside_asgi_the_page_falls_back_to_polling(self):
+        self.client.login(username='client', password='password')
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    async def test_anonymous_stream_is_refused(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 204)
+
+    async def test_streams_count_and_new_notifications(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = response.streaming_content.__aiter__()
+        self.assertTrue((await chunks.__anext__()).startswith(b'retry:'))
+        self.assertIn(b'event: count\ndata: {"count": 0}', await chunks.__anext__())
+
+        @sync_to_async
+        def notify():
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(
+                    user=self.user, notification_type='general', title='اطلاعیه', message='متن'
+                )
+
+        # Published in this process, so it arrives without waiting for a poll
+        await notify()
+        notification = await asyncio.wait_for(chunks.__anext__(), 1)
+        self.assertIn(b'event: notification', notification)
+        self.assertIn('اطلاعیه'.encode(), notification)
+        self.assertIn(b'{"count": 1}', await asyncio.wait_for(chunks.__anext__(), 1))
+        await chunks.aclose()
+
+    def test_streams_close_their_connection_after_each_poll(self):
+        with mock.patch.object(notifications, 'connection') as stream_connection:
+            stream_connection.in_atomic_block = False
+            self.assertEqual(async_to_sync(notifications._changes)(self.user.pk, 0), ([], 0))
+        stream_connection.close.assert_called_once_with()
+
+
+class BroadcastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        self.client.login(username='client', password='password')
+
+    def broadcast(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Broadcast.objects.create(title='تعطیلی', message='دفتر تعطیل است', **kwargs)
+
+    def test_broadcast_counts_for_every_user_without_rows_per_user(self):
+        self.assertEqual(unread_count(self.user.pk), 0)
+        self.broadcast()
+        other = User.objects.create_user('other', 'other@dadgan.com', 'password')
+        self.assertEqual(unread_count(self.user.pk), 1)
+        # Announcements from before a user joined are not theirs
+        self.assertEqual(unread_count(other.pk), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_reading_writes_a_receipt(self):
+        broadcast = self.broadcast()
+        self.broadcast(is_active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('lawfirm:mark_notifications_read'), {
+                'broadcasts_up_to': broadcast.pk,
+            })
+        self.assertEqual(response.json(), {'marked': 1, 'count': 0})
+        self.assertEqual(BroadcastReceipt.objects.get().broadcast, broadcast)
+        self.assertEqual(unread_count(self.user.pk), 0)
+
+
+class CompactionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('client', 'client@dadgan.com', 'password')
+        old = timezone.now() - timedelta(days=120)
+        Notification.objects.bulk_create(
+            Notification(user=self.user, notification_type='general', title=f'اطلاعیه {n}', message='متن',
+                         is_read=n % 2 == 0)
+            for n in range(10)
+        )
+        Notification.objects.update(created_at=old)
+        Notification.objects.create(user=self.user, notification_type='general', title='تازه', message='متن',
+                                    is_read=True)
+        withdrawn = Broadcast.objects.create(title='قدیمی', message='متن', is_active=False)
+        BroadcastReceipt.objects.create(broadcast=withdrawn, user=self.user)
+        Broadcast.objects.update(created_at=old)
+        Broadcast.objects.create(title='فعال', message='متن')
+
+    def test_deletes_old_read_rows_in_batches(self):
+        self.assertEqual(notifications.compact(days=90, dry_run=True), (5, 1))
+        self.assertEqual(Notification.objects.count(), 11)
+        out = StringIO()
+        call_command('compact_notifications', days=90, batch_size=2, stdout=out)
+        self.assertIn('5 notifications and 1 broadcasts', out.getvalue())
+        # Unread and recent notifications, and active broadcasts, stay
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 5)
+        self.assertTrue(Notification.objects.filter(title='تازه').exists())
+        self.assertEqual(list(Broadcast.objects.values_list('title', flat=True)), ['فعال'])
+        self.assertFalse(BroadcastReceipt.objects.exists())
@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from lawfirm import fulltext
+from lawfirm.models import BlogPost
+from lawfirm.pagination import CursorPaginator
+
+from .fixtures import SEARCH_TERM, seed
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed('medium')
+        # Ties on created_at must be broken by id
+        BlogPost.objects.filter(pk__in=list(BlogPost.objects.values_list('pk', flat=True)[:10])).update(
+            created_at=timezone.now()
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.queryset = BlogPost.objects.filter(published=True)
+
+    def walk(self, paginator):
+        pages, page = [], paginator.get_page()
+        pages.append([post.pk for post in page])
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            pages.append([post.pk for post in page])
+        return pages, page
+
+    def test_walks_every_row_once_in_order(self):
+        pages, _ = self.walk(CursorPaginator(self.queryset, 7))
+        seen = [pk for page in pages for pk in page]
+        self.assertEqual(seen, list(self.queryset.order_by('-created_at', '-id').values_list('pk', flat=True)))
+
+    def test_previous_cursor_returns_the_same_pages(self):
+        paginator = CursorPaginator(self.queryset, 7)
+        pages, page = self.walk(paginator)
+        for expected in reversed(pages[:-1]):
+            page = paginator.get_page(page.previous_cursor)
+            self.assertEqual([post.pk for post in page], expected)
+        self.assertFalse(page.has_previous())
+
+    def test_deep_pages_do_not_use_offset(self):
+        paginator = CursorPaginator(self.queryset, 7)
+        page = paginator.get_page(paginator.get_page().next_cursor)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.get_page(page.next_cursor)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_tampered_cursor_gives_first_page(self):
+        paginator = CursorPaginator(self.queryset, 7)
+        first = [post.pk for post in paginator.get_page()]
+        self.assertEqual([post.pk for post in paginator.get_page('not-a-cursor')], first)
+
+    def test_search_results_page_by_relevance(self):
+        results = fulltext.search(self.queryset, SEARCH_TERM)
+        pages, _ = self.walk(CursorPaginator(results, 7, ordering=['search_rank']))
+        self.assertEqual([pk for page in pages for pk in page], [post.pk for post in results])
+
+    def test_count_is_cached(self):
+        paginator = CursorPaginator(self.queryset, 7, group='blog')
+        self.assertEqual(paginator.count, self.queryset.count())
+        with self.assertNumQueries(0):
+            paginator.count
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ListingApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed('medium')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_blog_api_follows_cursors(self):
+        url = reverse('lawfirm:blog_list_api')
+        data = self.client.get(url, {'limit': 15}).json()
+        titles = [item['title'] for item in data['results']]
+        while data['next']:
+            data = self.client.get(url, {'limit': 15, 'cursor': data['next']}).json()
+            titles += [item['title'] for item in data['results']]
+        self.assertEqual(len(titles), data['count'])
+        self.assertEqual(len(set(titles)), data['count'])
+
+    def test_qa_api(self):
+        data = self.client.get(reverse('lawfirm:qa_list_api'), {'limit': 5}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(set(data['results'][0]), {
+            'title', 'url', 'category', 'answers', 'has_best_answer', 'votes', 'views', 'created_at'
+        })
+
+    def test_blog_list_links_to_next_page(self):
+        response = self.client.get(reverse('lawfirm:blog_list'))
+        cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, '?cursor=')
+        response = self.client.get(reverse('lawfirm:blog_list'), {'cursor': cursor})
+        self.assertTrue(response.context['page_obj'].has_previous())
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lawfirm.models import Notification
+
+from .fixtures import PASSWORD, seed
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ProfileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('large')
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username=self.data.client.username, password=PASSWORD)
+
+    def test_lists_are_paged_and_counted(self):
+        response = self.client.get(reverse('lawfirm:profile'))
+        user = self.data.client
+        self.assertEqual(len(response.context['notifications']), 5)
+        self.assertLessEqual(len(response.context['consultations']), 10)
+        self.assertEqual(response.context['totals'], {
+            'consultation_count': user.consultations.count(),
+            'message_count': user.messages.count(),
+            'notification_count': user.notifications.count(),
+        })
+
+        cursor = response.context['notifications'].next_cursor
+        older = self.client.get(reverse('lawfirm:profile'), {'notifications': cursor}).context['notifications']
+        self.assertTrue(older.has_previous())
+        self.assertFalse({n.pk for n in older} & {n.pk for n in response.context['notifications']})
+
+    def test_viewing_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('lawfirm:profile'))
+        self.assertFalse([q for q in queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))])
+        self.assertTrue(self.data.client.notifications.filter(is_read=False).exists())
+
+    def test_marking_read_up_to_the_newest_shown(self):
+        newest = self.client.get(reverse('lawfirm:profile')).context['notifications'][0]
+        shown = self.data.client.notifications.filter(is_read=False).count()
+        later = Notification.objects.create(
+            user=self.data.client, notification_type='general', title='جدید', message='متن'
+        )
+        response = self.client.post(reverse('lawfirm:mark_notifications_read'), {'up_to': newest.pk})
+        self.assertEqual(response.json(), {'marked': shown, 'count': 1})
+        self.assertEqual(list(self.data.client.notifications.filter(is_read=False)), [later])
+
+    def test_marking_read_needs_post_and_login(self):
+        url = reverse('lawfirm:mark_notifications_read')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.client.post(url).status_code, 401)
@@ -0,0 +1,137 @@
+"""
+Query budgets for every public page.
+
+Each URL of lawfirm/urls.py is rendered against the small, medium and
+large datasets of ``fixtures.SIZES``, by an anonymous visitor and by a
+logged-in client, and must stay within the same query budget and
+response-time ceiling on all three.  A query count that grows with the
+dataset (an N+1) therefore fails on the larger datasets.
+
+Pages are measured on a cold page cache but a warm process: one request
+loads per-process state (site settings, autocomplete index), then the
+page and fragment caches are invalidated before the measured request.
+
+A new URL must be given a budget here, or listed in ``UNMEASURED``.
+"""
+
+import time
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lawfirm import caching, sitemaps
+from lawfirm.models import SiteSettings
+from lawfirm.urls import urlpatterns
+
+from .fixtures import PASSWORD, SEARCH_TERM, seed
+
+# url name -> {client: maximum queries}; 'anonymous' or 'user' (logged in)
+BUDGETS = {
+    'home': {'anonymous': 5, 'user': 7},
+    'login': {'anonymous': 0},
+    'signup': {'anonymous': 0},
+    'profile': {'user': 8},
+    'search': {'anonymous': 4, 'user': 6},
+    'search_api': {'anonymous': 4, 'user': 4},
+    'suggest_api': {'anonymous': 0, 'user': 0},
+    'blog_list_api': {'anonymous': 2, 'user': 4},
+    'qa_list_api': {'anonymous': 2, 'user': 4},
+    'notifications_count': {'anonymous': 0, 'user': 3},
+    'blog_list': {'anonymous': 3, 'user': 5},
+    'blog_detail': {'anonymous': 2, 'user': 4},
+    'qa_list': {'anonymous': 4, 'user': 6},
+    'qa_detail': {'anonymous': 3, 'user': 5},
+    # MAX(id) and one shard per section
+    'sitemap_index': {'anonymous': 4, 'user': 4},
+    'sitemap_pages': {'anonymous': 0, 'user': 0},
+    # MAX(id), then the shard
+    'sitemap_shard': {'anonymous': 2, 'user': 2},
+}
+
+# Slowest acceptable response, in seconds; generous enough for a loaded CI runner
+RESPONSE_TIME_CEILING = 1.0
+
+# POST-only or redirect-only routes, and the long-lived notification stream
+UNMEASURED = {'logout', 'vote_question', 'vote_answer', 'notification_stream', 'mark_notifications_read'}
+
+
+def url_for(name, data):
+    if name == 'blog_detail':
+        return reverse('lawfirm:blog_detail', kwargs={'slug': data.post.slug})
+    if name == 'qa_detail':
+        return reverse('lawfirm:qa_detail', kwargs={'slug': data.question.slug})
+    if name == 'sitemap_shard':
+        return reverse('lawfirm:sitemap_shard', kwargs={'section': 'qa', 'number': 1})
+    url = reverse(f'lawfirm:{name}')
+    if name in ('search', 'search_api', 'suggest_api'):
+        url += f'?q={SEARCH_TERM}'
+    return url
+
+
+class QueryBudgetMixin:
+    size = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(cls.size)
+
+    def setUp(self):
+        overrides = override_settings(
+            # No collectstatic manifest is needed to render templates
+            STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+            # A buffered view-count flush inside a measured request would skew it
+            VIEW_COUNTER_FLUSH_THRESHOLD=10 ** 9,
+            VIEW_COUNTER_FLUSH_INTERVAL=10 ** 9,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        SiteSettings.invalidate()
+
+    def measure(self, url):
+        self.client.get(url)
+        caching.bump(*caching.GROUPS, *sitemaps.GROUPS)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200, url)
+        return queries, elapsed
+
+    def check_budgets(self, client_kind):
+        for name, budgets in BUDGETS.items():
+            if client_kind not in budgets:
+                continue
+            url = url_for(name, self.data)
+            with self.subTest(url=url, client=client_kind):
+                queries, elapsed = self.measure(url)
+                self.assertLessEqual(
+                    len(queries), budgets[client_kind],
+                    f'{url} issued {len(queries)} queries:\n'
+                    + '\n'.join(query['sql'] for query in queries.captured_queries),
+                )
+                self.assertLess(elapsed, RESPONSE_TIME_CEILING, f'{url} took {elapsed:.2f}s')
+
+    def test_anonymous_budgets(self):
+        self.check_budgets('anonymous')
+
+    def test_logged_in_budgets(self):
+        self.client.login(username=self.data.client.username, password=PASSWORD)
+        self.check_budgets('user')
+
+
+class SmallDatasetBudgetTests(QueryBudgetMixin, TestCase):
+    size = 'small'
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - UNMEASURED, set(BUDGETS))
+
+
+class MediumDatasetBudgetTests(QueryBudgetMixin, TestCase):
+    size = 'medium'
+
+
+class LargeDatasetBudgetTests(QueryBudgetMixin, TestCase):
+    size = 'large'
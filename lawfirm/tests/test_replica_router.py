@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from lawfirm.db import router
+from lawfirm.middleware import ReplicaPinningMiddleware
+from lawfirm.models import BlogPost, Notification
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DB_REPLICA_MAX_LAG=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        router.reset_health()
+        self.router = router.ReplicaRouter()
+        lag = mock.patch('lawfirm.db.router.replica_lag', return_value=0)
+        self.replica_lag = lag.start()
+        self.addCleanup(lag.stop)
+        self.token = router.start_request()
+        self.addCleanup(router.end_request, self.token)
+
+    def test_content_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(BlogPost), 'replica1')
+        self.assertIsNone(self.router.db_for_read(Notification))
+
+    def test_write_pins_request_to_primary(self):
+        self.router.db_for_write(BlogPost)
+        self.assertIsNone(self.router.db_for_read(BlogPost))
+
+    def test_lagging_replica_is_skipped(self):
+        self.replica_lag.return_value = 60
+        self.assertIsNone(self.router.db_for_read(BlogPost))
+
+    def test_stopped_replica_is_skipped(self):
+        self.replica_lag.return_value = None
+        self.assertIsNone(self.router.db_for_read(BlogPost))
+
+    def test_recent_content_change_reads_primary(self):
+        router.content_changed()
+        self.assertIsNone(self.router.db_for_read(BlogPost))
+
+    def test_outside_request_reads_primary(self):
+        token = router._state.set(None)
+        self.addCleanup(router._state.reset, token)
+        self.assertIsNone(self.router.db_for_read(BlogPost))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        router.reset_health()
+        lag = mock.patch('lawfirm.db.router.replica_lag', return_value=0)
+        lag.start()
+        self.addCleanup(lag.stop)
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        reads = []
+
+        def view(request):
+            if write:
+                router.ReplicaRouter().db_for_write(BlogPost)
+            reads.append(router.ReplicaRouter().db_for_read(BlogPost))
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return response, reads[0]
+
+    def test_get_reads_replica(self):
+        response, read = self.handle(self.factory.get('/'))
+        self.assertEqual(read, 'replica1')
+        self.assertNotIn(router.PIN_COOKIE, response.cookies)
+
+    def test_post_that_writes_sets_pin_cookie(self):
+        response, read = self.handle(self.factory.post('/'), write=True)
+        self.assertIsNone(read)
+        self.assertEqual(response.cookies[router.PIN_COOKIE]['max-age'], 5)
+
+    def test_pinned_browser_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[router.PIN_COOKIE] = '1'
+        _, read = self.handle(request)
+        self.assertIsNone(read)
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lawfirm import sitemaps
+from lawfirm.models import BlogPost
+
+from .fixtures import seed
+
+
+@override_settings(SITEMAP_SHARD_SIZE=10)
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('medium')
+
+    def setUp(self):
+        cache.clear()
+
+    def shard_url(self, section, number):
+        return reverse('lawfirm:sitemap_shard', kwargs={'section': section, 'number': number})
+
+    def test_index_lists_every_shard_with_lastmod(self):
+        response = self.client.get(reverse('lawfirm:sitemap_index'))
+        self.assertEqual(response['Content-Type'], 'application/xml; charset=utf-8')
+        content = response.content.decode()
+        self.assertIn('<loc>http://testserver/sitemap-pages.xml</loc>', content)
+        shards = {sitemaps.shard_of(pk) for pk in BlogPost.objects.values_list('pk', flat=True)}
+        for number in shards:
+            self.assertIn(f'<loc>http://testserver{self.shard_url("blog", number)}</loc><lastmod>', content)
+        self.assertEqual(content.count('<loc>http://testserver/sitemap-blog-'), len(shards))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('lawfirm:sitemap_index')).content.decode(), content)
+        self.assertEqual(len(queries), 0)
+
+    def test_shard_lists_published_rows(self):
+        post = self.data.post
+        number = sitemaps.shard_of(post.pk)
+        hidden = BlogPost.objects.filter(pk__gt=(number - 1) * 10, pk__lte=number * 10).exclude(pk=post.pk).first()
+        BlogPost.objects.filter(pk=hidden.pk).update(published=False)
+
+        content = self.client.get(self.shard_url('blog', number)).content.decode()
+        self.assertIn(f'<loc>http://testserver{post.get_absolute_url()}</loc>', content)
+        self.assertIn(f'<lastmod>{post.updated_at.isoformat(timespec="seconds")}</lastmod>', content)
+        self.assertNotIn(hidden.get_absolute_url(), content)
+        self.assertEqual(self.client.get(self.shard_url('nope', 1)).status_code, 404)
+
+    def test_shards_past_the_last_row_are_refused(self):
+        last = sitemaps.shard_of(BlogPost.objects.latest('pk').pk)
+        self.assertEqual(self.client.get(self.shard_url('blog', last)).status_code, 200)
+        with CaptureQueriesContext(connection) as queries, mock.patch.object(cache, 'set_many') as set_many:
+            for number in (last + 1, 999999, 0):
+                self.assertEqual(self.client.get(self.shard_url('blog', number)).status_code, 404)
+        self.assertEqual(len(queries), 0)
+        set_many.assert_not_called()
+
+    def test_save_rebuilds_only_its_shard(self):
+        posts = list(BlogPost.objects.order_by('pk'))
+        first, last = posts[0], posts[-1]
+        self.client.get(reverse('lawfirm:sitemap_index'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.slug = 'renamed'
+            first.save()
+
+        # The section's MAX(id), read again after any save, and the shard itself
+        with CaptureQueriesContext(connection) as queries:
+            content = self.client.get(self.shard_url('blog', sitemaps.shard_of(first.pk))).content.decode()
+        self.assertEqual(len(queries), 2)
+        self.assertIn('/blog/renamed/', content)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.shard_url('blog', sitemaps.shard_of(last.pk)))
+        self.assertEqual(len(queries), 0)
+        # The index is rebuilt from the cached shards; only the Q&A MAX(id) is read again
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('lawfirm:sitemap_index'))
+        self.assertEqual(len(queries), 1)
@@ -0,0 +1,58 @@
+import importlib
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from lawfirm import votes
+from lawfirm.models import Answer, Question, Vote
+
+from .fixtures import seed
+
+migration = importlib.import_module('lawfirm.migrations.0004_vote')
+
+
+class VoteLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed('small')
+
+    def tally(self, model, pk):
+        return model.objects.values_list('votes', flat=True).get(pk=pk)
+
+    def test_repeated_votes_count_once(self):
+        question = self.data.question
+        self.assertEqual(votes.cast_vote(Question, question.pk, 'session:a', 1), 1)
+        self.assertEqual(votes.cast_vote(Question, question.pk, 'session:a', 1), 1)
+        self.assertEqual(votes.cast_vote(Question, question.pk, 'session:b', 1), 2)
+        self.assertEqual(Vote.objects.filter(question=question).count(), 2)
+
+    def test_switching_a_vote_moves_the_tally_by_two(self):
+        answer = Answer.objects.first()
+        self.assertEqual(votes.cast_vote(Answer, answer.pk, 'user:1', 1), 1)
+        self.assertEqual(votes.cast_vote(Answer, answer.pk, 'user:1', -1), -1)
+        self.assertEqual(Vote.objects.get(answer=answer).value, -1)
+        # The same voter on the question is a separate vote
+        self.assertEqual(votes.cast_vote(Question, answer.question_id, 'user:1', -1), -1)
+
+    def test_reconcile_keeps_legacy_tallies(self):
+        question = self.data.question
+        Question.objects.filter(pk=question.pk).update(votes=5)
+        # What migration 0004 does for tallies from before the ledger
+        migration.seed_legacy_tallies(apps, None)
+        votes.cast_vote(Question, question.pk, 'session:a', 1)
+        self.assertEqual(self.tally(Question, question.pk), 6)
+
+        Question.objects.update(votes=0)
+        self.assertEqual(votes.reconcile(Question, dry_run=True), 1)
+        self.assertEqual(self.tally(Question, question.pk), 0)
+        self.assertEqual(votes.reconcile(Question), 1)
+        self.assertEqual(self.tally(Question, question.pk), 6)
+        self.assertEqual(votes.reconcile(Question), 0)
+
+    def test_a_vote_has_exactly_one_target(self):
+        question = self.data.question
+        for targets in ({}, {'question': question, 'answer': question.answers.first()}):
+            with self.subTest(targets=sorted(targets)):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    Vote.objects.create(voter='session:a', value=1, **targets)
@@ -27,11 +27,19 @@ urlpatterns = [
     path('accounts/signup/', views.signup, name='signup'),
     path('search/', views.search, name='search'),
     path('api/search/', views.search_api, name='search_api'),
+    path('api/suggest/', views.suggest_api, name='suggest_api'),
+    path('api/blog/', views.blog_list_api, name='blog_list_api'),
+    path('api/qa/', views.qa_list_api, name='qa_list_api'),
     path('api/notifications/count/', views.get_unread_notifications_count, name='notifications_count'),
+    path('api/notifications/stream/', views.notification_stream, name='notification_stream'),
+    path('api/notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
     path('blog/', views.blog_list, name='blog_list'),
     path('blog/<unicode_slug:slug>/', views.blog_detail, name='blog_detail'),
     path('qa/', views.qa_list, name='qa_list'),
     path('qa/<unicode_slug:slug>/', views.qa_detail, name='qa_detail'),
     path('ajax/vote-question/<int:question_id>/', views.vote_question, name='vote_question'),
     path('ajax/vote-answer/<int:answer_id>/', views.vote_answer, name='vote_answer'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap_index'),
+    path('sitemap-pages.xml', views.sitemap_pages, name='sitemap_pages'),
+    path('sitemap-<slug:section>-<int:number>.xml', views.sitemap_shard, name='sitemap_shard'),
 ]
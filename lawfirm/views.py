@@ -1,13 +1,17 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.contrib.auth import login as auth_login
+from django.contrib.auth import get_user, login as auth_login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.utils.text import slugify
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.urls import reverse_lazy
@@ -15,9 +19,16 @@ import json
 
 from .models import (
     BlogPost, Question, Answer, ConsultationRequest, ContactMessage,
-    Testimonial, SiteSettings, Category, QACategory, ConsultationType, Notification
+    Testimonial, Category, QACategory, ConsultationType, Notification, Broadcast, BroadcastReceipt
 )
 from .forms import ContactForm, ConsultationForm, QuestionForm, AnswerForm, SearchForm
+from . import fulltext, sitemaps, votes
+from .caching import cache_page_for_anonymous, track_views
+from .pagination import CursorPaginator
+from .fulltext import autocomplete
+from .notifications import (
+    mark_broadcasts_read, reset_unread, stream as notification_events, unread_broadcasts, unread_count,
+)
 
 
 class StyledAuthenticationForm(AuthenticationForm):
@@ -53,23 +64,18 @@ class CustomLoginView(LoginView):
         return reverse_lazy('lawfirm:profile')
 
 
+@cache_page_for_anonymous('blog', 'qa', 'site')
 def home(request):
     """صفحه اصلی"""
     # Get latest blog posts
-    recent_blogs = BlogPost.objects.filter(published=True)[:3]
+    recent_blogs = BlogPost.objects.filter(published=True).for_listing()[:3]
     
     # Get featured Q&As
-    featured_questions = Question.objects.filter(is_published=True)[:4]
+    featured_questions = Question.objects.filter(is_published=True).with_listing_data()[:4]
     
     # Get testimonials
     testimonials = Testimonial.objects.filter(is_published=True)[:3]
     
-    # Get site settings for stats
-    try:
-        site_settings = SiteSettings.objects.first()
-    except:
-        site_settings = None
-    
     # Get consultation types for pricing
     consultation_types = ConsultationType.objects.filter(is_active=True)[:2]
     
@@ -101,7 +107,6 @@ def home(request):
         'recent_blogs': recent_blogs,
         'featured_questions': featured_questions,
         'testimonials': testimonials,
-        'site_settings': site_settings,
         'consultation_types': consultation_types,
         'contact_form': contact_form,
         'consultation_form': consultation_form,
@@ -109,29 +114,49 @@ def home(request):
     return render(request, 'lawfirm/home.html', context)
 
 
+def _blog_listing(category_slug, search_query):
+    """Published posts, optionally of one category and matching a search"""
+    blogs = BlogPost.objects.filter(published=True).for_listing()
+    if category_slug:
+        blogs = blogs.filter(category__slug=category_slug)
+    if search_query:
+        blogs = fulltext.search(blogs, search_query)
+    return blogs
+
+
+def _question_listing(category_slug, search_query):
+    """Published questions, optionally of one category and matching a search"""
+    questions = Question.objects.filter(is_published=True).with_listing_data()
+    if category_slug:
+        questions = questions.filter(category__slug=category_slug)
+    if search_query:
+        questions = fulltext.search(questions, search_query)
+    return questions
+
+
+def _search_query(search_form):
+    return search_form.cleaned_data.get('query') if search_form.is_valid() else ''
+
+
+def _cursor_page(request, queryset, per_page, group):
+    """One page of ``queryset`` at ``?cursor=``, newest first or by search relevance"""
+    if 'search_rank' in queryset.query.annotations:
+        paginator = CursorPaginator(queryset, per_page, ordering=['search_rank'], group=group)
+    else:
+        paginator = CursorPaginator(queryset, per_page, group=group)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@cache_page_for_anonymous('blog', 'site')
 def blog_list(request):
     """لیست مقالات بلاگ"""
     category_slug = request.GET.get('category')
     search_query = request.GET.get('search', '')
     
-    blogs = BlogPost.objects.filter(published=True)
-    
-    # Filter by category
-    if category_slug:
-        blogs = blogs.filter(category__slug=category_slug)
-    
-    # Search functionality
-    if search_query:
-        blogs = blogs.filter(
-            Q(title__icontains=search_query) |
-            Q(excerpt__icontains=search_query) |
-            Q(content__icontains=search_query)
-        )
+    blogs = _blog_listing(category_slug, search_query)
     
     # Pagination
-    paginator = Paginator(blogs, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _cursor_page(request, blogs, 6, 'blog')
     
     # Get categories for filter
     categories = Category.objects.all()
@@ -145,16 +170,17 @@ def blog_list(request):
     return render(request, 'lawfirm/blog_list.html', context)
 
 
+@cache_page_for_anonymous('blog', 'site')
 def blog_detail(request, slug):
     """جزئیات مقاله"""
-    blog = get_object_or_404(BlogPost, slug=slug, published=True)
+    blog = get_object_or_404(BlogPost.objects.select_related('category', 'author'), slug=slug, published=True)
     blog.increment_views()
     
     # Get related posts
     related_posts = BlogPost.objects.filter(
         category=blog.category, 
         published=True
-    ).exclude(id=blog.id)[:3]
+    ).exclude(id=blog.id).for_listing()[:3]
     
     context = {
         'blog': blog,
@@ -164,32 +190,19 @@ def blog_detail(request, slug):
         'seo_description': blog.get_seo_description(),
         'seo_keywords': blog.get_seo_keywords(),
     }
-    return render(request, 'lawfirm/blog_detail.html', context)
+    return track_views(render(request, 'lawfirm/blog_detail.html', context), blog)
 
 
+@cache_page_for_anonymous('qa', 'site')
 def qa_list(request):
     """لیست پرسش و پاسخ"""
     category_slug = request.GET.get('category')
     
-    questions = Question.objects.filter(is_published=True)
-    
-    # Filter by category
-    if category_slug:
-        questions = questions.filter(category__slug=category_slug)
-    
-    # Search functionality
     search_form = SearchForm(request.GET)
-    if search_form.is_valid() and search_form.cleaned_data.get('query'):
-        query = search_form.cleaned_data['query']
-        questions = questions.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query)
-        )
+    questions = _question_listing(category_slug, _search_query(search_form))
     
     # Pagination
-    paginator = Paginator(questions, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _cursor_page(request, questions, 10, 'qa')
     
     # Get categories for filter
     categories = QACategory.objects.all()
@@ -215,9 +228,12 @@ def qa_list(request):
     return render(request, 'lawfirm/qa_list.html', context)
 
 
+@cache_page_for_anonymous('qa', 'site')
 def qa_detail(request, slug):
     """جزئیات پرسش و پاسخ"""
-    question = get_object_or_404(Question, slug=slug, is_published=True)
+    question = get_object_or_404(
+        Question.objects.select_related('category', 'best_answer'), slug=slug, is_published=True
+    )
     question.increment_views()
     
     # Get answers
@@ -227,7 +243,7 @@ def qa_detail(request, slug):
     related_questions = Question.objects.filter(
         category=question.category,
         is_published=True
-    ).exclude(id=question.id)[:5]
+    ).exclude(id=question.id).with_listing_data()[:5]
     
     # Handle answer submission
     answer_form = AnswerForm()
@@ -250,42 +266,22 @@ def qa_detail(request, slug):
         'seo_description': question.get_seo_description(),
         'seo_keywords': question.get_seo_keywords(),
     }
-    return render(request, 'lawfirm/qa_detail.html', context)
+    return track_views(render(request, 'lawfirm/qa_detail.html', context), question)
 
 
 @require_http_methods(["POST"])
 def vote_question(request, question_id):
     """امتیاز دادن به سوال"""
-    if not request.headers.get('Content-Type') == 'application/json':
-        return JsonResponse({'error': 'Invalid content type'}, status=400)
-    
-    try:
-        data = json.loads(request.body)
-        vote_type = data.get('vote_type')  # 'up' or 'down'
-        
-        question = get_object_or_404(Question, id=question_id, is_published=True)
-        
-        if vote_type == 'up':
-            question.votes += 1
-        elif vote_type == 'down':
-            question.votes -= 1
-        else:
-            return JsonResponse({'error': 'Invalid vote type'}, status=400)
-        
-        question.save()
-        
-        return JsonResponse({
-            'success': True,
-            'new_votes': question.votes
-        })
-    
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+    return _vote(request, Question, question_id)
 
 
 @require_http_methods(["POST"])
 def vote_answer(request, answer_id):
     """امتیاز دادن به پاسخ"""
+    return _vote(request, Answer, answer_id)
+
+
+def _vote(request, model, pk):
     if not request.headers.get('Content-Type') == 'application/json':
         return JsonResponse({'error': 'Invalid content type'}, status=400)
     
@@ -293,20 +289,24 @@ def vote_answer(request, answer_id):
         data = json.loads(request.body)
         vote_type = data.get('vote_type')  # 'up' or 'down'
         
-        answer = get_object_or_404(Answer, id=answer_id, is_published=True)
-        
-        if vote_type == 'up':
-            answer.votes += 1
-        elif vote_type == 'down':
-            answer.votes -= 1
-        else:
+        if vote_type not in votes.VOTE_VALUES:
             return JsonResponse({'error': 'Invalid vote type'}, status=400)
         
-        answer.save()
+        if not model.objects.filter(pk=pk, is_published=True).exists():
+            return JsonResponse({'error': 'Not found'}, status=404)
+        
+        new_votes = votes.cast_vote(
+            model,
+            pk,
+            votes.get_voter_key(request),
+            votes.VOTE_VALUES[vote_type],
+            user=request.user if request.user.is_authenticated else None,
+        )
         
         return JsonResponse({
             'success': True,
-            'new_votes': answer.votes
+            'new_votes': new_votes,
+            'user_vote': vote_type,
         })
     
     except Exception as e:
@@ -326,23 +326,18 @@ def search(request):
     
     if query and len(query) >= 2:
         # Search in blog posts
-        blogs = BlogPost.objects.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query) |
-            Q(excerpt__icontains=query),
-            published=True
-        )[:10]
+        blogs = list(fulltext.search(
+            BlogPost.objects.filter(published=True).for_listing(), query, limit=10
+        ))
         
         # Search in questions
-        questions = Question.objects.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query),
-            is_published=True
-        )[:10]
+        questions = list(fulltext.search(
+            Question.objects.filter(is_published=True).with_listing_data(), query, limit=10
+        ))
         
         context['blogs'] = blogs
         context['questions'] = questions
-        context['total_results'] = blogs.count() + questions.count()
+        context['total_results'] = len(blogs) + len(questions)
     
     return render(request, 'lawfirm/search.html', context)
 
@@ -355,42 +350,80 @@ def search_api(request):
     if not query or len(query) < 2:
         return JsonResponse({'results': []})
     
-    # Search in blog posts
-    blogs = BlogPost.objects.filter(
-        Q(title__icontains=query) | 
-        Q(excerpt__icontains=query),
-        published=True
-    )[:5]
+    results = fulltext.suggest(query, limit=5)
     
-    # Search in questions  
-    questions = Question.objects.filter(
-        Q(title__icontains=query),
-        is_published=True
-    )[:5]
-    
-    results = []
-    
-    # Add blog results
-    for blog in blogs:
-        results.append({
-            'type': 'blog',
+    return JsonResponse({'results': results})
+
+
+LISTING_API_MAX_LIMIT = 50
+
+
+def _listing_api_limit(request, default):
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), LISTING_API_MAX_LIMIT))
+    except ValueError:
+        return default
+
+
+def _listing_api_response(page_obj, results):
+    return JsonResponse({
+        'count': page_obj.count,
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+        'results': results,
+    })
+
+
+@require_http_methods(["GET"])
+@cache_page_for_anonymous('blog')
+def blog_list_api(request):
+    """JSON listing of blog posts; ?category=, ?search=, ?cursor=, ?limit="""
+    blogs = _blog_listing(request.GET.get('category'), request.GET.get('search', ''))
+    page_obj = _cursor_page(request, blogs, _listing_api_limit(request, 6), 'blog')
+    return _listing_api_response(page_obj, [
+        {
             'title': blog.title,
             'url': blog.get_absolute_url(),
+            'excerpt': blog.excerpt,
             'category': blog.category.name,
-            'icon': 'fa-newspaper'
-        })
-    
-    # Add question results
-    for question in questions:
-        results.append({
-            'type': 'question',
+            'author': blog.author.get_full_name() or blog.author.username,
+            'views': blog.views,
+            'created_at': blog.created_at.isoformat(),
+        }
+        for blog in page_obj
+    ])
+
+
+@require_http_methods(["GET"])
+@cache_page_for_anonymous('qa')
+def qa_list_api(request):
+    """JSON listing of questions; ?category=, ?query=, ?cursor=, ?limit="""
+    questions = _question_listing(request.GET.get('category'), _search_query(SearchForm(request.GET)))
+    page_obj = _cursor_page(request, questions, _listing_api_limit(request, 10), 'qa')
+    return _listing_api_response(page_obj, [
+        {
             'title': question.title,
             'url': question.get_absolute_url(),
             'category': question.category.name,
-            'icon': 'fa-question-circle'
-        })
+            'answers': question.get_answers_count(),
+            'has_best_answer': question.has_best_answer,
+            'votes': question.votes,
+            'views': question.views,
+            'created_at': question.created_at.isoformat(),
+        }
+        for question in page_obj
+    ])
+
+
+@require_http_methods(["GET"])
+def suggest_api(request):
+    """AJAX endpoint for live search suggestions, served from memory"""
+    query = request.GET.get('q', '').strip()
     
-    return JsonResponse({'results': results})
+    if not query or len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    return JsonResponse({'results': autocomplete.suggest(query, limit=8)})
 
 
 def signup(request):
@@ -435,30 +468,157 @@ def signup(request):
     return render(request, 'registration/signup.html', {'form': form, 'next': next_url})
 
 
+PROFILE_PAGE_SIZE = 10
+PROFILE_NOTIFICATIONS_PAGE_SIZE = 5
+
+
+def _user_count(model):
+    """Subquery counting the ``model`` rows of the outer user"""
+    rows = model.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    return Coalesce(Subquery(rows.annotate(count=Count('pk')).values('count')), 0)
+
+
 @login_required
 def profile(request):
-    """User profile page showing consultations and messages"""
-    # Get user's consultations and messages
-    consultations = ConsultationRequest.objects.filter(user=request.user).order_by('-created_at')
-    contact_messages = ContactMessage.objects.filter(user=request.user).order_by('-created_at')
-    notifications = request.user.notifications.all().order_by('-created_at')
-    
-    # Mark unread notifications as read when viewing profile
-    request.user.notifications.filter(is_read=False).update(is_read=True)
-    
+    """
+    User profile page showing consultations, messages and notifications
+
+    Each list is paged on its own (?consultations=, ?messages= and
+    ?notifications= cursors) and the totals come from a single query, so the
+    page costs the same however many rows a client has collected.  Viewing it
+    writes nothing; the page marks what it showed as read through
+    mark_notifications_read.
+    """
+    user = request.user
+    totals = User.objects.filter(pk=user.pk).annotate(
+        consultation_count=_user_count(ConsultationRequest),
+        message_count=_user_count(ContactMessage),
+        notification_count=_user_count(Notification),
+    ).values('consultation_count', 'message_count', 'notification_count').get()
+
+    consultations = CursorPaginator(
+        ConsultationRequest.objects.filter(user=user).select_related('consultation_type'), PROFILE_PAGE_SIZE,
+    ).get_page(request.GET.get('consultations'))
+    contact_messages = CursorPaginator(
+        ContactMessage.objects.filter(user=user), PROFILE_PAGE_SIZE,
+    ).get_page(request.GET.get('messages'))
+    notifications = CursorPaginator(
+        Notification.objects.filter(user=user), PROFILE_NOTIFICATIONS_PAGE_SIZE,
+    ).get_page(request.GET.get('notifications'))
+    broadcasts = Broadcast.objects.filter(is_active=True, created_at__gte=user.date_joined).annotate(
+        is_read=Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), user=user)),
+    )[:PROFILE_NOTIFICATIONS_PAGE_SIZE]
+
     context = {
         'consultations': consultations,
         'contact_messages': contact_messages,
         'notifications': notifications,
+        'broadcasts': broadcasts,
+        'totals': totals,
+        'unread_count': unread_count(user.pk),
     }
     return render(request, 'lawfirm/profile.html', context)
 
 
+@require_http_methods(["POST"])
+def mark_notifications_read(request):
+    """
+    Mark the user's unread notifications as read in one UPDATE: those up to
+    the notification id ``up_to`` (what the page showed), or all of them.
+    Broadcasts up to ``broadcasts_up_to`` (or all) get their read receipts
+    in one INSERT.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=401)
+    up_to = request.POST.get('up_to')
+    broadcasts_up_to = request.POST.get('broadcasts_up_to')
+    if not all(value.isdigit() for value in (up_to, broadcasts_up_to) if value):
+        return JsonResponse({'error': 'Invalid notification id'}, status=400)
+
+    notifications = request.user.notifications.filter(is_read=False)
+    if up_to:
+        notifications = notifications.filter(pk__lte=int(up_to))
+    marked = notifications.update(is_read=True)
+    if marked:
+        reset_unread(request.user.pk)
+    marked += mark_broadcasts_read(request.user.pk, int(broadcasts_up_to) if broadcasts_up_to else None)
+    # Counted here: the cached count is only reset once this commits
+    remaining = request.user.notifications.filter(is_read=False).count()
+    remaining += unread_broadcasts(request.user.pk).count()
+    return JsonResponse({'marked': marked, 'count': remaining})
+
+
 @require_http_methods(["GET"])
 def get_unread_notifications_count(request):
-    """API endpoint to get count of unread notifications"""
-    if not request.user.is_authenticated:
-        return JsonResponse({'count': 0})
-    
-    count = request.user.notifications.filter(is_read=False).count()
-    return JsonResponse({'count': count})
+    """
+    API endpoint to get count of unread notifications.
+
+    Called by every page, so the count comes from the per-user cache, and
+    the answer is 304 Not Modified while the browser's copy is current.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else None
+    count = unread_count(user_id) if user_id else 0
+    etag = f'"{user_id or 0}-{count}"'
+
+    response = JsonResponse({'count': count})
+    response.headers['ETag'] = etag
+    # Revalidate every time; the ETag makes that cheap
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events feed of the user's new notifications and unread count
+    (see lawfirm/notifications.py), replacing the count request of each page.
+
+    Only served through ASGI: under WSGI a worker would be held for as long
+    as the page stays open.  There, and for anonymous visitors, the answer is
+    204, which tells EventSource not to reconnect; the page then asks
+    notifications_count instead.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    # get_user() also checks the session against the password hash
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return HttpResponse(status=204)
+    user_id = user.pk
+
+    try:
+        last_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        last_id = None
+    response = StreamingHttpResponse(notification_events(user_id, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sitemap_response(request, document):
+    response = HttpResponse(sitemaps.with_origin(document, request), content_type='application/xml; charset=utf-8')
+    patch_cache_control(response, public=True, max_age=3600)
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def sitemap_index(request):
+    """Sitemap index of the pages and every blog / Q&A shard (lawfirm/sitemaps.py)"""
+    return _sitemap_response(request, sitemaps.index())
+
+
+@require_http_methods(["GET", "HEAD"])
+def sitemap_pages(request):
+    return _sitemap_response(request, sitemaps.pages())
+
+
+@require_http_methods(["GET", "HEAD"])
+def sitemap_shard(request, section, number):
+    document = sitemaps.shard(section, number)
+    if document is None:
+        raise Http404("Sitemap not found")
+    return _sitemap_response(request, document)
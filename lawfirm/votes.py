@@ -0,0 +1,88 @@
+"""
+Vote ledger for questions and answers.
+
+Every voter (a logged-in user or an anonymous session) has at most one
+``Vote`` row per question/answer.  The ``votes`` column on Question/Answer is
+a denormalized tally maintained with a single ``F()`` UPDATE per vote, so
+concurrent votes never overwrite each other and ``updated_at`` is left alone.
+The UPDATE fires no signal, so the Q&A page cache is invalidated here.
+``manage.py reconcile_votes`` rebuilds the tallies from the ledger.
+"""
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from . import caching
+from .models import Answer, Question, Vote
+
+VOTE_VALUES = {'up': 1, 'down': -1}
+
+
+def get_voter_key(request):
+    """Return the ledger key identifying the voter behind ``request``."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if not request.session.session_key:
+        request.session.save()
+    return f'session:{request.session.session_key}'
+
+
+def _target_field(model):
+    return 'question' if model is Question else 'answer'
+
+
+def cast_vote(model, pk, voter, value, user=None):
+    """
+    Record ``voter``'s vote on the ``model`` row ``pk`` and return the new tally.
+
+    Repeating the same vote is a no-op; switching from up to down (or back)
+    moves the tally by two.
+    """
+    field = _target_field(model)
+    with transaction.atomic():
+        vote, created = Vote.objects.select_for_update().get_or_create(
+            voter=voter,
+            **{f'{field}_id': pk},
+            defaults={'value': value, 'user': user},
+        )
+        if created:
+            delta = value
+        elif vote.value == value:
+            delta = 0
+        else:
+            delta = value - vote.value
+            vote.value = value
+            vote.save(update_fields=['value', 'updated_at'])
+
+        if delta:
+            model.objects.filter(pk=pk).update(votes=F('votes') + delta)
+            transaction.on_commit(lambda: caching.invalidate_model(model))
+
+    return model.objects.filter(pk=pk).values_list('votes', flat=True).get()
+
+
+def reconcile(model, dry_run=False, batch_size=500):
+    """
+    Recompute ``model.votes`` from the ledger.
+
+    Returns the number of rows whose tally was out of date.
+    """
+    field = _target_field(model)
+    totals = dict(
+        Vote.objects.filter(**{f'{field}__isnull': False})
+        .values(field)
+        .annotate(total=Sum('value'))
+        .values_list(field, 'total')
+    )
+
+    stale = []
+    for obj in model.objects.only('pk', 'votes').iterator(chunk_size=2000):
+        expected = totals.get(obj.pk, 0)
+        if obj.votes != expected:
+            obj.votes = expected
+            stale.append(obj)
+
+    if stale and not dry_run:
+        model.objects.bulk_update(stale, ['votes'], batch_size=batch_size)
+        caching.invalidate_model(model)
+    return len(stale)